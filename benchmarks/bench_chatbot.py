@@ -0,0 +1,360 @@
+"""
+End-to-end chatbot benchmark.
+
+    python benchmarks/bench_chatbot.py --students 5000 --messages 500 --workers 4
+    python benchmarks/bench_chatbot.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_chatbot.py --baseline benchmarks/baseline.json
+
+Replays a message corpus built from the intents.json patterns (plus seeded
+misspellings and database questions) against:
+
+    direct      get_bot_response() in this process
+    test_client /chatbot_api/ and /chat through Flask's test client
+    server      /chatbot_api/ on a local multi-process server under concurrent load
+
+Everything runs against a temporary SQLite database seeded with a configurable
+number of students. The report holds per-stage latency, requests/sec and memory,
+and can be compared against a stored baseline JSON.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+DEPARTMENTS = ["CSBS", "IT", "CSE", "ECE", "EEE", "MECH", "AIDS", "AIML"]
+DB_QUESTIONS = [
+    "courses", "all students", "all faculty", "holidays", "syllabus",
+    "student details of {course}", "{dept} faculty", "{dept} faculty list",
+]
+
+
+# =============================
+# CORPUS & FIXTURE
+# =============================
+
+def misspell(text, rng):
+    """Applies one random typo (drop, swap, double or replace a letter)."""
+    letters = [i for i, c in enumerate(text) if c.isalpha()]
+    if len(letters) < 3:
+        return text
+    i = rng.choice(letters[1:])
+    op = rng.choice(("drop", "swap", "double", "replace"))
+    if op == "drop":
+        return text[:i] + text[i + 1:]
+    if op == "swap" and i + 1 < len(text):
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if op == "double":
+        return text[:i] + text[i] + text[i:]
+    return text[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + text[i + 1:]
+
+
+def build_corpus(size, seed, typo_rate=0.3):
+    rng = random.Random(seed)
+    with open("intents.json", "r") as f:
+        intents = json.load(f)
+    patterns = [p for intent in intents["intents"] for p in intent["patterns"]]
+    corpus = []
+    for _ in range(size):
+        if rng.random() < 0.15:
+            message = rng.choice(DB_QUESTIONS).format(course=rng.choice(DEPARTMENTS).lower(),
+                                                      dept=rng.choice(DEPARTMENTS).lower())
+        else:
+            message = rng.choice(patterns)
+        if rng.random() < typo_rate:
+            message = misspell(message, rng)
+        corpus.append(message)
+    return corpus
+
+
+def seed_database(students, seed):
+    from flask_server import app, db
+    from flask_server.university.models import Course, Student, Teacher, Holidays
+
+    rng = random.Random(seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        courses = [Course(name=dept, duration="4 years", syllabus=b"%PDF-1.4 bench") for dept in DEPARTMENTS]
+        db.session.add_all(courses)
+        db.session.flush()
+        for i in range(students):
+            db.session.add(Student(id=f"4341210{i:05d}", name=f"Student {i}",
+                                   cgpa=round(rng.uniform(5, 10), 2),
+                                   course_id=rng.choice(courses).course_id))
+        for i in range(max(10, students // 20)):
+            db.session.add(Teacher(first_name=f"Teacher{i}", last_name="Professor",
+                                   department=rng.choice(DEPARTMENTS)))
+        db.session.add(Holidays(year=2025, file_name="holidays.jpg", data=os.urandom(256 * 1024)))
+        db.session.commit()
+
+
+# =============================
+# MEASUREMENT HELPERS
+# =============================
+
+def rss_kb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_kb(pid):
+    """RSS of a process and its direct children (forked server workers)."""
+    total = rss_kb(pid)
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            total += sum(rss_kb(child) for child in f.read().split())
+    except OSError:
+        pass
+    return total
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"count": len(ordered), "p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def run_sequential(fn, corpus):
+    samples = []
+    start = time.perf_counter()
+    for message in corpus:
+        t = time.perf_counter()
+        fn(message)
+        samples.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    result = latency_summary(samples)
+    result["requests_per_sec"] = round(len(corpus) / elapsed, 2)
+    return result
+
+
+# =============================
+# PHASES
+# =============================
+
+def bench_direct(corpus):
+    from chat import get_bot_response
+    from flask_server import app
+    from metrics import REGISTRY
+
+    with app.app_context():
+        get_bot_response("hello")  # first call pays lazy initialisation
+        REGISTRY.reset()
+        tracemalloc.start()
+        result = run_sequential(get_bot_response, corpus)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    result["tracemalloc_peak_kb"] = peak // 1024
+    result["stages"] = {}
+    for labels, entry in REGISTRY.snapshot().get("chatbot_stage_seconds", {}).items():
+        labels = dict(labels)
+        result["stages"].setdefault(labels["stage"], {})[labels["tag"]] = {
+            k: round(v * 1000, 3) for k, v in entry.items() if k.startswith("p")}
+    tiers = {dict(labels)["tier"]: n for labels, n in REGISTRY.counter_values("chatbot_resolver_tier_total").items()}
+    total = sum(tiers.values()) or 1
+    result["tier_share"] = {tier: round(n / total, 3) for tier, n in sorted(tiers.items())}
+    return result
+
+
+def bench_test_client(corpus):
+    from flask_server import app
+
+    client = app.test_client()
+    results = {}
+    for endpoint in ("/chatbot_api/", "/chat"):
+        def call(message, endpoint=endpoint):
+            r = client.post(endpoint, json={"message": message})
+            r.get_data()
+
+        results[endpoint] = run_sequential(call, corpus)
+    return results
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def bench_server(corpus, workers, concurrency, db_uri):
+    port = free_port()
+    env = dict(os.environ, UNIVERSITY_DB_URI=db_uri)
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}/chatbot_api/"
+
+    def post(message):
+        body = json.dumps({"message": message}).encode()
+        req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        t = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as r:
+                r.read()
+            ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - t, ok
+
+    try:
+        deadline = time.time() + 120
+        while True:
+            try:
+                post("hello")
+                break
+            except Exception:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError("benchmark server did not start")
+                time.sleep(0.5)
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            list(pool.map(post, ["hello"] * workers * 2))  # warm every worker
+            start = time.perf_counter()
+            outcomes = list(pool.map(post, corpus))
+            elapsed = time.perf_counter() - start
+        rss = tree_rss_kb(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    result = latency_summary([t for t, _ in outcomes])
+    result["errors"] = sum(1 for _, ok in outcomes if not ok)
+    result["requests_per_sec"] = round(len(corpus) / elapsed, 2)
+    result["workers"] = workers
+    result["concurrency"] = concurrency
+    result["server_rss_kb"] = rss
+    return result
+
+
+def serve(port, workers):
+    from werkzeug.serving import run_simple
+    import run
+
+    # one request at a time per process: fine for /chatbot_api/, but an SSE stream
+    # (/chatbot_api/stream/) would block its process, see chat_channel
+    run_simple("127.0.0.1", port, run.app, processes=workers, threaded=False, use_reloader=False)
+
+
+# =============================
+# BASELINE COMPARISON
+# =============================
+
+def flatten(report, prefix=""):
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)):
+            yield name, value
+
+
+def compare(report, baseline, tolerance):
+    """Returns the metrics that got worse than the baseline by more than `tolerance`."""
+    current = dict(flatten(report))
+    regressions = []
+    for name, old in flatten(baseline):
+        new = current.get(name)
+        if new is None or not old:
+            continue
+        if name.endswith("_ms") or name.endswith("_kb"):
+            worse = new > old * (1 + tolerance)
+        elif name.endswith("requests_per_sec"):
+            worse = new < old * (1 - tolerance)
+        else:
+            continue
+        if worse:
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end chatbot benchmark")
+    parser.add_argument("--students", type=int, default=2000, help="students in the seeded fixture")
+    parser.add_argument("--messages", type=int, default=300, help="messages replayed per phase")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="server processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--skip-server", action="store_true")
+    parser.add_argument("--output", help="write the report JSON here")
+    parser.add_argument("--baseline", help="compare against this report JSON")
+    parser.add_argument("--save-baseline", help="write the report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.workers)
+        return
+
+    tmp = tempfile.mkdtemp()
+    db_path = os.path.join(tmp, "bench.db")
+    os.environ.setdefault("CHATBOT_TRANSCRIPT_PATH", os.path.join(tmp, "transcripts.db"))
+    db_uri = f"sqlite:///{db_path}"
+    os.environ["UNIVERSITY_DB_URI"] = db_uri
+    os.environ.setdefault("CHATBOT_LOG_LEVEL", "ERROR")
+    # one client drives all the load, so per-client rate limiting would skew results
+    os.environ.setdefault("CHATBOT_RATE_LIMIT", "0")
+
+    import run  # noqa: F401  registers every route on the shared app
+
+    seed_database(args.students, args.seed)
+    corpus = build_corpus(args.messages, args.seed)
+
+    report = {
+        "config": {"students": args.students, "messages": args.messages, "seed": args.seed},
+        "direct": bench_direct(corpus),
+        "test_client": bench_test_client(corpus),
+    }
+    if not args.skip_server:
+        report["server"] = bench_server(corpus, args.workers, args.concurrency, db_uri)
+    report["process_rss_kb"] = rss_kb()
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text)
+        print(f"✅ Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, old, new in regressions:
+                print(f"   {name}: {old} -> {new}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Cold vs warm first-request latency of a fresh worker.
+
+    python benchmarks/bench_cold_start.py --runs 5
+    python benchmarks/bench_cold_start.py --runs 10 --output cold_start.json
+
+Each run starts a new Python process that imports run.py (as a worker
+would) and sends its first messages to /chatbot_api/ through the Flask test
+client. Messages are misspelled intents.json patterns, so every one goes
+through spell correction, tokenization and the model rather than the exact
+pattern or response cache. Four configurations are compared:
+
+    eager/cold    CHATBOT_TORCHSCRIPT=0 CHATBOT_WARMUP=off (the old behaviour)
+    eager/warm    CHATBOT_TORCHSCRIPT=0 CHATBOT_WARMUP=sync
+    frozen/cold   CHATBOT_TORCHSCRIPT=1 CHATBOT_WARMUP=off
+    frozen/warm   CHATBOT_TORCHSCRIPT=1 CHATBOT_WARMUP=sync
+
+The report has the median start-up time (until the worker could serve),
+first, second and steady-state request latency, and per-call model
+inference time.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+MODES = {
+    "eager/cold": {"CHATBOT_TORCHSCRIPT": "0", "CHATBOT_WARMUP": "off"},
+    "eager/warm": {"CHATBOT_TORCHSCRIPT": "0", "CHATBOT_WARMUP": "sync"},
+    "frozen/cold": {"CHATBOT_TORCHSCRIPT": "1", "CHATBOT_WARMUP": "off"},
+    "frozen/warm": {"CHATBOT_TORCHSCRIPT": "1", "CHATBOT_WARMUP": "sync"},
+}
+INFERENCE_CALLS = 2000
+
+
+def child(messages, seed):
+    """One fresh worker: start-up, then the first `messages` requests. Prints a JSON line."""
+    start = time.perf_counter()
+    import run
+    import chat
+    import torch
+    startup = time.perf_counter() - start
+
+    from bench_chatbot import misspell
+    from intents_compiler import normalize_message
+
+    rng = random.Random(seed)
+    patterns = [p for intent in chat.intents["intents"] for p in intent["patterns"]]
+    corpus = []
+    while len(corpus) < messages:
+        message = misspell(rng.choice(patterns), rng)
+        # exact patterns and repeats are answered without the model
+        if normalize_message(message) not in chat.EXACT_PATTERNS and message not in corpus:
+            corpus.append(message)
+
+    client = run.app.test_client()
+    latencies = []
+    for message in corpus:
+        t = time.perf_counter()
+        client.post("/chatbot_api/", json={"message": message}).get_data()
+        latencies.append(time.perf_counter() - t)
+
+    X = torch.rand(1, chat.input_size)
+    with torch.inference_mode():
+        t = time.perf_counter()
+        for _ in range(INFERENCE_CALLS):
+            chat.model(X)
+        inference = (time.perf_counter() - t) / INFERENCE_CALLS
+
+    print(json.dumps({
+        "startup_s": startup,
+        "first_ms": latencies[0] * 1000,
+        "second_ms": latencies[1] * 1000 if len(latencies) > 1 else None,
+        "steady_ms": statistics.median(latencies[2:]) * 1000 if len(latencies) > 2 else None,
+        "inference_us": inference * 1e6,
+        "torchscript": isinstance(chat.model, torch.jit.ScriptModule),
+        "threads": torch.get_num_threads(),
+    }))
+
+
+def run_mode(env_overrides, runs, messages, seed, tmp):
+    results = []
+    for i in range(runs):
+        env = dict(os.environ, **env_overrides,
+                   UNIVERSITY_DB_URI=f"sqlite:///{os.path.join(tmp, 'cold_start.db')}",
+                   CHATBOT_TRANSCRIPTS="off", CHATBOT_RATE_LIMIT="0", CHATBOT_LOG_LEVEL="ERROR")
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--messages", str(messages), "--seed", str(seed + i)],
+            env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    def median(key):
+        values = [r[key] for r in results if r[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    return {
+        "startup_s": median("startup_s"),
+        "first_ms": median("first_ms"),
+        "second_ms": median("second_ms"),
+        "steady_ms": median("steady_ms"),
+        "inference_us": median("inference_us"),
+        "torchscript": results[0]["torchscript"],
+        "threads": results[0]["threads"],
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold vs warm first-request latency")
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per configuration")
+    parser.add_argument("--messages", type=int, default=20, help="requests sent by each process")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES))
+    parser.add_argument("--output", help="write the report JSON here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.messages, args.seed)
+        return
+
+    tmp = tempfile.mkdtemp()
+    report = {}
+    for mode in args.modes:
+        print(f"⏱ {mode} ({args.runs} runs)...", file=sys.stderr)
+        report[mode] = run_mode(MODES[mode], args.runs, args.messages, args.seed, tmp)
+
+    print(f"\n{'mode':<12} {'startup s':>10} {'first ms':>9} {'second ms':>10} {'steady ms':>10} {'infer us':>9}")
+    for mode, r in report.items():
+        print(f"{mode:<12} {r['startup_s']:>10} {r['first_ms']:>9} {r['second_ms']:>10} "
+              f"{r['steady_ms']:>10} {r['inference_us']:>9}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compares the intent engines on accuracy and latency.
+
+    python benchmarks/bench_engines.py [--messages 2000] [--seed 0] [--json engines.json]
+
+Builds a labelled corpus from the intents.json patterns, each message given
+one or two seeded typos and sometimes a filler word, so none of them is
+answered by the exact-pattern lookup, then classifies it one message at a
+time (as the chatbot does) with:
+
+    mlp              spell correction -> bag of words -> NeuralNet -> fuzzy matching
+    mlp_no_spell     the same without spell correction (what load shedding does)
+    tfidf            nearest pattern in the character n-gram TF-IDF matrix
+
+All three run through classify_batch.classify, so none touches the database.
+The report holds accuracy, the share answered "unknown" and p50/p95/p99
+latency per engine, plus the TF-IDF index build time and size.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from bench_chatbot import latency_summary, misspell
+from classify_batch import classify, load_bot
+from intents_compiler import normalize_message
+from tfidf_engine import TfidfIndex
+
+FILLERS = ["please", "can you tell me", "i want to know", "tell me"]
+
+
+def build_corpus(intents, exact_patterns, size, seed):
+    """[(message, tag)] of misspelled patterns that miss the exact-pattern lookup."""
+    rng = random.Random(seed)
+    labelled = [(p, exact_patterns[normalize_message(p)]) for intent in intents["intents"]
+                for p in intent["patterns"] if normalize_message(p) in exact_patterns]
+    corpus = []
+    while len(corpus) < size:
+        pattern, tag = rng.choice(labelled)
+        message = misspell(pattern, rng)
+        if rng.random() < 0.3:
+            message = misspell(message, rng)
+        if rng.random() < 0.3:
+            message = f"{rng.choice(FILLERS)} {message}" if rng.random() < 0.5 else f"{message} {rng.choice(FILLERS)}"
+        message = message.strip().lower()
+        if normalize_message(message) not in exact_patterns:
+            corpus.append((message, tag))
+    return corpus
+
+
+def run_engine(bot, corpus, spellcheck):
+    samples, correct, unknown = [], 0, 0
+    for message, label in corpus:
+        t = time.perf_counter()
+        result = classify([message], bot, spellcheck)[0]
+        samples.append(time.perf_counter() - t)
+        correct += result["tag"] == label
+        unknown += result["tag"] == "unknown"
+    report = latency_summary(samples)
+    report["accuracy"] = round(correct / len(corpus), 4)
+    report["unknown_rate"] = round(unknown / len(corpus), 4)
+    report["messages_per_sec"] = round(len(corpus) / sum(samples), 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip", nargs="*", default=[], choices=["mlp", "mlp_no_spell", "tfidf"])
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    bot = load_bot(engine="mlp")
+    corpus = build_corpus(bot.intents, bot.exact_patterns, args.messages, args.seed)
+    print(f"📚 {len(corpus)} labelled messages over {len(set(tag for _, tag in corpus))} tags")
+
+    start = time.perf_counter()
+    index = TfidfIndex(bot.intents)
+    build_ms = (time.perf_counter() - start) * 1000
+    report = {"messages": len(corpus),
+              "tfidf_index": {"build_ms": round(build_ms, 1), "patterns": len(index),
+                              "ngrams": len(index.vocab), "nonzeros": len(index.data), "bytes": index.nbytes}}
+    print(f"🔧 TF-IDF index: {len(index)} patterns x {len(index.vocab)} n-grams, "
+          f"{len(index.data)} non-zeros, {index.nbytes / 1024:.0f} KB, built in {build_ms:.0f} ms")
+
+    engines = [("mlp", True), ("mlp_no_spell", False), ("tfidf", True)]
+    for name, spellcheck in engines:
+        if name in args.skip:
+            continue
+        bot.tfidf = index if name == "tfidf" else None
+        report[name] = run_engine(bot, corpus, spellcheck)
+
+    print(f"\n{'engine':14s} {'accuracy':>9s} {'unknown':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'msg/s':>9s}")
+    for name, _ in engines:
+        r = report.get(name)
+        if r:
+            print(f"{name:14s} {r['accuracy']:9.2%} {r['unknown_rate']:8.2%} {r['p50_ms']:8.3f} "
+                  f"{r['p95_ms']:8.3f} {r['p99_ms']:8.3f} {r['messages_per_sec']:9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares loading the pickled data.pth checkpoint with torch.load against
+the memory-mapped data.bin artifact.
+
+    python benchmarks/bench_model_load.py [--repeat 200]
+
+Both files are written to a temporary directory from the same weights
+(taken from data.pth when it exists, otherwise a freshly initialised
+NeuralNet sized from intents.json), so the comparison is like for like.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from model_artifact import load_artifact, save_artifact
+from neural_net import NeuralNet
+from intent_matching import tokenize, stem
+
+
+def build_checkpoint():
+    if os.path.exists("data.pth"):
+        return torch.load("data.pth", map_location="cpu")
+
+    with open("intents.json", "r") as f:
+        intents = json.load(f)
+    words = set()
+    for intent in intents["intents"]:
+        for pattern in intent["patterns"]:
+            words.update(stem(w) for w in tokenize(pattern) if w not in "?!.,")
+    all_words = sorted(words)
+    tags = sorted(set(intent["tag"] for intent in intents["intents"]))
+    model = NeuralNet(len(all_words), 8, len(tags))
+    return {
+        "model_state": model.state_dict(),
+        "input_size": len(all_words),
+        "output_size": len(tags),
+        "hidden_size": 8,
+        "all_words": all_words,
+        "tags": tags,
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{name:<34} median {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    data = build_checkpoint()
+    tmp = tempfile.mkdtemp()
+    pth_path = os.path.join(tmp, "data.pth")
+    bin_path = os.path.join(tmp, "data.bin")
+    torch.save(data, pth_path)
+    save_artifact(bin_path, data["model_state"], data["input_size"], data["hidden_size"],
+                  data["output_size"], data["all_words"], data["tags"])
+
+    probe = data["all_words"][len(data["all_words"]) // 2]
+
+    def torch_load():
+        d = torch.load(pth_path, map_location="cpu")
+        d["all_words"].index(probe)
+
+    def artifact_lazy():
+        a = load_artifact(bin_path)
+        a.vocab.find(probe)
+
+    def artifact_full():
+        a = load_artifact(bin_path)
+        a.vocab.find(probe)
+        a.state_dict()
+
+    print(f"📦 data.pth {os.path.getsize(pth_path):>8} bytes")
+    print(f"📦 data.bin {os.path.getsize(bin_path):>8} bytes")
+    print(f"   vocabulary {data['input_size']} words, {data['output_size']} tags, {args.repeat} runs\n")
+    report("torch.load(data.pth)", timed(torch_load, args.repeat))
+    report("load_artifact (header + vocab)", timed(artifact_lazy, args.repeat))
+    report("load_artifact + state_dict()", timed(artifact_full, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
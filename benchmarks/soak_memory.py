@@ -0,0 +1,378 @@
+"""
+Long-running memory soak test.
+
+    python benchmarks/soak_memory.py --duration 4h --interval 60
+    python benchmarks/soak_memory.py --duration 20m --output soak.json --fail-on-growth
+    python benchmarks/soak_memory.py --url http://127.0.0.1:5000 --duration 8h
+
+Starts one long-lived threaded server on a seeded temporary database (or
+targets --url) with CHATBOT_TRACEMALLOC enabled and drives a mixed load
+against it for --duration:
+
+    chat       /chatbot_api/ and /chat with intents.json-derived messages,
+               a share of them from new visitors (fresh session cookie)
+    download   holiday and syllabus downloads
+    admin      student / teacher / course / holiday / admission pages and APIs
+    results    bulk result lookups
+
+After --warmup the worker's tracemalloc baseline is reset. Every --interval
+seconds the harness records worker RSS and the allocation sites that grew
+since that baseline (from /debug/memory), appending one line per sample to
+--timeline. At the end it fits the RSS trend (MB/hour) and flags allocation
+sites that kept growing across the run rather than filling once, e.g. an
+unbounded cache or per-request state that is never released.
+"""
+import argparse
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import requests
+
+from bench_chatbot import DEPARTMENTS, ROOT, build_corpus, free_port, latency_summary, rss_kb, seed_database
+
+TRAFFIC_MIX = {"chat": 0.6, "admin": 0.2, "download": 0.15, "results": 0.05}
+ADMIN_PATHS = [
+    "/students/", "/teachers/", "/courses/", "/holidays/", "/admissions/",
+    "/admissions/analytics/", "/admissions/analytics/api/", "/courses/names",
+    "/courses/syllabus/list",
+] + [f"/students/api/{dept.lower()}/" for dept in DEPARTMENTS]
+NEW_VISITOR_RATE = 0.1
+SAMPLE_SITES = 200
+
+
+def parse_duration(text):
+    """"90", "90s", "20m" or "4h" -> seconds."""
+    units = {"s": 1, "m": 60, "h": 3600}
+    text = str(text).strip().lower()
+    if text and text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+# =============================
+# TRAFFIC
+# =============================
+
+class Traffic:
+    """One client thread's request mix; results are collected per interval."""
+
+    def __init__(self, base_url, corpus, downloads, student_ids, seed):
+        self.base_url = base_url
+        self.corpus = corpus
+        self.downloads = downloads
+        self.student_ids = student_ids
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+
+    def pick(self):
+        r, acc = self.rng.random(), 0.0
+        for kind, share in TRAFFIC_MIX.items():
+            acc += share
+            if r < acc:
+                return kind
+        return "chat"
+
+    def request(self, kind):
+        if kind == "chat":
+            if self.rng.random() < NEW_VISITOR_RATE:
+                self.session.cookies.clear()
+            endpoint = self.rng.choice(("/chatbot_api/", "/chatbot_api/", "/chat"))
+            return self.session.post(self.base_url + endpoint, json={"message": self.rng.choice(self.corpus)},
+                                     timeout=60)
+        if kind == "download":
+            if not self.downloads:
+                return None
+            with self.session.get(self.base_url + self.rng.choice(self.downloads), stream=True, timeout=60) as r:
+                for _ in r.iter_content(64 * 1024):
+                    pass
+                return r
+        if kind == "results":
+            ids = ",".join(self.rng.sample(self.student_ids, min(50, len(self.student_ids))) + ["999999999"])
+            return self.session.get(self.base_url + "/students/results/api/", params={"ids": ids}, timeout=60)
+        return self.session.get(self.base_url + self.rng.choice(ADMIN_PATHS), timeout=60)
+
+
+class Load:
+    def __init__(self, base_url, corpus, downloads, student_ids, concurrency, seed):
+        self.clients = [Traffic(base_url, corpus, downloads, student_ids, seed + i) for i in range(concurrency)]
+        self.stop = threading.Event()
+        self._lock = threading.Lock()
+        self._latency = defaultdict(list)
+        self._status = defaultdict(int)
+        self._errors = defaultdict(int)
+
+    def run(self, client):
+        while not self.stop.is_set():
+            kind = client.pick()
+            start = time.perf_counter()
+            try:
+                response = client.request(kind)
+            except requests.RequestException:
+                with self._lock:
+                    self._errors[kind] += 1
+                continue
+            if response is None:
+                continue
+            with self._lock:
+                self._latency[kind].append(time.perf_counter() - start)
+                self._status[f"{kind}:{response.status_code}"] += 1
+
+    def start(self):
+        self.threads = [threading.Thread(target=self.run, args=(c,), daemon=True) for c in self.clients]
+        for thread in self.threads:
+            thread.start()
+
+    def finish(self):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join(timeout=90)
+
+    def drain(self):
+        """Per-kind latency, status counts and errors since the last drain."""
+        with self._lock:
+            latency, status, errors = self._latency, self._status, self._errors
+            self._latency, self._status, self._errors = defaultdict(list), defaultdict(int), defaultdict(int)
+        return {
+            "requests": {kind: latency_summary(samples) for kind, samples in latency.items()},
+            "status": dict(status),
+            "errors": dict(errors),
+        }
+
+
+# =============================
+# SAMPLING & ANALYSIS
+# =============================
+
+def memory_sample(base_url, token, server_pid, reset=False):
+    params = {"limit": SAMPLE_SITES}
+    if reset:
+        params["reset"] = 1
+    headers = {"X-Diagnostics-Token": token} if token else {}
+    try:
+        r = requests.get(base_url + "/debug/memory", params=params, headers=headers, timeout=120)
+        data = r.json() if r.status_code == 200 else {}
+    except (requests.RequestException, ValueError):
+        data = {}
+    if server_pid:
+        data["rss_bytes"] = rss_kb(server_pid) * 1024
+    return data
+
+
+def slope_per_hour(points):
+    """Least-squares slope of [(seconds, value)] in value units per hour."""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if not var:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / var * 3600
+
+
+def analyse(samples, growth_threshold, steady_share):
+    """RSS trend plus the allocation sites that kept growing after the baseline."""
+    points = [(s["elapsed"], s["rss_bytes"] / 2 ** 20) for s in samples if s.get("rss_bytes")]
+    traced = [(s["elapsed"], s["traced_bytes"] / 2 ** 20) for s in samples if s.get("traced_bytes")]
+    result = {
+        "samples": len(samples),
+        "rss_mb_first": round(points[0][1], 1) if points else None,
+        "rss_mb_last": round(points[-1][1], 1) if points else None,
+        "rss_mb_per_hour": round(slope_per_hour(points), 2),
+        "traced_mb_per_hour": round(slope_per_hour(traced), 2),
+        "growing_sites": [],
+    }
+
+    series = defaultdict(lambda: [0] * len(samples))
+    for i, sample in enumerate(samples):
+        for entry in sample.get("top", []):
+            site = entry["site"] if isinstance(entry["site"], str) else " <- ".join(entry["site"])
+            series[site][i] = entry.get("size_diff", 0)
+
+    for site, sizes in series.items():
+        steps = [b - a for a, b in zip(sizes, sizes[1:])]
+        grew = sum(1 for step in steps if step > 0)
+        # a cache that fills once grows early and then stays flat; a leak keeps growing
+        if sizes[-1] >= growth_threshold and steps and grew / len(steps) >= steady_share:
+            result["growing_sites"].append({
+                "site": site,
+                "growth_bytes": sizes[-1],
+                "growing_intervals": f"{grew}/{len(steps)}",
+                "bytes_per_hour": round(slope_per_hour([(s["elapsed"], v) for s, v in zip(samples, sizes)])),
+            })
+    result["growing_sites"].sort(key=lambda e: e["growth_bytes"], reverse=True)
+    return result
+
+
+# =============================
+# SERVER
+# =============================
+
+def serve(port):
+    from werkzeug.serving import run_simple
+    import run
+
+    # one long-lived threaded process, like a gunicorn worker; forked
+    # per-request processes would hide anything that accumulates
+    run_simple("127.0.0.1", port, run.app, threaded=True, use_reloader=False)
+
+
+def start_server(args, tmp):
+    db_uri = f"sqlite:///{os.path.join(tmp, 'soak.db')}"
+    os.environ["UNIVERSITY_DB_URI"] = db_uri
+    os.environ.setdefault("CHATBOT_TRANSCRIPT_PATH", os.path.join(tmp, "transcripts.db"))
+    os.environ.setdefault("CHATBOT_LOG_LEVEL", "ERROR")
+    seed_database(args.students, args.seed)
+
+    port = free_port()
+    env = dict(os.environ, CHATBOT_TRACEMALLOC=str(args.frames), CHATBOT_RATE_LIMIT="0",
+               CHATBOT_MAX_CONCURRENT=str(max(args.concurrency * 2, 16)))
+    # /debug/memory always needs the token; a fresh one for this server
+    args.token = secrets.token_urlsafe(16)
+    env["CHATBOT_DIAGNOSTICS_TOKEN"] = args.token
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port)],
+                              env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 180
+    while True:
+        try:
+            requests.get(base_url + "/courses/names", timeout=5)
+            return server, base_url
+        except requests.RequestException:
+            if time.time() > deadline or server.poll() is not None:
+                server.kill()
+                raise RuntimeError("soak server did not start")
+            time.sleep(0.5)
+
+
+def discover(base_url, students):
+    """Download URLs and a pool of student IDs to request."""
+    downloads = ["/holidays/download/1/", "/download/holiday/1/"]
+    try:
+        listing = requests.get(base_url + "/courses/syllabus/list", timeout=30).json()
+        downloads += [urlparse(c["syllabus_link"]).path for c in listing.get("courses", [])]
+    except (requests.RequestException, ValueError):
+        pass
+    student_ids = [f"4341210{i:05d}" for i in range(max(students, 1))]
+    return downloads, student_ids
+
+
+def print_summary(analysis, limit):
+    print(f"\n📈 RSS {analysis['rss_mb_first']} MB -> {analysis['rss_mb_last']} MB over {analysis['samples']} samples "
+          f"({analysis['rss_mb_per_hour']:+.2f} MB/hour, traced {analysis['traced_mb_per_hour']:+.2f} MB/hour)")
+    sites = analysis["growing_sites"]
+    if not sites:
+        print("✅ No allocation site kept growing")
+        return
+    print(f"⚠️ {len(sites)} allocation site(s) kept growing:")
+    for entry in sites[:limit]:
+        print(f"   {entry['growth_bytes'] / 1024:>10.1f} KiB  {entry['growing_intervals']:>7}  {entry['site']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory soak test for the chatbot server")
+    parser.add_argument("--duration", default="1h", help="how long to drive load (e.g. 90s, 20m, 4h)")
+    parser.add_argument("--interval", default="60s", help="time between memory samples")
+    parser.add_argument("--warmup", default="2m", help="load before the tracemalloc baseline is taken")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads")
+    parser.add_argument("--students", type=int, default=2000, help="students in the seeded fixture")
+    parser.add_argument("--messages", type=int, default=2000, help="distinct chat messages to draw from")
+    parser.add_argument("--frames", type=int, default=10, help="traceback frames kept by tracemalloc")
+    parser.add_argument("--url", help="soak an already running server (started with CHATBOT_TRACEMALLOC)")
+    parser.add_argument("--token", default=os.environ.get("CHATBOT_DIAGNOSTICS_TOKEN"),
+                        help="CHATBOT_DIAGNOSTICS_TOKEN of the --url server")
+    parser.add_argument("--growth-threshold", type=int, default=256, help="KiB a site must grow to be flagged")
+    parser.add_argument("--steady-share", type=float, default=0.6,
+                        help="share of intervals a site must grow in to be flagged")
+    parser.add_argument("--max-rss-growth", type=float, default=20.0, help="MB/hour of RSS growth tolerated")
+    parser.add_argument("--fail-on-growth", action="store_true", help="exit 1 if RSS or any site kept growing")
+    parser.add_argument("--timeline", help="append one JSON line per sample here")
+    parser.add_argument("--output", help="write the final report JSON here")
+    parser.add_argument("--top", type=int, default=15, help="growing sites to print")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    duration, interval, warmup = (parse_duration(v) for v in (args.duration, args.interval, args.warmup))
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, base_url = start_server(args, tempfile.mkdtemp())
+    server_pid = server.pid if server else None
+
+    downloads, student_ids = discover(base_url, args.students)
+    load = Load(base_url, build_corpus(args.messages, args.seed), downloads, student_ids,
+                args.concurrency, args.seed)
+    timeline = open(args.timeline, "a") if args.timeline else None
+    samples = []
+    try:
+        load.start()
+        print(f"🔥 Warming up for {warmup:.0f}s against {base_url}")
+        time.sleep(warmup)
+        first = memory_sample(base_url, args.token, server_pid, reset=True)
+        if "traced_bytes" not in first:
+            print("⚠️ /debug/memory is not available; only RSS is tracked "
+                  "(start the server with CHATBOT_TRACEMALLOC=10 and CHATBOT_DIAGNOSTICS_TOKEN, and pass --token)")
+        load.drain()
+
+        start = time.time()
+        while time.time() - start < duration:
+            time.sleep(min(interval, max(duration - (time.time() - start), 0)))
+            sample = memory_sample(base_url, args.token, server_pid)
+            sample["elapsed"] = round(time.time() - start, 1)
+            sample.update(load.drain())
+            samples.append(sample)
+            if timeline:
+                timeline.write(json.dumps(sample) + "\n")
+                timeline.flush()
+            print(f"⏱ {sample['elapsed']:>8.0f}s  rss {sample.get('rss_bytes', 0) / 2 ** 20:8.1f} MB  "
+                  f"traced {sample.get('traced_bytes', 0) / 2 ** 20:8.1f} MB  "
+                  f"requests {sum(v.get('count', 0) for v in sample['requests'].values()):>6}  "
+                  f"errors {sum(sample['errors'].values())}")
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted, reporting the samples so far")
+    finally:
+        load.finish()
+        if timeline:
+            timeline.close()
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    analysis = analyse(samples, args.growth_threshold * 1024, args.steady_share)
+    report = {
+        "config": {"duration_s": duration, "interval_s": interval, "warmup_s": warmup,
+                   "concurrency": args.concurrency, "students": args.students, "url": args.url,
+                   "traffic_mix": TRAFFIC_MIX},
+        "analysis": analysis,
+        "status": {key: sum(s["status"].get(key, 0) for s in samples)
+                   for key in sorted({k for s in samples for k in s["status"]})},
+    }
+    print_summary(analysis, args.top)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+
+    if args.fail_on_growth and (analysis["growing_sites"] or analysis["rss_mb_per_hour"] > args.max_rss_growth):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,99 @@
+import logging
+import os
 import random
-import json
 import torch
 from flask import Flask, send_file, request, jsonify
 from flask_cors import CORS
-from rapidfuzz import process
 from io import BytesIO
 from textblob import TextBlob 
-from neural_net import NeuralNet
-from flask_server.university.nlp_utils import bag_of_words, tokenize
+from model_registry import ModelRegistry, load_intent_model
+from model_serving import run_warmup, warm_model
+from intents_compiler import load_intents, normalize_message
+from metrics import REGISTRY, StageTimer, sampled_profile
+from shared_cache import Cache
+from tenants import DEFAULT_TENANT, TENANTS, current_tenant
+from transcript_log import transcripts
+from chat_channel import join_response
+from load_shedding import DEGRADE_NONE, DEGRADE_NO_SPELLCHECK, DEGRADE_NO_FUZZY, DEGRADE_CACHED_ONLY
+from intent_matching import CONFIDENCE_THRESHOLD, DB_TAGS, bag_of_words, get_best_match, tokenize
+from tfidf_engine import ENGINE, MIN_SCORE as TFIDF_MIN_SCORE
 from flask_server import db
-from flask_server.university.models import Student, Holidays, Teacher, Course  # Import DB models
+from flask_server.university import rosters
+from flask_server.university.reference_data import reference
+from flask_server.university.syllabus import answer_topic_question
 
-# Load intents.json
-INTENTS_FILE = "intents.json"
-with open(INTENTS_FILE, 'r') as json_data:
-    intents = json.load(json_data)
+logger = logging.getLogger(__name__)
 
 # Set device
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
 # Load trained model
-MODEL_FILE = "data.pth"
-data = torch.load(MODEL_FILE, map_location=device)
+MODEL_FILE = "data.bin"
+LEGACY_MODEL_FILE = "data.pth"
 
-input_size = data['input_size']
-output_size = data['output_size']
-hidden_size = data['hidden_size']
-all_words = data['all_words']
-tags = data['tags']
-model_state = data['model_state']
+# Intents.json (deduplicated intents.compiled.json when it is up to date) and the model of the default tenant
+default_model = load_intent_model(DEFAULT_TENANT, load_intents(), MODEL_FILE, device, LEGACY_MODEL_FILE)
+# the default model's parts, as used by warm_up() and the benchmarks
+intents = default_model.intents
+model = default_model.model
+input_size = default_model.input_size
+all_words = default_model.all_words
+tags = default_model.tags
+MODEL_VERSION = default_model.version
+EXACT_PATTERNS = default_model.exact_patterns
+INTENT_RESPONSES = default_model.intent_responses
 
-model = NeuralNet(input_size, hidden_size, output_size)
-model.load_state_dict(model_state)
-model.eval()
-model.to(device)
 
-# Define a list of known departments
-DEPARTMENTS = ["CSBS", "IT", "CSE", "ECE", "EEE", "MECH", "AIDS", "AIML"]
+def _load_tenant_model(name):
+    """Loads a tenant's own intents and model; None when it shares the default one."""
+    tenant = TENANTS[name]
+    if not (tenant.intents and tenant.model):
+        if tenant.intents or tenant.model:
+            logger.warning("⚠️ Tenant %s needs both intents and model to use its own; using the default", name)
+        return None
+    compiled = os.path.splitext(tenant.intents)[0] + ".compiled.json"
+    return load_intent_model(name, load_intents(tenant.intents, compiled, use_env=False), tenant.model, device)
+
+
+models = ModelRegistry(default_model, _load_tenant_model)
+
+
+def current_model():
+    """The IntentModel of the current request's tenant."""
+    return models.get(current_tenant())
+
+
+FALLBACK_RESPONSE = "I'm sorry, but I couldn't understand your query. Please verify your question and try again."
+BUSY_RESPONSE = "I'm handling a lot of questions right now. Please try again in a moment."
+
+# =============================
+# FAST PATH (exact patterns & recent messages)
+# =============================
+RESPONSE_CACHE_SIZE = int(os.environ.get("CHATBOT_RESPONSE_CACHE_SIZE", "2048"))
+
+# ✅ Tags are keyed on the tenant and model file too, so a retrained model never reuses old answers
+response_cache = Cache("chat_responses", RESPONSE_CACHE_SIZE)
+REGISTRY.describe("chatbot_resolver_tier_total", "Chatbot requests answered by each resolver tier.")
 
-def get_best_match(user_input, intents):
-    """
-    Finds the closest matching intent using exact matching first, then fuzzy matching.
-    Returns the best match if similarity is above 70% for fuzzy match.
-    """
-    # First, check for an exact match in the patterns
-    for intent in intents["intents"]:
-        for pattern in intent["patterns"]:
-            if user_input.lower().strip() == pattern.lower().strip():
-                return intent["tag"]  # Exact match found
-
-    # If no exact match, proceed with fuzzy matching
-    best_match_score = 0
-    best_match_tag = None
-
-    # Iterate through intents for fuzzy matching
-    for intent in intents["intents"]:
-        for pattern in intent["patterns"]:
-            score = process.extractOne(user_input, [pattern], score_cutoff=70)  # Fuzzy matching
-
-            if score and score[1] > best_match_score:
-                best_match_score = score[1]
-                best_match_tag = intent["tag"]
-
-    # Return the best match if fuzzy score is above threshold
-    if best_match_score >= 70:
-        return best_match_tag
-    else:
-        return None  # No suitable match found
 
+def _cache_token(bot):
+    # the engine is part of the token too, so switching CHATBOT_ENGINE never reuses the other one's tags
+    # ("answer" marks the (tag, reply) entries, unlike the bare tags cached before)
+    return f"{ENGINE}:{bot.version}:answer"
 
-def fetch_data_from_db(tag, user_input):
+
+def find_department(user_input):
+    """Returns the first known department mentioned in the input, if any."""
+    return reference().find_department(user_input)
+
+
+def fetch_data_from_db(tag, user_input, state=None):
     """
     Retrieves data from the database based on the predicted tag.
-    Returns plain text responses along with full download links.
+    Returns plain text responses along with site-relative download links.
+    When the answer is a question back to the user, the pending slot is
+    recorded in the conversation `state` (see session_store).
     """
-    BASE_URL = "http://127.0.0.1:5000"
-
     # ===========================  
     # STUDENT DETAILS HANDLING  
     # ===========================  
@@ -83,26 +101,19 @@ def fetch_data_from_db(tag, user_input):
         user_input_lower = user_input.lower().strip()
 
         if user_input_lower == "all students":
-            students = Student.query.all()
-            return "\n".join([
-                f"{i+1}. *{s.name}* ({s.course.name if s.course else 'No Course'})"
-                for i, s in enumerate(students)
-            ]) or "No students found.", tag
+            return rosters.page(state, "students", empty="No students found."), tag
 
         # Extract course name from user input
         if "student details of" in user_input_lower:
             user_course_name = user_input_lower.replace("student details of", "").strip()
-            course = Course.query.filter(Course.name.ilike(f"%{user_course_name}%")).first()
+            course = reference().find_course(user_course_name)
 
             if course:
-                students = Student.query.filter_by(course_id=course.course_id).all()
-                if students:
-                    response = f"📌 *Student details of {course.name}:*\n"
-                    response += format_students_response(course.name, students)
-                    return response, tag
-                return f"❌ No students found for *{course.name}*.", tag
-
-            available_courses = ", ".join(c.name for c in Course.query.all())
+                return rosters.page(state, "students", course.course_id,
+                                    title=f"📌 *Student details of {course.name}:*\n",
+                                    empty=f"❌ No students found for *{course.name}*."), tag
+
+            available_courses = ", ".join(reference().course_names)
             return (
                 f"⚠ *Course '{user_course_name}' not found.*\n\n"
                 f"📚 Available courses:\n{available_courses}\n\n"
@@ -110,7 +121,9 @@ def fetch_data_from_db(tag, user_input):
                 tag
             )
 
-        available_courses = ", ".join(c.name for c in Course.query.all())
+        if state is not None:
+            state["pending"] = {"intent": "students", "slot": "course"}
+        available_courses = ", ".join(reference().course_names)
         return (
             f"Please specify a course.\n"
             f"📚 Available Courses: {available_courses}\n\n"
@@ -121,43 +134,28 @@ def fetch_data_from_db(tag, user_input):
     # HOLIDAY LIST HANDLING  
     # ===========================  
     elif tag == "holidays":
-        holidays = Holidays.query.all()
-        if holidays:
-            return "\n".join([
-                f"📅 {h.year}: {h.file_name}\n"
-                f"🔗 Download: {BASE_URL}/download/holiday/{h.id}"
-                for h in holidays
-            ]), tag
-        return "No holiday records available.", tag
+        return rosters.page(state, "holidays", empty="No holiday records available."), tag
 
     # ===========================  
     # FACULTY DETAILS HANDLING  
     # ===========================  
     elif tag == "faculty":
         if "all faculty" in user_input.lower():
-            teachers = Teacher.query.all()
-            return "\n".join([
-                f"{i+1}. *{t.first_name} {t.last_name}* ({t.department})"
-                for i, t in enumerate(teachers)
-            ]) or "No faculty found.", tag
+            return rosters.page(state, "faculty", empty="No faculty found."), tag
 
         # Extract department name from user input
-        department = next((dept for dept in DEPARTMENTS if dept.lower() in user_input.lower()), None)
-        
+        department = find_department(user_input)
+
         if department:
-            teachers = Teacher.query.filter_by(department=department).all()
-            if teachers:
-                response = f"📌 *Faculty details of {department}:*\n"
-                response += "\n".join([
-                    f"{i+1}. *{t.first_name} {t.last_name}*"
-                    for i, t in enumerate(teachers)
-                ])
-                return response, tag
-            return f"❌ No faculty found for *{department}* department.", tag
+            return rosters.page(state, "faculty", department,
+                                title=f"📌 *Faculty details of {department}:*\n",
+                                empty=f"❌ No faculty found for *{department}* department."), tag
 
+        if state is not None:
+            state["pending"] = {"intent": "faculty", "slot": "department"}
         return (
             "Which department's faculty list do you want?\n"
-            f"👤 Available Departments: {', '.join(DEPARTMENTS)}\n\n"
+            f"👤 Available Departments: {', '.join(reference().departments)}\n\n"
             "➡ Type: *[Department Name] faculty*",
             tag
         )
@@ -166,7 +164,7 @@ def fetch_data_from_db(tag, user_input):
     # COURSE DETAILS HANDLING  
     # ===========================  
     elif tag == "courses":
-        courses = Course.query.all()
+        courses = reference().courses
         return "\n".join([
             f"{i+1}. *{c.name}* ({c.duration})"
             for i, c in enumerate(courses)
@@ -176,72 +174,219 @@ def fetch_data_from_db(tag, user_input):
     # COURSE SYLLABUS HANDLING  
     # ===========================  
     elif tag == "course_syllabus":
-        courses = Course.query.filter(Course.syllabus.isnot(None)).all()
+        courses = [c for c in reference().courses if c.has_syllabus]
         if courses:
             return "\n".join([
-                f"📚 *{c.name}* ({c.duration})\n🔗 Download: {BASE_URL}/download/syllabus/{c.course_id}"
+                f"📚 *{c.name}* ({c.duration})\n🔗 Download: /download/syllabus/{c.course_id}"
                 for c in courses
             ]), tag
         return "No syllabus files available.", tag
 
     return None, tag
 
-def format_students_response(course_name, students):
-    """Formats the response for student queries."""
-    if students:
-        return "\n".join([
-           f"{i+1}. *{s.name}* (ID: {s.id}) - CGPA: {s.cgpa if s.cgpa else 'N/A'}"
-            for i, s in enumerate(students)
-        ])
-    else:
-        return f"❌ No students found for *{course_name}*."
+def resume_pending(pending, msg):
+    """
+    Maps a follow-up answer onto the intent the previous turn asked about,
+    so it skips spell correction and classification.
+    Returns (tag, msg), or (None, msg) if the answer does not fill the slot.
+    """
+    tag = None
+    if pending["slot"] == "student_id":
+        tag = "result"
+
+    elif pending["slot"] == "department":
+        department = find_department(msg)
+        if department:
+            tag, msg = "faculty", f"{department.lower()} faculty"
+
+    elif pending["slot"] == "course":
+        course = reference().find_course(msg)
+        if course:
+            tag, msg = "students", f"student details of {course.name.lower()}"
+
+    if tag:
+        REGISTRY.inc("chatbot_resolver_tier_total", tier="session")
+    return tag, msg
+
+
+def static_response(tag):
+    """Picks one of the tenant's intents.json responses for `tag`."""
+    responses = current_model().intent_responses.get(tag)
+    return random.choice(responses) if responses else None
+
 
-def get_bot_response(sentence):
+def answer_for_tag(tag, sentence, state=None):
+    """Builds the reply for an already-known tag: database first, then intents.json."""
+    db_response, tag = fetch_data_from_db(tag, sentence, state)
+    if db_response:
+        return db_response, tag
+    return static_response(tag) or FALLBACK_RESPONSE, tag
+
+
+def get_bot_response(sentence, state=None, degradation=DEGRADE_NONE):
     """
     Processes the user input and returns a chatbot response.
+    Student, faculty and holiday lists come back as a generator of chunks
+    (see rosters); everything else is a string.
+    Each stage is timed into the `chatbot_stage_seconds` summary.
+    `state` is the caller's conversation state, where follow-up questions
+    record their pending slot (the caller resolves it with resume_pending).
+    `degradation` is a load_shedding level that skips costly stages under load.
+    """
+    timer = StageTimer()
+    with sampled_profile():
+        response, tag = _resolve_response(sentence, timer, state, degradation)
+    elapsed = timer.finish(tag)
+    transcripts.record(sentence, tag, timer, elapsed * 1000)
+    return response, tag
+
+
+def _resolve_response(sentence, timer, state, degradation):
+    logger.debug("🟢 Processing input: %s", sentence)
+
+    # ✅ The tenant's model, loaded on its first message
+    with timer.stage("model_lookup"):
+        bot = current_model()
+
+    # ✅ Exact pattern or recently seen message: skip the NLP pipeline
+    key = normalize_message(sentence)
+    with timer.stage("fast_path"):
+        tier, tag, reply = "exact", bot.exact_patterns.get(key), None
+        if tag is None:
+            # (tag, reply): the intents.json reply given the first time, or None
+            # for tags answered from the database, which are looked up again
+            tier, (tag, reply) = "cache", response_cache.get((bot.name, key), _cache_token(bot)) or (None, None)
+        if reply is not None:
+            response = reply, tag
+        elif tag is not None:
+            response = answer_for_tag(tag, sentence, state)
+    if tag is not None:
+        timer.details["tier"] = tier
+        REGISTRY.inc("chatbot_resolver_tier_total", tier=tier)
+        return response
+
+    if degradation >= DEGRADE_CACHED_ONLY:
+        timer.details["tier"] = "shed"
+        REGISTRY.inc("chatbot_resolver_tier_total", tier="shed")
+        return BUSY_RESPONSE, "busy"
+
+    # ✅ "Does CSE cover compiler design?" is answered from the syllabus index
+    with timer.stage("syllabus_lookup"):
+        response = answer_topic_question(sentence)
+    if response:
+        timer.details["tier"] = "syllabus"
+        REGISTRY.inc("chatbot_resolver_tier_total", tier="syllabus")
+        return response, "syllabus_topic"
+
+    response, tag, tier, reply = _classify(sentence, timer, state, degradation, bot)
+    timer.details["tier"] = tier
+    REGISTRY.inc("chatbot_resolver_tier_total", tier=tier)
+    if tag != "unknown":
+        response_cache.put((bot.name, key), (tag, reply), _cache_token(bot))
+    return response, tag
+
+
+def _classify(sentence, timer, state, degradation, bot):
     """
-    print(f"🟢 Processing input: {sentence}")
+    Spell correction -> bag of words -> NeuralNet, with fuzzy matching on low
+    confidence; or the TF-IDF engine when CHATBOT_ENGINE=tfidf.
+    Returns (response, tag, tier, reply); reply is the intents.json reply to
+    cache, None when the answer came from the database.
+    """
+    if bot.tfidf is not None:
+        return _classify_tfidf(sentence, timer, state, bot)
 
     # ✅ Auto-correct spelling mistakes before processing
-    corrected_sentence = str(TextBlob(sentence).correct())
+    if degradation >= DEGRADE_NO_SPELLCHECK:
+        corrected_sentence = sentence
+    else:
+        with timer.stage("spell_correction"):
+            corrected_sentence = str(TextBlob(sentence).correct())
+    timer.details["corrected"] = corrected_sentence
 
     # ✅ Tokenize the corrected sentence
-    tokenized_sentence = tokenize(corrected_sentence)
+    with timer.stage("tokenize"):
+        tokenized_sentence = tokenize(corrected_sentence)
 
     # ✅ Convert to bag of words
-    X = bag_of_words(tokenized_sentence, all_words)
-    X = X.reshape(1, X.shape[0])
-    X = torch.from_numpy(X).to(device)
+    with timer.stage("bag_of_words"):
+        X = bag_of_words(tokenized_sentence, bot.all_words)
+        X = X.reshape(1, X.shape[0])
+        X = torch.from_numpy(X).to(bot.device)
 
     # ✅ Get model prediction
-    output = model(X)
-    _, predicted = torch.max(output, dim=1)
-    tag = tags[predicted.item()]
+    with timer.stage("inference"), torch.inference_mode():
+        output = bot.model(X)
+        _, predicted = torch.max(output, dim=1)
+        tag = bot.tags[predicted.item()]
 
-    # ✅ Calculate confidence score
-    probs = torch.softmax(output, dim=1)
-    prob = probs[0][predicted.item()]
+        # ✅ Calculate confidence score
+        probs = torch.softmax(output, dim=1)
+        prob = probs[0][predicted.item()]
+    timer.details["probability"] = prob.item()
 
     # ✅ If confidence is high, fetch database response
-    if prob.item() > 0.80:
-        db_response, tag = fetch_data_from_db(tag, sentence)
+    if prob.item() > CONFIDENCE_THRESHOLD:
+        with timer.stage("db_fetch"):
+            db_response, tag = fetch_data_from_db(tag, sentence, state)
         if db_response:
-            print(f"🟢 Database Response: {db_response}")
-            return db_response, tag
+            logger.debug("🟢 Database Response: %s", db_response)
+            return db_response, tag, "model", None
 
     # ✅ Use fuzzy matching if confidence is low
-    tag = get_best_match(sentence, intents)
+    if degradation >= DEGRADE_NO_FUZZY:
+        tag = None
+    else:
+        with timer.stage("fuzzy_match"):
+            tag = get_best_match(sentence, bot.intents)
 
-    if tag:
-        for intent in intents["intents"]:
-            if tag == intent["tag"]:
-                response = random.choice(intent["responses"])
-                print(f"🟢 Response: {response} | Intent: {tag}")
-                return response, tag
+    # ✅ Database tags are answered from the database here too, so callers never build them again
+    if tag in DB_TAGS:
+        with timer.stage("db_fetch"):
+            db_response, tag = fetch_data_from_db(tag, sentence, state)
+        if db_response:
+            return db_response, tag, "fuzzy", None
+
+    response = static_response(tag) if tag else None
+    if response:
+        logger.debug("🟢 Response: %s | Intent: %s", response, tag)
+        return response, tag, "fuzzy", response
 
     # ✅ Fallback response if no confident match is found
-    print("⚠️ No confident match found. Returning fallback response.")
-    return "I'm sorry, but I couldn't understand your query. Please verify your question and try again.", "unknown"
+    logger.info("⚠️ No confident match found for %r. Returning fallback response.", sentence)
+    return FALLBACK_RESPONSE, "unknown", "unknown", None
+
+def _classify_tfidf(sentence, timer, state, bot):
+    """CHATBOT_ENGINE=tfidf: the nearest intents.json pattern by character n-grams (see tfidf_engine)."""
+    with timer.stage("tfidf_match"):
+        tag, score = bot.tfidf.classify(sentence)
+    timer.details["probability"] = score
+
+    if tag is not None and score >= TFIDF_MIN_SCORE:
+        with timer.stage("db_fetch"):
+            response, tag = fetch_data_from_db(tag, sentence, state)
+        if response:
+            return response, tag, "tfidf", None
+        response = static_response(tag)
+        if response:
+            return response, tag, "tfidf", response
+
+    logger.info("⚠️ No confident match found for %r. Returning fallback response.", sentence)
+    return FALLBACK_RESPONSE, "unknown", "unknown", None
+
+def warm_up():
+    """
+    Dummy inferences and one spell correction / tokenize / fuzzy-match pass,
+    without touching the database, the response cache or the metrics.
+    """
+    warm_model(model, input_size, device)
+    sample = "helo, wat are the colege timngs?"
+    X = bag_of_words(tokenize(str(TextBlob(sample).correct())), all_words)
+    with torch.inference_mode():
+        model(torch.from_numpy(X.reshape(1, X.shape[0])).to(device))
+    get_best_match(sample, intents)
+    if default_model.tfidf is not None:
+        default_model.tfidf.classify(sample)
 
 app = Flask(__name__)
 CORS(app)  
@@ -250,8 +395,10 @@ CORS(app)
 def chat():
     user_input = request.json.get("message")
     response, tag = get_bot_response(user_input)
-    return jsonify({"response": response, "tag": tag})
+    return jsonify(join_response({"response": response, "tag": tag}))
 
 if __name__ == "__main__":
-    print("✅ Chatbot is ready!")
+    logging.basicConfig(level=os.environ.get("CHATBOT_LOG_LEVEL", "INFO"))
+    run_warmup(warm_up)
+    logger.info("✅ Chatbot is ready!")
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,203 @@
+"""
+Server-sent-events channel for the chat widget.
+
+The browser keeps one EventSource open on /chatbot_api/stream/ and posts
+each message to /chatbot_api/stream/send. Answers are pushed back over the
+stream as `start`, one or more `part` and an `end` event, so long answers
+render as they are produced and each message costs one small POST instead of
+a full JSON round trip.
+
+Every stream has a channel id (sent in the first `hello` event). Events are
+numbered and the last REPLAY_SIZE are kept, so a client that reconnects with
+?channel=<id>&last_event_id=<n> receives what it missed. Idle streams get a
+`ping` event every HEARTBEAT_INTERVAL seconds and are closed after
+STREAM_MAX_AGE seconds (the client reconnects), so a dead connection is
+noticed within a heartbeat or two.
+
+Each open stream holds one server thread (or greenlet) for as long as it is
+open, so streams need a threaded or async worker: gunicorn --threads N or
+-k gevent, or run_simple(threaded=True). A sync worker serving a stream can
+answer nothing else until it closes. At most MAX_STREAMS streams are open
+per worker; past that a stream gets one `busy` event and ends, and the
+client sends messages without a channel, answered inline, until it retries
+BUSY_RETRY_MS later. Keep MAX_STREAMS below the worker's thread count so
+plain requests still get a thread.
+
+Channels live in the worker process that serves the stream. A message
+posted to another worker is answered inline in the POST response instead.
+
+    CHATBOT_SSE_HEARTBEAT    seconds between heartbeats (default 15)
+    CHATBOT_SSE_MAX_AGE      seconds before a stream is recycled (default 300)
+    CHATBOT_SSE_MAX_STREAMS  open streams per worker (default 50)
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+from metrics import REGISTRY
+
+HEARTBEAT_INTERVAL = float(os.environ.get("CHATBOT_SSE_HEARTBEAT", "15"))
+STREAM_MAX_AGE = float(os.environ.get("CHATBOT_SSE_MAX_AGE", "300"))
+MAX_STREAMS = int(os.environ.get("CHATBOT_SSE_MAX_STREAMS", "50"))
+BUSY_RETRY_MS = 60000
+RETRY_MS = 3000
+REPLAY_SIZE = 64
+CHANNEL_TTL = 600  # seconds a channel without a listener is kept for reconnects
+
+REGISTRY.describe("chatbot_sse_streams", "Open chat event streams in this worker.")
+REGISTRY.describe("chatbot_sse_events_total", "Events pushed over chat event streams.")
+REGISTRY.describe("chatbot_sse_rejected_total", "Streams turned away because the worker had MAX_STREAMS open.")
+
+
+class Channel:
+    """Numbered events for one browser tab, with a short replay buffer."""
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.listeners = 0
+        self.last_active = time.monotonic()
+        self._events = deque(maxlen=REPLAY_SIZE)
+        self._next_id = 1
+        self._cond = threading.Condition()
+
+    def publish(self, event, data):
+        with self._cond:
+            event_id = self._next_id
+            self._next_id += 1
+            self._events.append((event_id, event, data))
+            self._cond.notify_all()
+        REGISTRY.inc("chatbot_sse_events_total", event=event)
+        return event_id
+
+    def events_after(self, last_id, timeout):
+        """Events newer than `last_id`, waiting up to `timeout` seconds for one."""
+        with self._cond:
+            if not self._events or self._events[-1][0] <= last_id:
+                self._cond.wait(timeout)
+            return [e for e in self._events if e[0] > last_id]
+
+
+class ChannelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._open_streams = 0
+
+    def open(self, channel_id=None):
+        """Returns the existing channel for `channel_id`, or a new one."""
+        now = time.monotonic()
+        with self._lock:
+            # drop channels nobody has listened to for a while
+            for cid in [cid for cid, c in self._channels.items()
+                        if not c.listeners and now - c.last_active > CHANNEL_TTL]:
+                del self._channels[cid]
+            channel = self._channels.get(channel_id) if channel_id else None
+            if channel is None:
+                channel = Channel(secrets.token_urlsafe(16))
+                self._channels[channel.id] = channel
+            channel.last_active = now
+            return channel
+
+    def resume(self, channel_id, last_event_id=0):
+        """
+        (channel, last event id to replay after) for a reconnecting stream.
+        An unknown or expired `channel_id` (another worker, a restart) gets a
+        new channel, which numbers its events from 1, so the client's old
+        last event id no longer applies.
+        """
+        channel = self.open(channel_id)
+        return channel, (last_event_id if channel.id == channel_id else 0)
+
+    def listening(self, channel_id):
+        """The channel if a stream for it is open in this worker, else None."""
+        with self._lock:
+            channel = self._channels.get(channel_id)
+        return channel if channel is not None and channel.listeners else None
+
+    def _attach(self, channel, delta, limit=None):
+        """Adds or removes a listener; False, changing nothing, if `limit` streams are already open."""
+        with self._lock:
+            if delta > 0 and limit is not None and self._open_streams >= limit:
+                return False
+            channel.listeners += delta
+            channel.last_active = time.monotonic()
+            self._open_streams += delta
+            REGISTRY.set("chatbot_sse_streams", self._open_streams)
+            return True
+
+
+channels = ChannelRegistry()
+
+
+def format_event(event_id, event, data):
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream(channel, last_event_id=0):
+    """The text/event-stream body for one EventSource connection."""
+    # counted once the body is iterated, so an unsent response never holds a slot
+    if not channels._attach(channel, +1, MAX_STREAMS):
+        REGISTRY.inc("chatbot_sse_rejected_total")
+        yield f"event: busy\ndata: {json.dumps({'retry_ms': BUSY_RETRY_MS})}\n\n"
+        return
+    try:
+        yield f"retry: {RETRY_MS}\n"
+        yield f"event: hello\ndata: {json.dumps({'channel': channel.id})}\n\n"
+        deadline = time.monotonic() + STREAM_MAX_AGE
+        last_id = last_event_id
+        while time.monotonic() < deadline:
+            events = channel.events_after(last_id, HEARTBEAT_INTERVAL)
+            if not events:
+                # keeps proxies from closing an idle connection and lets the client
+                # notice a dead one; no id, so Last-Event-ID is unchanged
+                yield "event: ping\ndata: {}\n\n"
+                continue
+            for event_id, event, data in events:
+                yield format_event(event_id, event, data)
+                last_id = event_id
+    finally:
+        channels._attach(channel, -1)
+
+
+def publish_answer(channel, payload):
+    """
+    Pushes one answer as start / part... / end events and returns its message id.
+    payload["response"] may be a string or an iterable of HTML/text chunks,
+    which are pushed as they are produced.
+    """
+    message_id = secrets.token_hex(6)
+    channel.publish("start", {"id": message_id})
+    response = payload.get("response")
+    chunks = [response] if response is None or isinstance(response, str) else response
+    meta = {k: v for k, v in payload.items() if k != "response"}
+    try:
+        for chunk in chunks:
+            channel.publish("part", {"id": message_id, "text": chunk})
+    finally:
+        # the client always gets an end event, even if producing a chunk failed
+        channel.publish("end", dict(meta, id=message_id))
+    return message_id
+
+
+def join_response(payload):
+    """The payload with an iterable response collected into one string."""
+    response = payload.get("response")
+    if response is None or isinstance(response, str):
+        return payload
+    return dict(payload, response="".join(response))
+
+
+def json_chunks(payload):
+    """
+    The payload as a JSON object whose "response" string is written chunk by
+    chunk, for a streamed HTTP body; the other keys follow it.
+    """
+    yield '{"response": "'
+    for chunk in payload.get("response") or ():
+        if chunk:
+            yield json.dumps(chunk, ensure_ascii=False)[1:-1]
+    meta = {k: v for k, v in payload.items() if k != "response"}
+    yield '"' + (", " + json.dumps(meta, ensure_ascii=False)[1:-1] if meta else "") + "}"
@@ -0,0 +1,274 @@
+"""
+Classifies a file of messages offline, across a process pool.
+
+    python classify_batch.py messages.txt                                # one message per line, JSONL to stdout
+    python classify_batch.py transcripts.jsonl --out tags.csv --workers 8
+    python classify_batch.py labelled.csv --label-field intent --confusion confusion.csv
+    python classify_batch.py labelled.csv --engine tfidf                 # the TF-IDF engine instead
+
+Input is plain text (one message per line), JSONL or CSV (the `message`
+field, plus a label field when present, e.g. a `transcript_log.py export`).
+The file is read in batches that are handed to worker processes as they
+free up, so memory stays flat however long it is. Each worker loads the
+intents and model once and runs the chatbot's pipeline without the app or
+database: exact pattern, spell correction -> bag of words -> NeuralNet (one
+forward pass per batch), then fuzzy matching on low confidence; or, with
+--engine tfidf, the nearest pattern from tfidf_engine.
+
+Every message gets a line of message, tag, probability, tier (exact, model,
+fuzzy, tfidf or unknown), model_tag and corrected text, in input order.
+Throughput and the tier counts go to stderr; with labels, so do the accuracy
+and the most frequent confusions, and --confusion writes the full matrix as CSV.
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import torch
+from textblob import TextBlob
+
+from intent_matching import CONFIDENCE_THRESHOLD, DB_TAGS, bag_of_words, get_best_match, tokenize
+from intents_compiler import load_intents, normalize_message
+from model_registry import load_intent_model
+from tfidf_engine import ENGINE, ENGINES, MIN_SCORE as TFIDF_MIN_SCORE
+
+MODEL_FILE = "data.bin"
+LEGACY_MODEL_FILE = "data.pth"
+BATCH_SIZE = 256
+OUTPUT_FIELDS = ["message", "label", "tag", "probability", "tier", "model_tag", "corrected"]
+
+
+# =============================
+# PIPELINE
+# =============================
+
+def classify(messages, bot, spellcheck=True):
+    """One result dict per message, for an IntentModel `bot`."""
+    results = [None] * len(messages)
+    todo = []
+    for i, message in enumerate(messages):
+        tag = bot.exact_patterns.get(normalize_message(message))
+        if tag is not None:
+            results[i] = {"tag": tag, "probability": 1.0, "tier": "exact", "model_tag": None, "corrected": message}
+        else:
+            todo.append(i)
+    if not todo:
+        return results
+    if bot.tfidf is not None:
+        for i in todo:
+            results[i] = _classify_tfidf(messages[i], bot)
+        return results
+
+    corrected = [str(TextBlob(messages[i]).correct()) if spellcheck else messages[i] for i in todo]
+    X = np.stack([bag_of_words(tokenize(text), bot.all_words) for text in corrected])
+    with torch.inference_mode():
+        probs = torch.softmax(bot.model(torch.from_numpy(X).to(bot.device)), dim=1)
+        prob, predicted = torch.max(probs, dim=1)
+
+    for i, text, p, index in zip(todo, corrected, prob.tolist(), predicted.tolist()):
+        model_tag = bot.tags[index]
+        # as in chat._classify, a confident prediction is only kept for a database tag
+        if p > CONFIDENCE_THRESHOLD and model_tag in DB_TAGS:
+            tag, tier = model_tag, "model"
+        else:
+            tag = get_best_match(messages[i], bot.intents)
+            tier = "fuzzy" if tag and (tag in DB_TAGS or bot.intent_responses.get(tag)) else "unknown"
+            tag = tag if tier == "fuzzy" else "unknown"
+        results[i] = {"tag": tag, "probability": round(p, 4), "tier": tier, "model_tag": model_tag, "corrected": text}
+    return results
+
+
+def _classify_tfidf(message, bot):
+    # answered like chat._classify_tfidf: close enough, and a database or intents.json answer exists
+    tag, score = bot.tfidf.classify(message)
+    answered = tag is not None and score >= TFIDF_MIN_SCORE and (tag in DB_TAGS or bot.intent_responses.get(tag))
+    return {"tag": tag if answered else "unknown", "probability": round(score, 4),
+            "tier": "tfidf" if answered else "unknown", "model_tag": tag, "corrected": message}
+
+
+def load_bot(model_file=MODEL_FILE, intents_file=None, engine=ENGINE):
+    if intents_file:
+        with open(intents_file, "r") as f:
+            intents = json.load(f)
+    else:
+        intents = load_intents()
+    legacy_file = LEGACY_MODEL_FILE if model_file == MODEL_FILE else None
+    return load_intent_model("batch", intents, model_file, torch.device("cpu"), legacy_file, engine)
+
+
+# =============================
+# WORKERS
+# =============================
+
+_worker_data = {}
+
+
+def _init_worker(model_file, intents_file, spellcheck, engine):
+    # prepare_model pins each worker to CHATBOT_TORCH_THREADS (default 1)
+    _worker_data.update(bot=load_bot(model_file, intents_file, engine), spellcheck=spellcheck)
+
+
+def _classify_batch(messages):
+    return classify(messages, _worker_data["bot"], _worker_data["spellcheck"])
+
+
+def classify_stream(records, workers, model_file=MODEL_FILE, intents_file=None, spellcheck=True,
+                    batch_size=BATCH_SIZE, engine=ENGINE):
+    """
+    Yields (message, label, result) for `records` of (message, label), in
+    order. At most two batches per worker are in flight at a time.
+    """
+    if workers <= 1:
+        _init_worker(model_file, intents_file, spellcheck, engine)
+        for batch in _batches(records, batch_size):
+            yield from _merge(batch, _classify_batch([m for m, _ in batch]))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(model_file, intents_file, spellcheck, engine)) as pool:
+        in_flight = deque()
+        for batch in _batches(records, batch_size):
+            in_flight.append((batch, pool.submit(_classify_batch, [m for m, _ in batch])))
+            if len(in_flight) >= 2 * workers:
+                batch, future = in_flight.popleft()
+                yield from _merge(batch, future.result())
+        while in_flight:
+            batch, future = in_flight.popleft()
+            yield from _merge(batch, future.result())
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _merge(batch, results):
+    for (message, label), result in zip(batch, results):
+        yield message, label, result
+
+
+# =============================
+# INPUT & OUTPUT
+# =============================
+
+def read_messages(path, message_field="message", label_field="label"):
+    """Yields (message, label or None), lowercased like /chatbot_api/ messages; blank ones are skipped."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            rows = csv.DictReader(f)
+        elif ext in (".jsonl", ".json"):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = ({message_field: line} for line in f)
+        for row in rows:
+            message = str(row.get(message_field) or "").strip().lower()
+            if message:
+                yield message, row.get(label_field) or None
+
+
+class ResultWriter:
+    """Writes result lines as JSONL or CSV."""
+
+    def __init__(self, f, fmt):
+        self.f = f
+        self.csv = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS) if fmt == "csv" else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, message, label, result):
+        row = {"message": message, "label": label, **result}
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+# =============================
+# REPORT
+# =============================
+
+def write_confusion(path, confusion):
+    """The label x predicted-tag matrix as CSV (rows are labels)."""
+    labels = sorted({label for label, _ in confusion})
+    predicted = sorted({tag for _, tag in confusion})
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["label \\ predicted"] + predicted)
+        for label in labels:
+            writer.writerow([label] + [confusion.get((label, tag), 0) for tag in predicted])
+
+
+def print_report(count, elapsed, workers, tiers, confusion, top=10):
+    rate = count / elapsed if elapsed else 0.0
+    print(f"✅ {count} messages in {elapsed:.1f} s ({rate:.0f} messages/s, {workers} worker(s))", file=sys.stderr)
+    if count:
+        print("   tiers: " + ", ".join(f"{tier} {n} ({n / count:.1%})" for tier, n in tiers.most_common()),
+              file=sys.stderr)
+    labelled = sum(confusion.values())
+    if not labelled:
+        return
+    correct = sum(n for (label, tag), n in confusion.items() if label == tag)
+    print(f"🎯 accuracy {correct / labelled:.2%} over {labelled} labelled messages", file=sys.stderr)
+    mistakes = Counter({pair: n for pair, n in confusion.items() if pair[0] != pair[1]})
+    for (label, tag), n in mistakes.most_common(top):
+        print(f"   {n:6d}  {label} -> {tag}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify a file of messages with the intent model")
+    parser.add_argument("input", help=".txt (one message per line), .jsonl or .csv")
+    parser.add_argument("--out", help="default: stdout")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="default: from --out's extension, else jsonl")
+    parser.add_argument("--workers", type=int, default=0, help="default: all cores; 1 runs in this process")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--intents", help="default: intents.compiled.json if up to date, else intents.json")
+    parser.add_argument("--message-field", default="message")
+    parser.add_argument("--label-field", default="label")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE, help="default: CHATBOT_ENGINE, else mlp")
+    parser.add_argument("--no-spellcheck", action="store_true", help="skip TextBlob correction, as under load")
+    parser.add_argument("--confusion", help="write the label x tag confusion matrix to this CSV")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.out and args.out.lower().endswith(".csv") else "jsonl")
+    workers = args.workers or os.cpu_count() or 1
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    writer = ResultWriter(out, fmt)
+    tiers, confusion = Counter(), Counter()
+    count = 0
+    start = time.perf_counter()
+    try:
+        records = read_messages(args.input, args.message_field, args.label_field)
+        for message, label, result in classify_stream(records, workers, args.model, args.intents,
+                                                      not args.no_spellcheck, args.batch_size, args.engine):
+            writer.write(message, label, result)
+            tiers[result["tier"]] += 1
+            if label is not None:
+                confusion[(str(label), result["tag"])] += 1
+            count += 1
+    finally:
+        if args.out:
+            out.close()
+
+    print_report(count, time.perf_counter() - start, workers, tiers, confusion)
+    if args.confusion and confusion:
+        write_confusion(args.confusion, confusion)
+        print(f"📊 confusion matrix written to {args.confusion}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.middleware.proxy_fix import ProxyFix
+import tenants
 
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///university.db'
-db = SQLAlchemy(app)
+# ✅ Behind N reverse proxies, request.remote_addr is the client from X-Forwarded-For
+# (the rate limiter keys on it); only set this when those proxies overwrite the header
+PROXY_HOPS = int(os.environ.get("CHATBOT_PROXY_HOPS", "0"))
+if PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS, x_proto=0, x_host=0, x_port=0, x_prefix=0)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('UNIVERSITY_DB_URI', 'sqlite:///university.db')
+# ✅ Queries go to the database of the request's tenant (see tenants.py)
+db = SQLAlchemy(app, session_options={"class_": tenants.TenantSession})
+tenants.init_app(app)
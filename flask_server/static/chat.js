@@ -2,46 +2,166 @@ const chatInput = document.getElementById("chat-input");
 const chatForm = document.getElementById("chat-form");
 const chatbotFigure = document.querySelector('.mobile')
 
-let apiURL = ''
-
 function toggleChatBot() {
     chatbotFigure.classList.toggle('hidden')
 }
+// =============================
+// Chat channel: one EventSource for answers, a small POST per message
+// =============================
+const HEARTBEAT_TIMEOUT = 40000;   // server pings every 15s
+let channelId = null;
+let lastEventId = 0;
+let source = null;
+let reconnectDelay = 1000;
+let watchdog = null;
+const pending = {};                 // message id -> element being filled by "part" events
+
+function connectChannel() {
+    const params = channelId ? `?channel=${channelId}&last_event_id=${lastEventId}` : "";
+    source = new EventSource(`/chatbot_api/stream/${params}`);
+
+    const alive = (e) => {
+        if (e && e.lastEventId) {
+            lastEventId = parseInt(e.lastEventId, 10);
+        }
+        reconnectDelay = 1000;
+        clearTimeout(watchdog);
+        watchdog = setTimeout(reconnectChannel, HEARTBEAT_TIMEOUT);
+    };
+
+    source.addEventListener("hello", (e) => {
+        const id = JSON.parse(e.data).channel;
+        if (id !== channelId) {
+            lastEventId = 0;   // a new channel restarts numbering
+        }
+        channelId = id;
+        alive();
+    });
+    source.addEventListener("ping", () => alive());
+    source.addEventListener("busy", (e) => {
+        // the worker has too many streams open: messages are answered inline
+        // (they are posted without a channel) until the stream is retried
+        clearTimeout(watchdog);
+        source.close();
+        source = null;
+        channelId = null;
+        setTimeout(connectChannel, JSON.parse(e.data).retry_ms);
+    });
+    source.addEventListener("start", (e) => {
+        alive(e);
+        const start = JSON.parse(e.data);
+        pending[start.id] = addMessage("", 'incoming');
+    });
+    source.addEventListener("part", (e) => {
+        alive(e);
+        const part = JSON.parse(e.data);
+        const el = pending[part.id] || (pending[part.id] = addMessage("", 'incoming'));
+        el.innerText += part.text || "";
+        scrollDown(el);
+    });
+    source.addEventListener("end", (e) => {
+        alive(e);
+        const end = JSON.parse(e.data);
+        delete pending[end.id];
+        renderExtras(end);
+    });
+    source.onerror = () => {
+        // the browser retries by itself, but only with the original URL; reconnect
+        // with the channel id so missed events are replayed
+        reconnectChannel();
+    };
+}
+
+function reconnectChannel() {
+    clearTimeout(watchdog);
+    if (source) {
+        source.close();
+        source = null;
+    }
+    setTimeout(connectChannel, reconnectDelay);
+    reconnectDelay = Math.min(reconnectDelay * 2, 30000);
+}
+
+function renderExtras(r) {
+    if (r.table) {
+        addTable(r.table)
+    }
+    if (r.data) {
+        addPDFBtn(r.data)
+    }
+}
+
+if (window.EventSource) {
+    connectChannel();
+}
+
 chatForm.addEventListener("submit", (e) => {
     e.preventDefault();
 
     let userMsg = chatInput.value
     addMessage(userMsg, 'outgoing');
 
-    fetch(`http://127.0.0.1:5000/chatbot_api/${apiURL}`, {
+    // follow-up turns (e.g. a student ID after "result") are tracked by the
+    // server-side session behind the chat_sid cookie. text/plain keeps this a
+    // "simple" request, so there is no CORS preflight.
+    fetch("/chatbot_api/stream/send", {
         method: "POST",
-        body: JSON.stringify({ "message": userMsg }),
-        mode: "cors",
-        headers: { "Content-Type": "application/json" }
-    }).then(r => r.json()).then(r => {
-        if (r.url) {
-            apiURL = r.url
-        } else {
-            apiURL = ''
-        }
-        addMessage(r.response, 'incoming');
-
-        if (r.data) {
-            addPDFBtn(r.data)
+        body: JSON.stringify({ "message": userMsg, "channel": channelId }),
+        headers: { "Content-Type": "text/plain;charset=UTF-8" }
+    }).then(r => r.json().then(body => ({ status: r.status, body }))).then(({ status, body }) => {
+        if (status === 202) {
+            return;   // the answer arrives on the event stream
         }
+        // no open stream on this worker (or an error): answered inline
+        addMessage(body.response, 'incoming');
+        renderExtras(body);
+    }).catch(error => {
+        console.error("Error:", error);
+        addMessage("Sorry, I couldn't reach the server. Please try again.", 'incoming');
     })
 
 });
 
+function scrollDown(el) {
+    document.querySelector(".chat-messages").scrollTop +=
+        el.getBoundingClientRect().y + 20;
+}
+
 function addMessage(message, msgtype) {
     const chatMessage = document.createElement("div");
     chatMessage.classList.add("chat-message");
     chatMessage.classList.add(`${msgtype}-message`);
     chatMessage.innerText = message;
     document.querySelector(".chat-messages").appendChild(chatMessage);
+    scrollDown(chatMessage);
+    if (msgtype === 'outgoing') {
+        chatInput.value = "";
+    }
+    return chatMessage;
+}
+
+// bulk result lookups ("434121010021, 434121010022, ...") come back as one table
+function addTable(table) {
+    const chatMessage = document.createElement("div");
+    chatMessage.classList.add("chat-message");
+    chatMessage.classList.add(`incoming-message`);
+    const tableEl = document.createElement("table");
+    const header = tableEl.insertRow();
+    table.columns.forEach(column => {
+        const th = document.createElement("th");
+        th.innerText = column;
+        header.appendChild(th);
+    });
+    table.rows.forEach(row => {
+        const tr = tableEl.insertRow();
+        row.forEach(value => {
+            tr.insertCell().innerText = value;
+        });
+    });
+    chatMessage.appendChild(tableEl);
+    document.querySelector(".chat-messages").appendChild(chatMessage);
     document.querySelector(".chat-messages").scrollTop +=
         chatMessage.getBoundingClientRect().y + 20;
-    chatInput.value = "";
 }
 
 function addPDFBtn(data) {
@@ -1 +1,2 @@
-from .routes import *
\ No newline at end of file
+from .routes import *
+from . import assets
@@ -0,0 +1,162 @@
+"""
+Admissions analytics from incrementally maintained summary rows.
+
+Every AdmissionForm insert, update or delete adjusts `admission_stat` rows
+(count and CGPA sum per course, mode, state, city, qualification, submission
+day and CGPA band) in the same transaction, so the dashboard reads a few
+hundred summary rows instead of scanning the admissions table. A failed or
+rolled-back submission never changes the counts.
+
+`flask --app run rebuild-admission-stats` recomputes the rows from scratch,
+e.g. for admissions saved before the summary table existed.
+"""
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from flask_server import db
+from flask_server.university.models import AdmissionForm, AdmissionStat, increment_row
+from flask_server.university.reference_data import reference
+
+DIMENSIONS = ["course", "mode", "state", "city", "qualification", "day", "cgpa", "course_cgpa"]
+TRACKED_FIELDS = ["course_id", "mode", "state", "city", "qualification", "submission_date", "cgpa"]
+
+
+def cgpa_band(cgpa):
+    """CGPA bands 0-1 ... 9-10; larger values (percentages) share one band."""
+    if cgpa is None:
+        return "unknown"
+    if cgpa > 10:
+        return "over 10"
+    return f"{min(int(math.floor(cgpa)), 9)}-{min(int(math.floor(cgpa)), 9) + 1}"
+
+
+def _clean(text):
+    # "chennai " and "Chennai" are the same city
+    return " ".join(str(text or "").split()).title()[:123] or "Unknown"
+
+
+def admission_keys(values):
+    """The (dimension, value) rows one admission counts towards."""
+    submitted = values.get("submission_date") or datetime.now(timezone.utc)  # CURRENT_TIMESTAMP is UTC
+    band = cgpa_band(values.get("cgpa"))
+    course = str(values.get("course_id"))
+    return [
+        ("total", ""),
+        ("course", course),
+        ("mode", _clean(values.get("mode"))),
+        ("state", _clean(values.get("state"))),
+        ("city", _clean(values.get("city"))),
+        ("qualification", _clean(values.get("qualification"))),
+        ("day", submitted.date().isoformat()),
+        ("cgpa", band),
+        ("course_cgpa", f"{course}:{band}"),
+    ]
+
+
+def apply_deltas(conn, deltas):
+    """Adds {(dimension, value): [count, cgpa_sum]} to the summary rows."""
+    for (dimension, value), (count, cgpa_sum) in deltas.items():
+        if not count and not cgpa_sum:
+            continue
+        increment_row(conn, AdmissionStat.__table__, {"dimension": dimension, "value": value},
+                      {"count": count, "cgpa_sum": cgpa_sum})
+
+
+def _add(deltas, values, sign):
+    cgpa = values.get("cgpa") or 0.0
+    for key in admission_keys(values):
+        deltas[key][0] += sign
+        deltas[key][1] += sign * cgpa
+
+
+@event.listens_for(Session, "before_flush")
+def _track_admission_changes(session, flush_context, instances):
+    deltas = defaultdict(lambda: [0, 0.0])
+
+    for obj in session.new:
+        if isinstance(obj, AdmissionForm):
+            _add(deltas, {f: getattr(obj, f) for f in TRACKED_FIELDS}, +1)
+    for obj in session.deleted:
+        if isinstance(obj, AdmissionForm):
+            _add(deltas, {f: getattr(obj, f) for f in TRACKED_FIELDS}, -1)
+    changed = {obj.id: obj for obj in session.dirty
+               if isinstance(obj, AdmissionForm) and session.is_modified(obj) and obj.id is not None}
+    if changed:
+        # the old values come from the rows themselves: an attribute set after a
+        # commit expired the object has no history to read them from
+        columns = [getattr(AdmissionForm, f) for f in TRACKED_FIELDS]
+        rows = session.connection().execute(
+            select(AdmissionForm.id, *columns).where(AdmissionForm.id.in_(list(changed)))
+        )
+        for row in rows:
+            _add(deltas, dict(zip(TRACKED_FIELDS, row[1:])), -1)
+            _add(deltas, {f: getattr(changed[row[0]], f) for f in TRACKED_FIELDS}, +1)
+
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild():
+    """Recomputes every summary row from the admissions table. Returns the number of admissions."""
+    deltas = defaultdict(lambda: [0, 0.0])
+    columns = [getattr(AdmissionForm, f) for f in TRACKED_FIELDS]
+    total = 0
+    for row in db.session.query(*columns).yield_per(1000):
+        _add(deltas, dict(zip(TRACKED_FIELDS, row)), +1)
+        total += 1
+
+    conn = db.session.connection()
+    conn.execute(AdmissionStat.__table__.delete())
+    apply_deltas(conn, deltas)
+    db.session.commit()
+    return total
+
+
+def summary(days=90):
+    """
+    Dashboard data: {"total", "mean_cgpa", dimension: [{"value", "label", "count", "mean_cgpa"}]}.
+    "day" holds the last `days` calendar days (UTC, as submission dates are stored), today included.
+    """
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+    rows = AdmissionStat.query.filter(
+        AdmissionStat.count > 0,
+        or_(AdmissionStat.dimension != "day", AdmissionStat.value >= since),
+    ).all()
+    course_names = {c.course_id: c.name for c in reference().courses}
+
+    def label(dimension, value):
+        if dimension == "course":
+            return course_names.get(int(value), f"Course {value}") if value.isdigit() else "N/A"
+        if dimension == "course_cgpa":
+            course, band = value.split(":", 1)
+            return f"{label('course', course)} · {band}"
+        return value
+
+    result = {dimension: [] for dimension in DIMENSIONS}
+    total = {"count": 0, "cgpa_sum": 0.0}
+    for row in rows:
+        if row.dimension == "total":
+            total = {"count": row.count, "cgpa_sum": row.cgpa_sum}
+            continue
+        result.setdefault(row.dimension, []).append({
+            "value": row.value,
+            "label": label(row.dimension, row.value),
+            "count": row.count,
+            "mean_cgpa": round(row.cgpa_sum / row.count, 2),
+        })
+
+    for dimension, entries in result.items():
+        if dimension in ("day", "cgpa"):
+            entries.sort(key=lambda e: e["value"])
+        elif dimension == "course_cgpa":
+            entries.sort(key=lambda e: e["label"])
+        else:
+            entries.sort(key=lambda e: (-e["count"], e["label"]))
+
+    result["total"] = total["count"]
+    result["mean_cgpa"] = round(total["cgpa_sum"] / total["count"], 2) if total["count"] else None
+    return result
@@ -0,0 +1,119 @@
+"""
+Fingerprinted, precompressed static assets.
+
+At startup every file in the static folder is hashed and given a URL like
+/assets/chat.3f9a1c2b7d4e.js. Templates keep calling
+url_for('static', filename='chat.js'); the url_for seen by Jinja maps those
+calls to the fingerprinted URL. Because the URL changes whenever the content
+does, responses are marked immutable and cached for a year.
+
+Text assets are gzip-compressed once at startup (and brotli-compressed when
+the optional `brotli` package is installed); the variant is picked from the
+request's Accept-Encoding.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+from flask import abort, request, send_file, url_for
+
+from flask_server import app
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = {'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml',
+                      'application/json', 'text/plain', 'text/html'}
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSED_FOLDER = os.path.join(app.instance_path, 'assets')
+
+# original relative path -> fingerprinted name, and the reverse lookup
+manifest = {}
+_assets = {}
+
+
+def _fingerprinted_name(rel_path, digest):
+    stem, ext = os.path.splitext(rel_path)
+    return f"{stem}.{digest}{ext}"
+
+
+def build_manifest():
+    """Hashes the static folder and writes the .gz/.br variants."""
+    manifest.clear()
+    _assets.clear()
+    static_folder = app.static_folder
+    os.makedirs(COMPRESSED_FOLDER, exist_ok=True)
+
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            fingerprinted = _fingerprinted_name(rel_path, digest)
+            mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+            encodings = {}
+            if mimetype in COMPRESSIBLE_TYPES and len(data) >= MIN_COMPRESS_SIZE:
+                variants = [('gzip', '.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+                if brotli is not None:
+                    variants.append(('br', '.br', lambda d: brotli.compress(d, quality=11)))
+                for encoding, suffix, compress in variants:
+                    out = os.path.join(COMPRESSED_FOLDER, fingerprinted.replace('/', '_') + suffix)
+                    if not os.path.exists(out):
+                        with open(out + '.tmp', 'wb') as f:
+                            f.write(compress(data))
+                        os.replace(out + '.tmp', out)
+                    if os.path.getsize(out) < len(data):
+                        encodings[encoding] = out
+
+            manifest[rel_path] = fingerprinted
+            _assets[fingerprinted] = {'path': path, 'mimetype': mimetype, 'encodings': encodings}
+
+    logger.info("✅ Fingerprinted %d static assets", len(manifest))
+
+
+def asset_url(filename):
+    """URL of a static file; fingerprinted when the file is in the manifest."""
+    fingerprinted = manifest.get(filename)
+    if fingerprinted is None:
+        return url_for('static', filename=filename)
+    return url_for('fingerprinted_asset', filename=fingerprinted)
+
+
+def _template_url_for(endpoint, **values):
+    if endpoint == 'static' and values.keys() == {'filename'}:
+        return asset_url(values['filename'])
+    return url_for(endpoint, **values)
+
+
+@app.route('/assets/<path:filename>')
+def fingerprinted_asset(filename):
+    asset = _assets.get(filename)
+    if asset is None:
+        abort(404)
+
+    accepted = request.accept_encodings
+    encoding = next((e for e in ('br', 'gzip') if e in asset['encodings'] and accepted[e]), None)
+    if encoding:
+        response = send_file(asset['encodings'][encoding], mimetype=asset['mimetype'], conditional=True)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_file(asset['path'], mimetype=asset['mimetype'], conditional=True)
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+build_manifest()
+app.jinja_env.globals['url_for'] = _template_url_for
+app.jinja_env.globals['asset_url'] = asset_url
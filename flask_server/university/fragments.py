@@ -0,0 +1,53 @@
+"""
+Fragment cache for the admin pages.
+
+The row lists and dropdowns of students.html, teachers.html, courses.html,
+admissions.html and holidays.html are rendered from partial templates and
+kept as HTML, keyed on the fragment name and its filter parameters. Each
+entry remembers the http_cache version token of the tables it was rendered
+from; every CRUD write bumps that token in its own transaction, so the next
+request in any worker sees a mismatch and re-renders. On a hit the page does
+one primary-key lookup instead of re-querying and re-rendering every row.
+With CHATBOT_CACHE_BACKEND=sqlite the fragments are shared by all workers
+on the host (see shared_cache.py).
+
+    UNIVERSITY_FRAGMENT_CACHE_SIZE   entries kept (default 512, 0 disables)
+"""
+import logging
+import os
+
+from flask import render_template
+from markupsafe import Markup
+
+from metrics import REGISTRY
+from shared_cache import Cache
+from tenants import current_tenant
+from flask_server.university.http_cache import version_token
+
+logger = logging.getLogger(__name__)
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get("UNIVERSITY_FRAGMENT_CACHE_SIZE", "512"))
+
+REGISTRY.describe("fragment_cache_total", "Admin page fragments served from the cache (hit) or re-rendered (miss).")
+
+
+fragment_cache = Cache("fragments", FRAGMENT_CACHE_SIZE)
+
+
+def render_fragment(name, resources, template, load, **params):
+    """
+    Returns the rendered `template` for `params`, re-rendering only when one of
+    `resources` changed since it was cached. `load()` runs the queries and
+    returns the template context; it is not called on a hit.
+    """
+    key = (current_tenant(), name, tuple(sorted(params.items())))
+    token = version_token(*resources)
+    html = fragment_cache.get(key, token)
+    if html is not None:
+        REGISTRY.inc("fragment_cache_total", fragment=name, result="hit")
+        return html
+
+    REGISTRY.inc("fragment_cache_total", fragment=name, result="miss")
+    html = Markup(render_template(template, **params, **load()))
+    fragment_cache.put(key, html, token)
+    return html
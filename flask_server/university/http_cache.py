@@ -0,0 +1,124 @@
+"""
+Conditional GET and gzip for the JSON APIs.
+
+Every table the APIs read from maps to a named resource ("courses",
+"students", ...). A row per resource in `resource_version` holds a counter
+and a timestamp that are bumped in the same transaction as any insert,
+update or delete of that table, so all workers see the same version and a
+rolled-back write never changes it.
+
+@conditional("courses") then answers If-None-Match / If-Modified-Since with
+304 from one primary-key lookup, without running the view, and gzips large
+JSON bodies for clients that accept it. The ETag covers the path and query
+string; Last-Modified is left out while its second is still current.
+"""
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import make_response, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from flask_server import db
+from tenants import current_tenant
+from flask_server.university.models import (Teacher, Holidays, Course, Student, AdmissionForm, ResourceVersion,
+                                            SyllabusDocument, SyllabusEntry, increment_row)
+
+GZIP_MIN_SIZE = 1024
+
+# Which resources change when a row of a model is written
+MODEL_RESOURCES = {
+    Course: ("courses",),
+    Student: ("students",),
+    Teacher: ("teachers",),
+    Holidays: ("holidays",),
+    AdmissionForm: ("admissions",),
+    SyllabusDocument: ("syllabus",),
+    SyllabusEntry: ("syllabus",),
+}
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_resources(session, flush_context):
+    # session.new/dirty/deleted still describe what this flush wrote
+    changed = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.update(MODEL_RESOURCES.get(type(obj), ()))
+    if not changed:
+        return
+
+    conn = session.connection()
+    table = ResourceVersion.__table__
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    for name in sorted(changed):
+        increment_row(conn, table, {"name": name}, {"version": 1}, {"updated_at": now})
+
+
+def resource_versions(*names):
+    """Returns {name: (version, updated_at)}; unknown resources are (0, None)."""
+    table = ResourceVersion.__table__
+    rows = db.session.execute(
+        select(table.c.name, table.c.version, table.c.updated_at).where(table.c.name.in_(names))
+    ).all()
+    found = {name: (version, updated_at) for name, version, updated_at in rows}
+    return {name: found.get(name, (0, None)) for name in names}
+
+
+def version_token(*names):
+    """A short string that changes whenever any of the resources changes (per tenant)."""
+    versions = resource_versions(*names)
+    return current_tenant() + ":" + "-".join(f"{name}.{versions[name][0]}" for name in names)
+
+
+def gzip_response(response):
+    """Compresses a large response body in place if the client accepts gzip."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not request.accept_encodings['gzip']):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, 6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def conditional(*resources):
+    """Adds ETag/Last-Modified validation and gzip to a GET view reading `resources`."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = resource_versions(*resources)
+            token = (current_tenant() + request.path + "?" + request.query_string.decode("latin-1") + "|"
+                     + "-".join(f"{name}.{versions[name][0]}" for name in resources))
+            etag = hashlib.sha1(token.encode()).hexdigest()[:20]
+            stamps = [updated_at for _, updated_at in versions.values() if updated_at]
+            last_modified = max(stamps).replace(tzinfo=timezone.utc) if stamps else None
+            # updated_at has one-second precision: until that second is over, another
+            # write may still land in it, so only the ETag can tell the two versions apart
+            if last_modified is not None and last_modified >= datetime.now(timezone.utc).replace(microsecond=0):
+                last_modified = None
+
+            not_modified = request.if_none_match.contains_weak(etag) if request.if_none_match else (
+                last_modified is not None and request.if_modified_since is not None
+                and last_modified <= request.if_modified_since
+            )
+            if not_modified:
+                response = make_response("", 304)
+            else:
+                response = gzip_response(make_response(view(*args, **kwargs)))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'no-cache'  # ✅ always revalidate, usually with a 304
+            response.vary.add('Accept-Encoding')
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,102 @@
+"""
+Web derivatives for uploaded images (holiday lists, admission documents).
+
+At upload time the original bytes are hashed and a worker pool renders a
+resized, recompressed "web" copy and a small "thumb" copy with Pillow.
+Derivatives are stored on disk under their content hash, so identical
+uploads share files and the URLs can be cached forever. PDFs and anything
+Pillow cannot open keep only their original.
+"""
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_FOLDER = os.path.join(os.getcwd(), 'uploads', 'derivatives')
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+
+# variant -> (longest side in px, JPEG quality)
+VARIANTS = {
+    'web': (1600, 80),
+    'thumb': (320, 70),
+}
+
+# Pillow releases the GIL while decoding, resizing and encoding
+_pool = ThreadPoolExecutor(max_workers=max(2, (os.cpu_count() or 2) // 2), thread_name_prefix="derivatives")
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_image(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def derivative_path(digest, variant):
+    return os.path.join(DERIVATIVE_FOLDER, digest[:2], f"{digest}_{variant}.jpg")
+
+
+def variant_path(digest, variant):
+    """Returns the derivative file if it has been rendered, else None (serve the original)."""
+    if not digest or variant not in VARIANTS:
+        return None
+    path = derivative_path(digest, variant)
+    return path if os.path.isfile(path) else None
+
+
+def render_derivatives(data, digest):
+    """Renders every missing variant of one image. Runs on the worker pool."""
+    try:
+        with Image.open(BytesIO(data)) as original:
+            source_is_jpeg = original.format == 'JPEG'
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'L'):
+                background = Image.new('RGB', original.size, 'white')
+                rgba = original.convert('RGBA')
+                background.paste(rgba, mask=rgba.getchannel('A'))
+                original = background
+
+            for variant, (max_side, quality) in VARIANTS.items():
+                path = derivative_path(digest, variant)
+                if os.path.exists(path):
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                image = original.copy()
+                image.thumbnail((max_side, max_side), Image.LANCZOS)
+                encoded = BytesIO()
+                image.save(encoded, 'JPEG', quality=quality, optimize=True, progressive=True)
+                encoded = encoded.getvalue()
+                # ✅ An already small JPEG can grow when re-encoded; keep the original bytes then
+                if source_is_jpeg and len(encoded) >= len(data):
+                    encoded = data
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(encoded)
+                os.replace(tmp_path, path)  # never expose a half-written file
+        logger.debug("🖼 Derivatives ready for %s", digest)
+    except Exception as e:
+        logger.warning("⚠️ Could not render derivatives for %s: %s", digest, e)
+
+
+def schedule_derivatives(data, filename):
+    """
+    Hashes an upload and queues its derivatives.
+    Returns the content hash, or None for files that are not images.
+    """
+    if not is_image(filename):
+        return None
+    digest = content_hash(data)
+    if not all(os.path.exists(derivative_path(digest, v)) for v in VARIANTS):
+        _pool.submit(render_derivatives, data, digest)
+    return digest
+
+
+def wait_for_derivatives():
+    """Blocks until every queued render has finished (for CLI backfills)."""
+    _pool.shutdown(wait=True)
@@ -1,4 +1,11 @@
+from sqlalchemy import and_, inspect, text
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import deferred
 from flask_server import db
+import tenants
 
 class Teacher(db.Model):
     id = db.Column('faculty_id', db.Integer, primary_key=True)
@@ -13,7 +20,8 @@ class Holidays(db.Model):
     id = db.Column('holiday_id', db.Integer, primary_key=True)
     year = db.Column(db.Integer, nullable=False)
     file_name = db.Column(db.String(123), nullable=False)
-    data = db.Column(db.LargeBinary)
+    data = deferred(db.Column(db.LargeBinary))  # ✅ Only loaded when the original is downloaded
+    content_hash = db.Column(db.String(64), nullable=True)  # ✅ Key of the resized web/thumb copies
 
     def __repr__(self):
         return f"Holidays ID: {self.id} for Year: {self.year}"
@@ -21,7 +29,7 @@ class Holidays(db.Model):
 class Course(db.Model):  # ✅ Defined before Student to avoid reference issues
     course_id = db.Column(db.Integer, primary_key=True)  # ✅ Ensures correct PK
     name = db.Column(db.String(123), nullable=False, unique=True)  # ✅ Ensures unique course names
-    syllabus = db.Column(db.LargeBinary)
+    syllabus = deferred(db.Column(db.LargeBinary))  # ✅ Only loaded when the PDF is downloaded
     duration = db.Column(db.String(123), nullable=False)
 
     # ✅ Relationship to Student (Fixing backref issues)
@@ -64,6 +72,8 @@ class AdmissionForm(db.Model):
 
     marksheet = db.Column(db.String(255), nullable=True)  # ✅ File path
     id_proof = db.Column(db.String(255), nullable=True)  # ✅ File path
+    marksheet_hash = db.Column(db.String(64), nullable=True)  # ✅ Keys of the resized web/thumb copies
+    id_proof_hash = db.Column(db.String(64), nullable=True)
 
     father_name = db.Column(db.String(123), nullable=False)
     mother_name = db.Column(db.String(123), nullable=True)
@@ -76,3 +86,106 @@ class AdmissionForm(db.Model):
 
     def __repr__(self):
         return f"AdmissionForm({self.full_name}, {self.email}, {self.course.name if self.course else 'No Course'})"
+
+
+class ResourceVersion(db.Model):
+    """Write counter per resource ("courses", "students", ...), see http_cache."""
+    __tablename__ = 'resource_version'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class AdmissionStat(db.Model):
+    """Running admission counts per (dimension, value), see analytics."""
+    __tablename__ = 'admission_stat'
+
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(123), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    cgpa_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+
+def increment_row(conn, table, key, increments, values=None):
+    """
+    Adds {column: amount} `increments` to the row of `table` with primary key
+    `key` ({column: value}) and sets `values`, inserting the row if it is
+    missing. One INSERT ... ON CONFLICT DO UPDATE on SQLite, PostgreSQL and
+    MySQL, so two transactions creating the same row cannot collide; other
+    databases insert inside a savepoint and fall back to the UPDATE.
+    """
+    values = values or {}
+    row = {**key, **increments, **values}
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table).values(**row)
+        added = {c: table.c[c] + insert.excluded[c] for c in increments}
+        conn.execute(insert.on_conflict_do_update(index_elements=list(key), set_={**added, **values}))
+        return
+    if dialect in ("mysql", "mariadb"):
+        insert = mysql_insert(table).values(**row)
+        conn.execute(insert.on_duplicate_key_update(
+            {**{c: table.c[c] + insert.inserted[c] for c in increments}, **values}))
+        return
+
+    update = (table.update().where(and_(*(table.c[c] == v for c, v in key.items())))
+              .values(**{c: table.c[c] + amount for c, amount in increments.items()}, **values))
+    if conn.execute(update).rowcount:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(table.insert().values(**row))
+    except IntegrityError:  # another transaction inserted it first
+        conn.execute(update)
+
+
+def upgrade_schema(engine=None):
+    """
+    Adds nullable columns that were introduced after a table was created.
+    db.create_all() only creates missing tables, it never alters existing ones.
+    `engine` defaults to the default tenant's database.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def create_tenant_schemas():
+    """db.create_all() and upgrade_schema() for every configured tenant database."""
+    for name in tenants.TENANTS:
+        engine = tenants.engine_for(name)
+        db.metadata.create_all(engine)
+        upgrade_schema(engine)
+
+
+class SyllabusDocument(db.Model):
+    """Text-extraction state of one course's syllabus PDF, see syllabus."""
+    __tablename__ = 'syllabus_document'
+
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending / indexed / no_text / failed
+    pages = db.Column(db.Integer, nullable=True)
+    entries = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    indexed_at = db.Column(db.DateTime, nullable=True)
+
+
+class SyllabusEntry(db.Model):
+    """One topic of a syllabus with the subject and unit it belongs to."""
+    __tablename__ = 'syllabus_entry'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.course_id'), nullable=False, index=True)
+    subject = db.Column(db.String(255), nullable=True)
+    unit = db.Column(db.String(255), nullable=True)
+    topic = db.Column(db.String(500), nullable=False)
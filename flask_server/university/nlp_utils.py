@@ -1,41 +1,8 @@
 from .models import Course
-import numpy as np
-from nltk.stem.porter import PorterStemmer
 import spacy
 from spacy.matcher import Matcher
-import nltk
-nltk.download('punkt')
-nltk.download('punkt_tab')
-
-stemmer = PorterStemmer()
-
-
-def tokenize(sentence):
-    return nltk.word_tokenize(sentence)
-
-
-def stem(word):
-    return stemmer.stem(word.lower())
-
-
-def bag_of_words(tokenized_sentence, words):
-    """
-    return bag of words array:
-    1 for each known word that exists in the sentence, 0 otherwise
-    example:
-    sentence = ["hello", "how", "are", "you"]
-    words = ["hi", "hello", "I", "you", "bye", "thank", "cool"]
-    bag   = [  0 ,    1 ,    0 ,   1 ,    0 ,    0 ,      0]
-    """
-    # stem each word
-    sentence_words = [stem(word) for word in tokenized_sentence]
-    # initialize bag with 0 for each word
-    bag = np.zeros(len(words), dtype=np.float32)
-    for idx, w in enumerate(words):
-        if w in sentence_words:
-            bag[idx] = 1
-
-    return bag
+# tokenizing and bag of words live in intent_matching, which needs no app import
+from intent_matching import bag_of_words, stem, tokenize  # noqa: F401
 
 
 nlp = spacy.load("en_core_web_sm")
@@ -0,0 +1,147 @@
+"""
+Process-wide cache of the small lookup tables: courses and departments.
+
+Dropdowns, course-name lists and the chatbot's course/department matching
+read an immutable ReferenceData snapshot instead of running Course.query.all()
+(which also used to read every syllabus PDF). The snapshot remembers the
+http_cache version token of "courses" and "teachers"; a write to either table
+bumps the token in its own transaction, so the next lookup in any worker
+rebuilds it. The token is checked once per request. With a shared cache
+backend, the first worker to see a new token builds the snapshot and the
+others load it from there. Each tenant has its own snapshot.
+
+Departments are the known DEPARTMENTS plus any other department a teacher
+is stored under. A department stands for the courses whose name contains
+it as a word ("B.E. CSE"), starts a word with it ("MECH" in "Mechanical
+Engineering") or is abbreviated by it ("Computer Science and Engineering").
+"""
+import re
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import g, has_request_context
+
+from metrics import REGISTRY
+from shared_cache import Cache
+from tenants import current_tenant
+from flask_server import db
+from flask_server.university.http_cache import version_token
+from flask_server.university.models import Course, Teacher
+
+DEPARTMENTS = ("CSBS", "IT", "CSE", "ECE", "EEE", "MECH", "AIDS", "AIML")
+RESOURCES = ("courses", "teachers")
+MIN_PARTIAL_MATCH = 3
+MIN_PREFIX_MATCH = 4
+_NAME_WORDS = re.compile(r"[A-Za-z][A-Za-z.]*")
+_MINOR_WORDS = {"and", "of", "in", "the", "for", "with"}
+
+REGISTRY.describe("reference_data_rebuilds_total", "Times the course/department snapshot was rebuilt.")
+
+CourseInfo = namedtuple("CourseInfo", "course_id name duration has_syllabus")
+
+
+class ReferenceData:
+    """Read-only snapshot of courses and departments for one version token."""
+
+    def __init__(self, token, courses, teacher_departments):
+        self.token = token
+        self.courses = tuple(courses)
+        self.by_id = MappingProxyType({c.course_id: c for c in self.courses})
+        self.by_name = MappingProxyType({c.name.lower().strip(): c for c in self.courses})
+        self.course_names = tuple(c.name for c in self.courses)
+        self.with_syllabus = frozenset(c.course_id for c in self.courses if c.has_syllabus)
+        self.teacher_departments = tuple(teacher_departments)
+        # ✅ extra departments keep the spelling teachers are stored under, so filter_by matches
+        extra = {}
+        for d in teacher_departments:
+            if d and d.upper() not in DEPARTMENTS:
+                extra.setdefault(d.upper(), d)
+        self.departments = DEPARTMENTS + tuple(extra[key] for key in sorted(extra))
+        # whole words only: "it" must not match "with", "digital" or "institute"
+        self._department_words = tuple((d, re.compile(rf"\b{re.escape(d.lower())}\b")) for d in self.departments)
+        self._course_words = {c.course_id: _name_words(c.name) for c in self.courses}
+
+    def __reduce__(self):
+        # the MappingProxyType views cannot be pickled; rebuild them instead
+        return ReferenceData, (self.token, self.courses, self.teacher_departments)
+
+    def course(self, course_id):
+        return self.by_id.get(course_id)
+
+    def course_named(self, name):
+        """Case-insensitive exact match on the course name."""
+        return self.by_name.get((name or "").lower().strip())
+
+    def find_course(self, text):
+        """
+        Exact name match, else the first course whose name contains `text`
+        (at least MIN_PARTIAL_MATCH letters, so a reply like "e" matches nothing).
+        """
+        text = (text or "").lower().strip()
+        if not text:
+            return None
+        course = self.by_name.get(text)
+        if course is None and len(text) >= MIN_PARTIAL_MATCH:
+            course = next((c for key, c in self.by_name.items() if text in key), None)
+        return course
+
+    def find_department(self, text):
+        """The department mentioned first in `text`, as a whole word, if any."""
+        text = (text or "").lower()
+        found = [(m.start(), d) for d, pattern in self._department_words for m in [pattern.search(text)] if m]
+        return min(found)[1] if found else None
+
+    def department_courses(self, department):
+        """Ids of the courses `department` stands for (see the module docstring)."""
+        key = (department or "").lower()
+        if not key:
+            return frozenset()
+        return frozenset(
+            cid for cid, (words, acronym) in self._course_words.items()
+            if key in words or key == acronym
+            or (len(key) >= MIN_PREFIX_MATCH and any(w.startswith(key) for w in words))
+        )
+
+
+def _name_words(name):
+    """(lowercase words, acronym) of a course name; "B.E." and minor words are left out of the acronym."""
+    words = [w.lower() for w in _NAME_WORDS.findall(name or "")]
+    acronym = "".join(w[0] for w in words if "." not in w and w not in _MINOR_WORDS)
+    return frozenset(w.strip(".") for w in words), acronym
+
+
+_lock = threading.Lock()
+_snapshots = {}  # tenant -> ReferenceData
+_shared = Cache("reference_data", 64)
+
+
+def _build(token):
+    rows = (db.session.query(Course.course_id, Course.name, Course.duration, Course.syllabus.isnot(None))
+            .order_by(Course.course_id).all())
+    departments = [d for (d,) in db.session.query(Teacher.department).distinct().order_by(Teacher.department)]
+    REGISTRY.inc("reference_data_rebuilds_total")
+    return ReferenceData(token, [CourseInfo(*row) for row in rows], departments)
+
+
+def reference():
+    """The current tenant's ReferenceData snapshot, rebuilt if courses or teachers changed."""
+    if has_request_context() and "reference_data" in g:
+        return g.reference_data
+
+    tenant = current_tenant()
+    token = version_token(*RESOURCES)
+    snapshot = _snapshots.get(tenant)
+    if snapshot is None or snapshot.token != token:
+        with _lock:
+            snapshot = _snapshots.get(tenant)
+            if snapshot is None or snapshot.token != token:
+                snapshot = _shared.get(tenant, token)
+                if snapshot is None:
+                    snapshot = _build(token)
+                    _shared.put(tenant, snapshot, token)
+                _snapshots[tenant] = snapshot
+
+    if has_request_context():
+        g.reference_data = snapshot
+    return snapshot
@@ -0,0 +1,93 @@
+"""
+Bulk student result lookup.
+
+Student IDs can arrive comma, semicolon, space or newline separated (pasted
+into the chat or uploaded as a .txt/.csv list of at most MAX_UPLOAD_BYTES).
+Short digit groups are one ID written in groups: "434 121 010 021" is
+434121010021. They are resolved with one primary-key IN query per chunk
+instead of one Student.query.get per ID.
+"""
+import re
+
+from sqlalchemy.orm import defer, joinedload
+
+from flask_server.university.models import Course, Student
+
+MAX_IDS = 1000
+MAX_UPLOAD_BYTES = 64 * 1024
+MAX_GROUP_DIGITS = 4  # "434 121 010 021": groups this short are parts of one ID
+CHUNK_SIZE = 500  # stays below SQLite's default limit of 999 bound parameters
+COLUMNS = ["Student ID", "Name", "Course", "CGPA"]
+
+_SEPARATORS = re.compile(r"[,;\r\n]+")
+_GROUPED_ID = re.compile(rf"^\d{{1,{MAX_GROUP_DIGITS}}}(\s+\d{{1,{MAX_GROUP_DIGITS}}})+$")
+
+
+def _tokens(text):
+    for piece in _SEPARATORS.split(text or ""):
+        piece = piece.strip()
+        if _GROUPED_ID.match(piece):
+            yield "".join(piece.split())
+        else:
+            yield from piece.split()
+
+
+def parse_student_ids(text):
+    """
+    Splits `text` into student IDs, keeping their order and dropping repeats.
+    Returns (ids, invalid) where invalid holds the tokens that are not numeric.
+    """
+    ids, invalid, seen = [], [], set()
+    for token in _tokens(text):
+        if not token or token in seen:
+            continue
+        seen.add(token)
+        (ids if token.isdigit() else invalid).append(token)
+    return ids, invalid
+
+
+def read_uploaded_ids(file):
+    """
+    Text of an uploaded ID list (.txt or .csv), or None when it is larger than
+    MAX_UPLOAD_BYTES; a header row ends up in `invalid`.
+    """
+    data = file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        return None
+    return data.decode("utf-8-sig", errors="replace")
+
+
+def fetch_students(ids):
+    """Returns {student_id: Student} for the IDs that exist, with their courses loaded."""
+    found = {}
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        students = (Student.query
+                    .options(joinedload(Student.course).defer(Course.syllabus))
+                    .filter(Student.id.in_(chunk))
+                    .all())
+        found.update((s.id, s) for s in students)
+    return found
+
+
+def result_rows(ids):
+    """One dict per requested ID, in request order; unknown IDs have found=False."""
+    found = fetch_students(ids)
+    rows = []
+    for student_id in ids:
+        student = found.get(student_id)
+        if student is None:
+            rows.append({"id": student_id, "found": False, "name": None, "course": None, "cgpa": None})
+        else:
+            rows.append({"id": student_id, "found": True, "name": student.name,
+                         "course": student.course.name if student.course else None, "cgpa": student.cgpa})
+    return rows
+
+
+def results_table(rows):
+    """{"columns", "rows"} for the chat widget's table rendering."""
+    return {
+        "columns": COLUMNS,
+        "rows": [[r["id"], r["name"] or "Not found", r["course"] or "-",
+                  "-" if r["cgpa"] is None else r["cgpa"]] for r in rows],
+    }
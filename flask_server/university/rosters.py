@@ -0,0 +1,137 @@
+"""
+Paged student, faculty and holiday lists for the chatbot.
+
+A list answer reads at most PAGE_SIZE + 1 rows, continuing after the last id
+it showed (keyset paging, so page 40 costs the same as page 1), and returns
+a generator of small text/HTML chunks. The SSE channel pushes each chunk as
+it is produced and /chatbot_api/ streams them into its JSON body, so the
+first byte goes out after one bounded query however large the roster is.
+
+When more rows are left, the chat session remembers where the list stopped
+and "more" / "show next 50" continues it.
+
+    CHATBOT_ROSTER_PAGE_SIZE   rows per answer (default 50)
+"""
+import os
+import re
+
+from markupsafe import escape
+
+from flask_server import db
+from flask_server.university.models import Course, Holidays, Student, Teacher
+
+PAGE_SIZE = int(os.environ.get("CHATBOT_ROSTER_PAGE_SIZE", "50"))
+
+_MORE = re.compile(
+    r"^\s*(show|give|send|list|load)?\s*(me\s+)?(the\s+)?(next|more)\b(\s+\d+)?"
+    r"(\s+(please|students?|faculty|teachers?|holidays?|names?|rows?))*\s*[.!?]*\s*$",
+    re.IGNORECASE,
+)
+
+
+def wants_more(text):
+    """True for "more", "next", "show next 50", "more students please", ..."""
+    return bool(_MORE.match(text or ""))
+
+
+# =============================
+# QUERIES (one keyset page each)
+# =============================
+
+def _students(key):
+    query = (db.session.query(Student.id, Student.name, Student.cgpa, Course.name)
+             .outerjoin(Course, Student.course_id == Course.course_id))
+    return (query if key is None else query.filter(Student.course_id == key)), Student.id
+
+
+def _faculty(key):
+    query = db.session.query(Teacher.id, Teacher.first_name, Teacher.last_name, Teacher.department)
+    return (query if key is None else query.filter(Teacher.department == key)), Teacher.id
+
+
+def _holidays(key):
+    return db.session.query(Holidays.id, Holidays.year, Holidays.file_name), Holidays.id
+
+
+QUERIES = {"students": _students, "faculty": _faculty, "holidays": _holidays}
+
+
+def _line(name, key, row, number, html):
+    if name == "students":
+        student_id, student, cgpa, course = row
+        cgpa = cgpa if cgpa else "N/A"
+        if html:
+            return f"{number}. <b>{escape(student)}</b> (CGPA: {cgpa})<br>"
+        if key is None:
+            return f"{number}. *{student}* ({course or 'No Course'})"
+        return f"{number}. *{student}* (ID: {student_id}) - CGPA: {cgpa}"
+    if name == "faculty":
+        _, first_name, last_name, department = row
+        full_name = escape(f"{first_name} {last_name}") if html else f"{first_name} {last_name}"
+        if html:
+            return f"{number}. <b>{full_name}</b>" + (f" ({escape(department)})" if key is None else "") + "<br>"
+        return f"{number}. *{full_name}*" + (f" ({department})" if key is None else "")
+    holiday_id, year, file_name = row
+    link = f"/download/holiday/{holiday_id}/?variant=web"
+    if html:
+        return f"📅 {year}: {escape(file_name)} <a href='{link}'>Download</a><br>"
+    return f"📅 {year}: {file_name}\n🔗 Download: {link}"
+
+
+# =============================
+# PAGES
+# =============================
+
+def page(state, name, key=None, title="", empty="No records found.", html=False, after=None, shown=0):
+    """
+    One page of the `name` list ("students", "faculty" or "holidays"), filtered
+    by `key` (course id or department) and starting after the id `after`.
+
+    The rows are read here, so the caller's session `state` already records
+    the continuation when this returns; the returned generator only formats
+    chunks. Without a `state` the list is cut at one page.
+    """
+    query, id_column = QUERIES[name](key)
+    if after is not None:
+        query = query.filter(id_column > after)
+    rows = query.order_by(id_column).limit(PAGE_SIZE + 1).all()
+    more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+
+    if state is not None:
+        if more:
+            state["more"] = {"name": name, "key": key, "title": title, "empty": empty, "html": html,
+                             "after": rows[-1][0], "shown": shown + len(rows)}
+        else:
+            state.pop("more", None)
+    return _chunks(name, key, rows, title, empty, html, shown, more, resumable=state is not None)
+
+
+def _chunks(name, key, rows, title, empty, html, shown, more, resumable):
+    if not rows:
+        yield empty
+        return
+    if html:
+        yield "<div style='background: #dff0d8; padding: 10px; border-radius: 5px;'>"
+    if title and not shown:
+        yield title
+    separator = "" if html else "\n"
+    for number, row in enumerate(rows, start=shown + 1):
+        yield (separator if number > shown + 1 else "") + _line(name, key, row, number, html)
+
+    first, last = shown + 1, shown + len(rows)
+    hint = more and resumable
+    if html:
+        if more or shown:
+            yield f"<br>➡ Showing {first}–{last}." + (f" Type <b>more</b> for the next {PAGE_SIZE}." if hint else "")
+        yield "</div>"
+    elif more or shown:
+        yield f"\n\n➡ Showing {first}–{last}." + (f" Type *more* for the next {PAGE_SIZE}." if hint else "")
+
+
+def next_page(state):
+    """(chunks, tag) continuing the list the session stopped at, or None if there is none."""
+    more = state.get("more")
+    if not more:
+        return None
+    return page(state, **more), more["name"]
@@ -1,22 +1,78 @@
 import os
-import traceback
+import logging
+import mimetypes
+import click
 from flask_server import db, app
 from datetime import datetime
 from flask import send_from_directory
-from flask import render_template, request, jsonify, redirect, url_for, send_file, abort
+from flask import render_template, request, jsonify, redirect, url_for, send_file, abort, Response, stream_with_context
 from chat import get_bot_response
+from metrics import REGISTRY
+import memory_diagnostics
+import model_serving
+import shared_cache
+from session_store import load_chat_session, save_chat_session
+from tenants import tenant_option
+from chat_channel import join_response
+from load_shedding import shed_load, degradation_level
 from flask_server.university.models import Teacher, Holidays, Student, Course,AdmissionForm
-from io import BytesIO
+from flask_server.university.http_cache import conditional
+from flask_server.university.fragments import render_fragment
+from flask_server.university.reference_data import reference
+from flask_server.university import analytics, syllabus
+from flask_server.university.results import MAX_IDS, MAX_UPLOAD_BYTES, parse_student_ids, read_uploaded_ids, result_rows
+from flask_server.university.images import schedule_derivatives, variant_path, wait_for_derivatives
+from sqlalchemy import func
+from sqlalchemy.orm import defer, joinedload
 from werkzeug.utils import secure_filename
 
+logger = logging.getLogger(__name__)
+
 # Allowed file extensions for uploads
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png', 'pdf'}
 MAX_FILE_SIZE = 20 * 1024 * 1024  # 20MB Limit
+BLOB_CHUNK_SIZE = 256 * 1024
 
 def allowed_file(filename):
     """Check if the uploaded file is allowed."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def send_derivative(digest, filename):
+    """
+    Serves the ?variant=web|thumb copy of an uploaded image.
+    Returns None when no variant was asked for or it is not rendered (yet),
+    so the caller falls back to the original.
+    """
+    variant = request.args.get('variant')
+    path = variant_path(digest, variant)
+    if not path:
+        return None
+    # ✅ URLs carrying ?v=<hash> never change content, so browsers may keep them forever
+    max_age = 31536000 if digest and request.args.get('v') == digest[:12] else 3600
+    stem = filename.rsplit('.', 1)[0]
+    return send_file(path, mimetype="image/jpeg", download_name=f"{stem}_{variant}.jpg", max_age=max_age)
+
+def send_blob(column, key_column, key, download_name, mimetype=None):
+    """
+    Streams a LargeBinary column in BLOB_CHUNK_SIZE slices instead of loading
+    the whole file into the worker, so a download holds one chunk at a time.
+    Returns None when the row or its data does not exist.
+    """
+    size = db.session.query(func.length(column)).filter(key_column == key).scalar()
+    if size is None:
+        return None
+
+    def chunks():
+        for offset in range(0, size, BLOB_CHUNK_SIZE):
+            # ✅ SQL substr() is 1-based and works on BLOB / bytea columns
+            yield db.session.query(func.substr(column, offset + 1, BLOB_CHUNK_SIZE)) \
+                .filter(key_column == key).scalar() or b""
+
+    response = Response(stream_with_context(chunks()), mimetype=mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream")
+    response.headers["Content-Length"] = str(size)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    return response
+
 @app.route("/")
 def home():
     return render_template('home.html')
@@ -25,14 +81,63 @@ def home():
 # CHATBOT ROUTE
 # =============================
 @app.route("/chat", methods=['POST'])
+@shed_load
 def chat():
     data = request.get_json()
     if not data or "message" not in data:
         return jsonify({"error": "No message received"}), 400
 
     user_message = data["message"]
-    response, tag = get_bot_response(user_message)
-    return jsonify({"response": response, "intent": tag})
+    sid, state = load_chat_session()
+    response, tag = get_bot_response(user_message, state, degradation_level())
+    return save_chat_session(jsonify(join_response({"response": response, "intent": tag})), sid, state)
+
+# =============================
+# METRICS
+# =============================
+@app.route("/metrics")
+def metrics():
+    """Per-stage and per-intent latency summaries in Prometheus text format."""
+    REGISTRY.set("process_resident_memory_bytes", memory_diagnostics.rss_bytes())
+    if memory_diagnostics.enabled():
+        REGISTRY.set("chatbot_tracemalloc_traced_bytes", memory_diagnostics.traced_bytes())
+    for name, cache in shared_cache.CACHES.items():
+        REGISTRY.set("cache_entries", cache.size(), cache=name)
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/readyz")
+def readyz():
+    """200 once the chatbot has warmed up, 503 before; for load balancer readiness checks."""
+    if not model_serving.is_ready():
+        return jsonify({"status": "warming up"}), 503
+    return jsonify({"status": "ready"})
+
+@app.route("/debug/memory")
+def debug_memory():
+    """
+    Top allocation sites of this worker as JSON. Only served when CHATBOT_TRACEMALLOC
+    is set, and only with CHATBOT_DIAGNOSTICS_TOKEN as ?token= / X-Diagnostics-Token.
+    ?group=lineno|filename|traceback, ?limit=25, ?absolute=1 for totals instead of growth since the baseline, ?reset=1 re-baselines.
+    """
+    token = request.headers.get("X-Diagnostics-Token") or request.args.get("token")
+    if not memory_diagnostics.enabled() or not memory_diagnostics.authorized(token):
+        abort(404)
+
+    group = request.args.get("group", "lineno")
+    if group not in memory_diagnostics.KEY_TYPES:
+        return jsonify({"error": f"group must be one of {', '.join(memory_diagnostics.KEY_TYPES)}"}), 400
+    limit = min(max(request.args.get("limit", 25, type=int), 0), 500)
+    result = memory_diagnostics.report(limit, group, since_baseline=not request.args.get("absolute"))
+    if request.args.get("reset"):
+        memory_diagnostics.reset_baseline()
+    return jsonify(result)
+
+@app.cli.command("clear-cache")
+@click.argument("names", nargs=-1)
+def clear_cache(names):
+    """Invalidates the named caches (all of them by default) in every worker sharing the backend."""
+    shared_cache.invalidate(*names)
+    print(f"✅ Cleared {', '.join(names) or 'all caches'} ({shared_cache.CACHE_BACKEND} backend)")
 
 # =============================
 # HOLIDAYS
@@ -51,14 +156,16 @@ def holidays():
             return jsonify({"error": "File size exceeds the 20MB limit!"}), 400
 
         filename = secure_filename(file.filename)
-        new_holiday = Holidays(year=year, file_name=filename, data=file_data)
+        digest = schedule_derivatives(file_data, filename)
+        new_holiday = Holidays(year=year, file_name=filename, data=file_data, content_hash=digest)
         db.session.add(new_holiday)
         db.session.commit()
 
         return redirect(url_for('holidays'))
 
-    holidays = Holidays.query.all()
-    return render_template('holidays.html', holidays=holidays)
+    holiday_rows = render_fragment("holiday_rows", ("holidays",), '_holiday_rows.html',
+                                   lambda: {"holidays": Holidays.query.all()})
+    return render_template('holidays.html', holiday_rows=holiday_rows)
 
 @app.route("/holidays/download/<int:id>/")
 def holidays_download(id):
@@ -66,7 +173,28 @@ def holidays_download(id):
     if not holiday:
         return jsonify({"error": "Holiday file not found"}), 404
 
-    return send_file(BytesIO(holiday.data), download_name=holiday.file_name, as_attachment=True)
+    derivative = send_derivative(holiday.content_hash, holiday.file_name)
+    if derivative:
+        return derivative
+
+    return send_blob(Holidays.data, Holidays.id, id, holiday.file_name) or (jsonify({"error": "Holiday file not found"}), 404)
+
+@app.cli.command("build-derivatives")
+@tenant_option
+def build_derivatives():
+    """Hashes and renders web/thumb copies for uploads saved before derivatives existed."""
+    for holiday in Holidays.query.filter(Holidays.content_hash.is_(None)).all():
+        holiday.content_hash = schedule_derivatives(holiday.data, holiday.file_name)
+    for record in AdmissionForm.query.all():
+        for field in ('marksheet', 'id_proof'):
+            filename = getattr(record, field)
+            path = os.path.join(app.config['UPLOAD_FOLDER'], filename) if filename else None
+            if path and not getattr(record, f'{field}_hash') and os.path.isfile(path):
+                with open(path, 'rb') as f:
+                    setattr(record, f'{field}_hash', schedule_derivatives(f.read(), filename))
+    db.session.commit()
+    wait_for_derivatives()
+    print("✅ Derivatives rendered")
 
 @app.route("/holidays/delete/<int:id>/", methods=['POST'])
 def delete_holiday(id):
@@ -88,14 +216,14 @@ from .models import Teacher  # ✅ Make sure the model is correctly imported
 @app.route("/teachers/", methods=['POST', 'GET'])
 def teachers():
     if request.method == 'POST':
-        print("🔥 Form Data Received:", request.form)  # ✅ Debugging
+        logger.debug("🔥 Form Data Received: %s", request.form)
 
         first_name = request.form.get('first_name', "").strip()
         last_name = request.form.get('last_name', "").strip()
         department = request.form.get('department', "").strip()
 
         if not first_name or not last_name or not department:
-            print("❌ ERROR: Missing required fields!")
+            logger.warning("❌ ERROR: Missing required fields!")
             return "Missing required fields!", 400  # ✅ Fix: Prevents empty data error
 
         # ✅ Save new teacher
@@ -103,23 +231,30 @@ def teachers():
         db.session.add(new_teacher)
         db.session.commit()
 
-        print("✅ SUCCESS: Teacher added successfully!")
+        logger.info("✅ SUCCESS: Teacher added successfully!")
         return redirect(url_for('teachers'))
 
     # ✅ Filtering Logic
     selected_department = request.args.get('department', "").strip()
 
-    if selected_department:
-        print(f"🔥 Debug: Filtering teachers by department: {selected_department}")  # ✅ Debugging
-        teachers = Teacher.query.filter_by(department=selected_department).all()
-    else:
-        teachers = Teacher.query.all()
+    def load_teachers():
+        if selected_department:
+            logger.debug("🔥 Filtering teachers by department: %s", selected_department)
+            return {"teachers": Teacher.query.filter_by(department=selected_department).all()}
+        return {"teachers": Teacher.query.all()}
+
+    def load_departments():
+        # ✅ Unique department names for the filter dropdown
+        return {"departments": reference().teacher_departments}
 
-    # ✅ Get unique department names for filter dropdown
-    departments = db.session.query(Teacher.department).distinct().all()
-    departments = [d[0] for d in departments]  # Convert list of tuples to list of strings
+    # ✅ Rendered rows are reused until a teacher is added, updated or deleted
+    teacher_rows = render_fragment("teacher_rows", ("teachers",), '_teacher_rows.html',
+                                   load_teachers, selected_department=selected_department)
+    department_filter = render_fragment("department_filter", ("teachers",), '_department_filter.html',
+                                        load_departments, selected_department=selected_department)
 
-    return render_template('teachers.html', teachers=teachers, departments=departments, selected_department=selected_department)
+    return render_template('teachers.html', teacher_rows=teacher_rows, department_filter=department_filter,
+                           selected_department=selected_department)
 
 
 # ✅ DELETE TEACHER
@@ -129,7 +264,7 @@ def teachers_delete(id):
     if teacher:
         db.session.delete(teacher)
         db.session.commit()
-        print(f"✅ SUCCESS: Teacher {teacher.first_name} {teacher.last_name} deleted successfully!")
+        logger.info("✅ SUCCESS: Teacher %s %s deleted successfully!", teacher.first_name, teacher.last_name)
 
     return redirect(url_for('teachers'))
 
@@ -147,11 +282,11 @@ def update_teacher(id):
         last_name = request.form.get('last_name', "").strip()  # ✅ Corrected field name
         department = request.form.get('department', "").strip()
 
-        print(f"🔥 Debug: Received Data - First Name: {first_name}, Last Name: {last_name}, Department: {department}")  # ✅ Debugging
+        logger.debug("🔥 Received Data - First Name: %s, Last Name: %s, Department: %s", first_name, last_name, department)
 
         # ✅ Fix: Prevent empty fields
         if not first_name or not last_name or not department:
-            print("❌ ERROR: Missing required fields!")
+            logger.warning("❌ ERROR: Missing required fields!")
             return "Missing required fields!", 400
 
         # ✅ Update the teacher record
@@ -160,7 +295,7 @@ def update_teacher(id):
         teacher.department = department
 
         db.session.commit()
-        print(f"✅ SUCCESS: Teacher {teacher.id} updated successfully!")
+        logger.info("✅ SUCCESS: Teacher %s updated successfully!", teacher.id)
         return redirect(url_for('teachers'))
 
     return render_template('update_teacher.html', teacher=teacher)
@@ -174,26 +309,25 @@ def update_teacher(id):
 @app.route("/students/", methods=['POST', 'GET'])
 def students():
     if request.method == 'POST':
-        print("🔥 Form Data Received:", request.form)  # ✅ Debugging Step
+        logger.debug("🔥 Form Data Received: %s", request.form)
 
         student_id = request.form.get('id', "").strip()  # ✅ Get Student ID
         name = request.form.get('name', "").strip()
         course_id = request.form.get('course_id', "").strip()
 
         if not student_id or not name or not course_id:
-            print("❌ ERROR: Missing required fields!")
+            logger.warning("❌ ERROR: Missing required fields!")
             return "Missing required fields!", 400  # ✅ Prevent empty values
 
         # 🔹 Validate course ID
         try:
             course_id = int(course_id)  # ✅ Ensure course_id is an integer
         except ValueError:
-            print("❌ ERROR: Invalid course ID format!")
+            logger.warning("❌ ERROR: Invalid course ID format!")
             return "Invalid course ID!", 400
 
-        course = Course.query.get(course_id)
-        if not course:
-            print("❌ ERROR: Course ID does not exist in the database!")
+        if not reference().course(course_id):
+            logger.warning("❌ ERROR: Course ID does not exist in the database!")
             return "Invalid course selected!", 400
 
         # 🔹 Save student with correct student_id, course_id, and CGPA
@@ -201,32 +335,47 @@ def students():
         db.session.add(new_student)
         db.session.commit()
 
-        print("✅ SUCCESS: Student added successfully!")
+        logger.info("✅ SUCCESS: Student added successfully!")
         return redirect(url_for('students'))
 
     # ✅ FIXED Filtering Logic
     course_name = request.args.get('course_name', "").strip()
 
-    if course_name:
-        print(f"🔥 Debug: Filtering students by course: {course_name}")  # ✅ Debugging
+    def load_students():
+        # ✅ One query for the students and their courses
+        query = Student.query.options(joinedload(Student.course).defer(Course.syllabus))
+        if not course_name:
+            return {"students": query.all()}  # ✅ Show all students if no filter is applied
+
+        logger.debug("🔥 Filtering students by course: %s", course_name)
 
         # ✅ Ensure case-insensitive filtering
-        course = Course.query.filter(db.func.lower(Course.name) == course_name.lower()).first()
+        course = reference().course_named(course_name)
         if course:
-            students = Student.query.filter_by(course_id=course.course_id).all()
-            print(f"✅ Found {len(students)} students in {course_name}")
+            students = query.filter(Student.course_id == course.course_id).all()
+            logger.debug("✅ Found %d students in %s", len(students), course_name)
         else:
             students = []  # ✅ No students if course is invalid
-            print("❌ No students found for this course!")
-    else:
-        students = Student.query.all()  # ✅ Show all students if no filter is applied
+            logger.debug("❌ No students found for this course!")
+        return {"students": students}
 
-    courses = Course.query.all()
+    def load_courses():
+        courses = reference().courses
+        # ✅ Debugging - Check if course data is sent to students.html
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔥 Courses sent to students.html: %s", [(c.course_id, c.name) for c in courses])
+        return {"courses": courses}
 
-    # ✅ Debugging - Check if course data is sent to students.html
-    print("🔥 DEBUG: Courses sent to students.html:", [(c.course_id, c.name) for c in courses])
+    # ✅ Rendered rows and dropdowns are reused until a student or course is written
+    student_rows = render_fragment("student_rows", ("students", "courses"), '_student_rows.html',
+                                   load_students, course_name=course_name)
+    course_filter = render_fragment("student_course_filter", ("courses",), '_student_course_filter.html',
+                                    load_courses, selected_course=course_name)
+    course_select = render_fragment("student_course_select", ("courses",), '_student_course_select.html',
+                                    load_courses)
 
-    return render_template('students.html', students=students, courses=courses, selected_course=course_name)
+    return render_template('students.html', student_rows=student_rows, course_filter=course_filter,
+                           course_select=course_select, selected_course=course_name)
 
 
 # ✅ Route to Update Student Details (CGPA & Course)
@@ -244,7 +393,7 @@ def students_update(id):
         try:
             student.cgpa = float(cgpa_value) if cgpa_value else 0.0
         except ValueError:
-            print("❌ ERROR: Invalid CGPA value!")
+            logger.warning("❌ ERROR: Invalid CGPA value!")
             return "Invalid CGPA value! Please enter a valid number.", 400
 
         # ✅ Validate Course ID
@@ -257,18 +406,16 @@ def students_update(id):
         except ValueError:
             return "Invalid course ID!", 400
 
-        course = Course.query.get(course_id)
-        if not course:
+        if not reference().course(course_id):
             return "Invalid course!", 400  # ✅ Fix: Ensure the course exists
 
         student.course_id = course_id  # ✅ Fix: Correctly update student.course_id
         db.session.commit()
 
-        print("✅ SUCCESS: Student updated successfully!")
+        logger.info("✅ SUCCESS: Student updated successfully!")
         return redirect(url_for('students'))
 
-    courses = Course.query.all()
-    return render_template('student_update.html', student=student, courses=courses)
+    return render_template('student_update.html', student=student, courses=reference().courses)
 
 
 # ✅ Route to Delete a Student
@@ -276,22 +423,22 @@ def students_update(id):
 def students_delete(id):
     student = Student.query.get(id)
     if not student:
-        print("❌ ERROR: Student not found!")
+        logger.warning("❌ ERROR: Student not found!")
         return "Student not found!", 404  # ✅ Prevent deleting non-existent student
 
     db.session.delete(student)
     db.session.commit()
-    print("✅ SUCCESS: Student deleted successfully!")
+    logger.info("✅ SUCCESS: Student deleted successfully!")
     return redirect(url_for('students'))
 
 
 # ✅ Route to Get Students by Course Name (Chatbot API)
 @app.route("/students/api/<string:course_name>/", methods=["GET"])
+@conditional("courses", "students")
 def get_students_by_course(course_name):
     """Fetch students by course name (case-insensitive) for chatbot API."""
     
-    course_name = course_name.strip().lower()  # ✅ Strip spaces & lowercase
-    course = Course.query.filter(db.func.lower(Course.name) == course_name).first()
+    course = reference().course_named(course_name)  # ✅ Case-insensitive, ignores surrounding spaces
 
     if not course:
         return jsonify({"error": "Course not found"}), 404  # ✅ Return immediately if no course
@@ -306,6 +453,39 @@ def get_students_by_course(course_name):
     return jsonify(student_list)
 
 
+# ✅ Bulk Result Lookup (JSON API for integrations)
+@app.route("/students/results/api/", methods=["GET", "POST"])
+def bulk_student_results():
+    """
+    Results for many student IDs in one request:
+    GET ?ids=1,2,3, POST {"ids": [...]} / {"ids": "1 2 3"}, or a multipart `file` with one ID list.
+    """
+    upload = request.files.get('file')
+    if upload:
+        text = read_uploaded_ids(upload)
+        if text is None:
+            return jsonify({"error": f"ID lists are limited to {MAX_UPLOAD_BYTES // 1024} KB"}), 413
+    elif request.method == 'POST':
+        ids = (request.get_json(silent=True) or {}).get('ids', "")
+        text = ",".join(map(str, ids)) if isinstance(ids, list) else str(ids)
+    else:
+        text = request.args.get('ids', "")
+
+    ids, invalid = parse_student_ids(text)
+    if not ids:
+        return jsonify({"error": "No valid student IDs given", "invalid": invalid}), 400
+    if len(ids) > MAX_IDS:
+        return jsonify({"error": f"At most {MAX_IDS} student IDs per request"}), 400
+
+    rows = result_rows(ids)
+    return jsonify({
+        "count": len(rows),
+        "found": sum(r["found"] for r in rows),
+        "results": rows,
+        "invalid": invalid,
+    })
+
+
 if __name__ == "__main__":
     app.run(debug=True)
 
@@ -329,29 +509,34 @@ def courses():
 
         return redirect(url_for('courses'))
 
-    courses = Course.query.all()
-    return render_template('courses.html', courses=courses)
+    def load_courses():
+        # ✅ Only whether a syllabus exists is shown, never the PDF itself
+        ref = reference()
+        return {"courses": ref.courses, "with_syllabus": ref.with_syllabus}
+
+    course_rows = render_fragment("course_rows", ("courses",), '_course_rows.html', load_courses)
+    return render_template('courses.html', course_rows=course_rows)
 
 # ✅ Route to Delete a Course
 @app.route("/courses/delete/<int:course_id>/", methods=['POST'])
 def courses_delete(course_id):
     course = Course.query.get(course_id)
     if course:
+        syllabus.forget_course(course_id)
         db.session.delete(course)
         db.session.commit()
     return redirect(url_for('courses'))
 
 # ✅ Route to Get All Available Course Names (JSON API)
 @app.route("/courses/names", methods=["GET"])
+@conditional("courses")
 def get_course_names():
-    courses = Course.query.all()
-    
-    if not courses:
+    course_list = reference().course_names
+
+    if not course_list:
         return jsonify({"message": "No courses found"}), 404
 
-    course_list = [course.name for course in courses]
-    
-    return jsonify({"courses": course_list})
+    return jsonify({"courses": list(course_list)})
 
 # =============================
 # SYLLABUS MANAGEMENT
@@ -368,8 +553,10 @@ def upload_syllabus(course_id):
         return jsonify({"error": "No syllabus file provided"}), 400
 
     file = request.files["syllabus"]
-    course.syllabus = file.read()  # Store syllabus as binary data
+    data = file.read()
+    course.syllabus = data  # Store syllabus as binary data
     db.session.commit()
+    syllabus.schedule_indexing(course_id, data)  # ✅ Text extraction runs off the request thread
 
     return jsonify({"message": f"Syllabus uploaded for {course.name}"}), 200
 
@@ -382,7 +569,7 @@ def update_course(course_id):
 
     if request.method == "POST":
         name = request.form.get("name")
-        syllabus = request.files.get("syllabus")
+        upload = request.files.get("syllabus")
 
         if name:
             # ✅ Prevent duplicate course names (excluding the same course)
@@ -391,10 +578,13 @@ def update_course(course_id):
                 return jsonify({"error": "Course name already exists"}), 400
             course.name = name
 
-        if syllabus:
-            course.syllabus = syllabus.read()
+        data = upload.read() if upload else None
+        if data:
+            course.syllabus = data
 
         db.session.commit()
+        if data:
+            syllabus.schedule_indexing(course_id, data)  # ✅ Text extraction runs off the request thread
         return redirect(url_for('courses'))  # ✅ Redirect after update
 
     # ✅ Render the update form with course details
@@ -404,23 +594,18 @@ def update_course(course_id):
 # ✅ Route to Download Course Syllabus
 @app.route("/download/syllabus/<int:course_id>")
 def download_syllabus(course_id):
-    course = Course.query.get(course_id)
-    if not course or not course.syllabus:
+    course = reference().course(course_id)
+    response = course and course.has_syllabus and send_blob(
+        Course.syllabus, Course.course_id, course_id, f"{course.name}_syllabus.pdf", "application/octet-stream")
+    if not response:
         return jsonify({"error": "Syllabus not available for this course."}), 404
-
-    return send_file(
-        BytesIO(course.syllabus),
-        mimetype="application/octet-stream",
-        as_attachment=True,
-        download_name=f"{course.name}_syllabus.pdf"
-    )
+    return response
 
 # ✅ Route to Retrieve Courses with Available Syllabus
 @app.route("/courses/syllabus/list", methods=["GET"])
+@conditional("courses")
 def list_courses_with_syllabus():
-    BASE_URL = "http://127.0.0.1:5000"
-    
-    courses = Course.query.filter(Course.syllabus.isnot(None)).all()
+    courses = [course for course in reference().courses if course.has_syllabus]
     if not courses:
         return jsonify({"message": "No syllabus files available."}), 404
 
@@ -428,15 +613,46 @@ def list_courses_with_syllabus():
         {
             "course_name": course.name,
             "duration": course.duration,
-            "syllabus_link": f"{BASE_URL}/download/syllabus/{course.course_id}"
+            "syllabus_link": url_for("download_syllabus", course_id=course.course_id)
         }
         for course in courses
     ]
     
     return jsonify({"courses": syllabus_list})
 
+# ✅ Route to Search Syllabus Topics (JSON API)
+@app.route("/courses/syllabus/topics/api/", methods=["GET"])
+def search_syllabus_topics():
+    """Indexed syllabus topics matching ?q=, optionally within ?course=<name>."""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query (?q=)"}), 400
+
+    course_name = request.args.get("course", "").strip()
+    course = reference().course_named(course_name) if course_name else None
+    if course_name and not course:
+        return jsonify({"error": "Course not found"}), 404
+
+    matches = syllabus.search_topics(query, course.course_id if course else None,
+                                     limit=min(request.args.get("limit", 20, type=int), 100))
+    ref = reference()
+    return jsonify({
+        "query": query,
+        "course": course.name if course else None,
+        # a course deleted since the topic index was built is left out
+        "matches": [{"course": ref.course(m.course_id).name, "subject": m.subject,
+                     "unit": m.unit, "topic": m.topic} for m in matches if ref.course(m.course_id)],
+    })
+
+@app.cli.command("index-syllabi")
+@tenant_option
+@click.option("--force", is_flag=True, help="re-extract syllabi that are already indexed")
+def index_syllabi(force):
+    """Extracts and indexes the topics of stored syllabus PDFs."""
+    print(f"✅ Indexed {syllabus.reindex(force)} syllabi")
+
 if __name__ == "__main__":
-    print("✅ Course & Syllabus management routes are ready!")
+    logger.info("✅ Course & Syllabus management routes are ready!")
     app.run(debug=True)
     
 # =============================
@@ -454,8 +670,14 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 @app.route('/admission-form/')
 def admission_form():
     """Render the Admission Form Page with available courses."""
-    courses = Course.query.all()
-    return render_template('admission_form.html', courses=courses)
+    return render_template('admission_form.html', courses=reference().courses)
+
+def save_upload(file, filename):
+    """Saves an admission document and queues its web/thumb copies. Returns the content hash."""
+    data = file.read()
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], filename), 'wb') as f:
+        f.write(data)
+    return schedule_derivatives(data, filename)
 
 @app.route('/submit-admission', methods=['POST'])
 def submit_admission():
@@ -497,25 +719,27 @@ def submit_admission():
         return "Error: Course selection is required!", 400
 
     course_id = int(course_id)
-    course = Course.query.get(course_id)
-    if not course:
+    if not reference().course(course_id):
         return "Error: Selected Course Not Found!", 400
 
     # ✅ Handle File Uploads
     marksheet_filename = None
     id_proof_filename = None
 
+    marksheet_hash = None
+    id_proof_hash = None
+
     if 'marksheet' in request.files:
         marksheet_file = request.files['marksheet']
         if marksheet_file.filename:  # Ensure file is uploaded
             marksheet_filename = secure_filename(marksheet_file.filename)
-            marksheet_file.save(os.path.join(app.config['UPLOAD_FOLDER'], marksheet_filename))
+            marksheet_hash = save_upload(marksheet_file, marksheet_filename)
 
     if 'id_proof' in request.files:
         id_proof_file = request.files['id_proof']
         if id_proof_file.filename:
             id_proof_filename = secure_filename(id_proof_file.filename)
-            id_proof_file.save(os.path.join(app.config['UPLOAD_FOLDER'], id_proof_filename))
+            id_proof_hash = save_upload(id_proof_file, id_proof_filename)
 
     # ✅ Save Admission Form
     new_admission = AdmissionForm(
@@ -524,27 +748,50 @@ def submit_admission():
         city=city, state=state, pincode=pincode, qualification=qualification, cgpa=cgpa,
         school_college=school_college, board_university=board_university,
         course_id=course_id, mode=mode, father_name=father_name, mother_name=mother_name,
-        guardian_contact=guardian_contact, marksheet=marksheet_filename, id_proof=id_proof_filename
+        guardian_contact=guardian_contact, marksheet=marksheet_filename, id_proof=id_proof_filename,
+        marksheet_hash=marksheet_hash, id_proof_hash=id_proof_hash
     )
 
     try:
         db.session.add(new_admission)
         db.session.commit()
     except Exception as e:
-        print("❌ Database Error:", e)
-        print(traceback.format_exc())
+        logger.exception("❌ Database Error: %s", e)
         return "Internal Server Error. Check logs.", 500
 
-    print(f"✅ Admission Form Submitted: {full_name}, Course ID: {course_id}")
+    logger.info("✅ Admission Form Submitted: %s, Course ID: %s", full_name, course_id)
     return render_template('success.html', name=full_name)
 
 @app.route('/admissions/')
 def view_admissions():
     """View all submitted admission forms (Admin Only)."""
-    admissions = AdmissionForm.query.all()
-    for admission in admissions:
-        admission.course_name = "N/A" if not admission.course_id else Course.query.filter_by(course_id=admission.course_id).first().name
-    return render_template('admissions.html', admissions=admissions)
+    def load_admissions():
+        admissions = AdmissionForm.query.options(joinedload(AdmissionForm.course).defer(Course.syllabus)).all()
+        for admission in admissions:
+            admission.course_name = admission.course.name if admission.course else "N/A"
+        return {"admissions": admissions}
+
+    admission_rows = render_fragment("admission_rows", ("admissions", "courses"), '_admission_rows.html',
+                                     load_admissions)
+    return render_template('admissions.html', admission_rows=admission_rows)
+
+@app.route('/admissions/analytics/')
+def admissions_analytics():
+    """Intake dashboard, read from the admission_stat summary rows."""
+    return render_template('admissions_analytics.html', stats=analytics.summary())
+
+@app.route('/admissions/analytics/api/')
+@conditional("admissions", "courses")
+def admissions_analytics_api():
+    days = request.args.get('days', 90, type=int)
+    return jsonify(analytics.summary(days=max(1, days)))
+
+@app.cli.command("rebuild-admission-stats")
+@tenant_option
+def rebuild_admission_stats():
+    """Recomputes the admissions analytics summary rows from every admission."""
+    total = analytics.rebuild()
+    print(f"✅ Admission stats rebuilt from {total} admissions")
 
 @app.route('/admissions/delete/<int:id>/', methods=['POST'])
 def delete_admission(id):
@@ -562,11 +809,8 @@ def view_admission_detail(id):
     if not record:
         return "Admission record not found!", 404
 
-    course_name = "Not Assigned"
-    if record.course_id:
-        course = Course.query.get(record.course_id)
-        if course:
-            course_name = course.name
+    course = reference().course(record.course_id) if record.course_id else None
+    course_name = course.name if course else "Not Assigned"
 
     return render_template('admission_detail.html', record=record, course_name=course_name)
 
@@ -580,13 +824,24 @@ def download_file(filename):
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
 
     # ✅ Debugging Print Statements
-    print(f"🔎 Checking for file: {file_path}")
+    logger.debug("🔎 Checking for file: %s", file_path)
     
     # ✅ Check if File Exists
     if not os.path.isfile(file_path):  # More precise check
-        print("❌ File Not Found!")
+        logger.warning("❌ File Not Found: %s", file_path)
         abort(404)
 
+    # ✅ Serve the resized copy when ?variant=web|thumb is requested
+    if request.args.get('variant'):
+        record = AdmissionForm.query.filter(
+            (AdmissionForm.marksheet == safe_filename) | (AdmissionForm.id_proof == safe_filename)
+        ).first()
+        if record:
+            digest = record.marksheet_hash if record.marksheet == safe_filename else record.id_proof_hash
+            derivative = send_derivative(digest, safe_filename)
+            if derivative:
+                return derivative
+
     # ✅ Serve File for Download
     return send_file(file_path, as_attachment=True)
 
@@ -606,12 +861,11 @@ def download_holiday(holiday_id):
     if not holiday:
         return "Holiday file not found.", 404
 
-    return send_file(
-        BytesIO(holiday.data), 
-        mimetype="application/octet-stream", 
-        as_attachment=True, 
-        download_name=holiday.file_name
-    )
+    derivative = send_derivative(holiday.content_hash, holiday.file_name)
+    if derivative:
+        return derivative
+
+    return send_blob(Holidays.data, Holidays.id, holiday_id, holiday.file_name, "application/octet-stream") or ("Holiday file not found.", 404)
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,406 @@
+"""
+Syllabus text extraction and topic search.
+
+When a syllabus PDF is uploaded, a background thread extracts its text with
+pypdf and splits it into subjects (lines such as "CS3501 COMPILER DESIGN
+L T P C"), units ("UNIT III SYNTAX ANALYSIS 9") and the topics listed under
+each unit. Every topic becomes a `syllabus_entry` row; `syllabus_document`
+records which upload was indexed and how it went.
+
+Each worker keeps an in-memory inverted index (stemmed term -> entries)
+built from those rows and rebuilt when the "syllabus" or "courses" version
+token changes (or loaded from the shared cache when another worker already
+built it), so "does CSE cover compiler design?" is answered from memory
+without touching the PDF. Without pypdf installed, syllabi are stored and
+downloadable as before but not indexed.
+
+`flask --app run index-syllabi` indexes syllabi uploaded before this existed.
+"""
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from io import BytesIO
+
+from flask import g, has_request_context
+from nltk.stem.porter import PorterStemmer
+
+from metrics import REGISTRY
+from shared_cache import Cache
+from tenants import current_tenant, tenant_scope
+from flask_server import app, db
+from flask_server.university.http_cache import version_token
+from flask_server.university.images import content_hash
+from flask_server.university.models import Course, SyllabusDocument, SyllabusEntry
+from flask_server.university.reference_data import reference
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # optional: without it syllabi are stored but not searchable
+    PdfReader = None
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = ("syllabus", "courses")
+MAX_ENTRIES = 20000
+MAX_RESULTS = 5
+
+REGISTRY.describe("syllabus_index_total", "Syllabus PDFs processed, by outcome.")
+REGISTRY.describe("syllabus_index_seconds", "Time to extract and index one syllabus PDF.")
+
+_SUBJECT = re.compile(r"^([A-Z]{2,5}\s?\d{3,5}[A-Z]?)\s+(.*[A-Za-z].*)$")
+_SUBJECT_TAIL = re.compile(r"(\s+L\s*T\s*P\s*C)?(\s+\d+(\.\d+)?){0,4}\s*$")
+_UNIT = re.compile(r"^UNIT[\s\-–:]*([IVXL]+|\d+)\b[\s:.\-–]*(.*?)[\s\-–:]*(\d+)?\s*$", re.IGNORECASE)
+# headings after which the lines are not topics (objectives, outcomes, books, ...)
+_SECTION_END = re.compile(
+    r"^(COURSE\s+)?(OBJECTIVES?|OUTCOMES?)\b|^TEXT\s*BOOKS?\b|^REFERENCES?\b|^REFERENCE\s+BOOKS?\b"
+    r"|^TOTAL\s*:?\s*\d+|^LIST\s+OF\s+EXPERIMENTS\b|^PRACTICAL\s+EXERCISES\b|^SUGGESTED\s+ACTIVITIES\b"
+    r"|^CO\s*-?\s*PO\b|^WEB\s*REFERENCES?\b",
+    re.IGNORECASE,
+)
+_TOPIC_SPLIT = re.compile(r"\s[–—-]\s|[–—;]|\.\s+|,\s+")
+_WORDS = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+# words that make up the question rather than the topic
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "for", "to", "with", "is", "are", "be", "it", "its",
+    "do", "does", "did", "there", "any", "have", "has", "we", "i", "you", "they", "me", "tell", "about",
+    "what", "which", "will", "can", "cover", "covers", "covered", "include", "includes", "included",
+    "teach", "teaches", "taught", "study", "studied", "learn", "learnt", "learned", "syllabus", "course",
+    "subject", "subjects", "topic", "topics", "unit", "units", "part", "please",
+}
+# a question verb is required: "give me cse syllabus" is a download request for course_syllabus
+_QUESTION = re.compile(r"\b(cover(s|ed)?|teach(es)?|taught|include[sd]?|stud(y|ied)|learn(t|ed)?)\b", re.IGNORECASE)
+
+_PRONOUN_IT = re.compile(r"\b(do|does|did|can|will|would)\s+it\b")
+
+_stemmer = PorterStemmer()
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="syllabus")
+
+
+def terms(text):
+    """Stemmed search terms of `text`, without stopwords."""
+    return [_stemmer.stem(w) for w in _WORDS.findall((text or "").lower()) if w not in _STOPWORDS]
+
+
+# =============================
+# EXTRACTION
+# =============================
+
+def extract_pages(data):
+    """Text of each page of a PDF."""
+    reader = PdfReader(BytesIO(data))
+    return [page.extract_text() or "" for page in reader.pages]
+
+
+def _clean(text, limit):
+    return " ".join(text.split()).strip(" :.-–")[:limit]
+
+
+def _title(text):
+    # "COMPILER DESIGN" -> "Compiler Design"; mixed-case titles are kept as written
+    return text.title() if text.isupper() else text
+
+
+def parse_syllabus(pages):
+    """
+    Splits syllabus text into [{"subject", "unit", "topic"}]: one entry per
+    subject and unit title plus one per topic listed under a unit.
+    """
+    entries = []
+    subject = unit = None
+    body = []
+
+    def flush():
+        if unit is not None and body:
+            for piece in _TOPIC_SPLIT.split(" ".join(body)):
+                topic = _clean(piece, 500)
+                if len(topic) >= 3 and re.search(r"[A-Za-z]", topic):
+                    entries.append({"subject": subject, "unit": unit, "topic": topic})
+        body.clear()
+
+    for line in "\n".join(pages).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        unit_match = _UNIT.match(line)
+        subject_match = None if unit_match else _SUBJECT.match(line)
+        if unit_match:
+            flush()
+            title = _clean(unit_match.group(2), 200)
+            unit = f"Unit {unit_match.group(1).upper()}" + (f": {_title(title)}" if title else "")
+            if title:
+                entries.append({"subject": subject, "unit": unit, "topic": _title(title)})
+        elif subject_match and not _SECTION_END.match(line):
+            flush()
+            unit = None
+            title = _clean(_SUBJECT_TAIL.sub("", subject_match.group(2)), 200)
+            subject = f"{subject_match.group(1).replace(' ', '')} {_title(title)}".strip()
+            if title:
+                entries.append({"subject": subject, "unit": None, "topic": _title(title)})
+        elif _SECTION_END.match(line):
+            flush()
+            unit = None
+        elif unit is not None:
+            body.append(line)
+    flush()
+
+    if not entries:
+        # no UNIT headings: fall back to the lines themselves
+        for line in "\n".join(pages).splitlines():
+            topic = _clean(line, 500)
+            if len(topic) >= 3 and re.search(r"[A-Za-z]", topic):
+                entries.append({"subject": None, "unit": None, "topic": topic})
+    return entries[:MAX_ENTRIES]
+
+
+# =============================
+# INDEXING (off the request thread)
+# =============================
+
+def index_syllabus(course_id, digest, data):
+    """Extracts and stores the topics of one upload unless a newer upload replaced it."""
+    doc = db.session.get(SyllabusDocument, course_id)
+    if doc is None or doc.content_hash != digest:
+        return None
+    start = time.perf_counter()
+    pages, entries, error = [], [], None
+    if PdfReader is None:
+        error = "pypdf is not installed"
+    else:
+        try:
+            pages = extract_pages(data)
+            entries = parse_syllabus(pages)
+        except Exception as e:
+            error = str(e)[:255] or type(e).__name__
+
+    db.session.refresh(doc)
+    if doc.content_hash != digest:
+        return None  # ✅ superseded while we were extracting
+    SyllabusEntry.query.filter_by(course_id=course_id).delete()
+    db.session.add_all(SyllabusEntry(course_id=course_id, **entry) for entry in entries)
+    doc.status = "failed" if error else ("indexed" if entries else "no_text")
+    doc.error = error
+    doc.pages = len(pages)
+    doc.entries = len(entries)
+    doc.indexed_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.session.commit()
+
+    REGISTRY.inc("syllabus_index_total", status=doc.status)
+    REGISTRY.observe("syllabus_index_seconds", time.perf_counter() - start)
+    if error:
+        logger.warning("⚠️ Could not index the syllabus of course %s: %s", course_id, error)
+    else:
+        logger.info("✅ Indexed %d syllabus topics of course %s", len(entries), course_id)
+    return doc.status
+
+
+def _index_in_background(tenant, course_id, digest, data):
+    with app.app_context(), tenant_scope(tenant):
+        try:
+            index_syllabus(course_id, digest, data)
+        except Exception as e:
+            logger.exception("❌ Syllabus indexing failed for course %s: %s", course_id, e)
+
+
+def mark_pending(course_id, data):
+    """
+    Records `data` as the syllabus to index for the course and commits.
+    Returns the content hash, or None when this file is already indexed.
+    """
+    digest = content_hash(data)
+    doc = db.session.get(SyllabusDocument, course_id)
+    if doc is not None and doc.content_hash == digest and doc.status != "failed":
+        return None
+    if doc is None:
+        doc = SyllabusDocument(course_id=course_id, content_hash=digest)
+        db.session.add(doc)
+    doc.content_hash, doc.status, doc.error = digest, "pending", None
+    db.session.commit()
+    return digest
+
+
+def schedule_indexing(course_id, data):
+    """Queues text extraction for a just-committed syllabus upload."""
+    digest = mark_pending(course_id, data)
+    if digest:
+        _pool.submit(_index_in_background, current_tenant(), course_id, digest, data)
+
+
+def forget_course(course_id):
+    """Removes a deleted course's topics (commit with the deletion)."""
+    SyllabusEntry.query.filter_by(course_id=course_id).delete()
+    SyllabusDocument.query.filter_by(course_id=course_id).delete()
+
+
+def reindex(force=False):
+    """Indexes every stored syllabus that is not indexed yet (all of them with `force`)."""
+    done = 0
+    for course in reference().courses:
+        if not course.has_syllabus:
+            continue
+        data = db.session.query(Course.syllabus).filter(Course.course_id == course.course_id).scalar()
+        if force:
+            SyllabusDocument.query.filter_by(course_id=course.course_id).delete()
+            db.session.commit()
+        digest = mark_pending(course.course_id, data)
+        if digest:
+            index_syllabus(course.course_id, digest, data)
+            done += 1
+    return done
+
+
+def wait_for_indexing():
+    """Blocks until every queued extraction has finished (for CLI use)."""
+    _pool.shutdown(wait=True)
+
+
+# =============================
+# SEARCH
+# =============================
+
+Topic = namedtuple("Topic", "course_id subject unit topic")
+
+
+class TopicIndex:
+    """Inverted index of stemmed terms -> syllabus entries for one version token."""
+
+    def __init__(self, token, rows):
+        self.token = token
+        self.entries = []
+        self.phrases = []
+        self.postings = {}
+        self.courses = set()
+        for row in rows:
+            entry_terms = terms(row.topic)
+            if not entry_terms:
+                continue
+            i = len(self.entries)
+            self.entries.append(row)
+            self.phrases.append(f" {' '.join(entry_terms)} ")
+            self.courses.add(row.course_id)
+            for term in set(entry_terms):
+                self.postings.setdefault(term, []).append(i)
+
+    def search(self, query_terms, course_id=None, limit=MAX_RESULTS, course_ids=None):
+        """Entries containing every query term, exact phrases and short topics first."""
+        if not query_terms:
+            return []
+        lists = sorted((self.postings.get(t, ()) for t in set(query_terms)), key=len)
+        if not lists[0]:
+            return []
+        hits = set(lists[0]).intersection(*lists[1:])
+        if course_id is not None:
+            hits = {i for i in hits if self.entries[i].course_id == course_id}
+        if course_ids is not None:
+            hits = {i for i in hits if self.entries[i].course_id in course_ids}
+        phrase = f" {' '.join(query_terms)} "
+        ranked = sorted(hits, key=lambda i: (phrase not in self.phrases[i], len(self.phrases[i]), i))
+        return [self.entries[i] for i in ranked[:limit]]
+
+
+_lock = threading.Lock()
+_indexes = {}  # tenant -> TopicIndex
+_shared = Cache("topic_index", 64)
+
+
+def topic_index():
+    """The current tenant's TopicIndex, rebuilt when syllabus entries or courses changed."""
+    if has_request_context() and "topic_index" in g:
+        return g.topic_index
+
+    tenant = current_tenant()
+    token = version_token(*RESOURCES)
+    index = _indexes.get(tenant)
+    if index is None or index.token != token:
+        with _lock:
+            index = _indexes.get(tenant)
+            if index is None or index.token != token:
+                index = _shared.get(tenant, token)
+                if index is None:
+                    courses = reference().by_id
+                    rows = (db.session.query(SyllabusEntry.course_id, SyllabusEntry.subject,
+                                             SyllabusEntry.unit, SyllabusEntry.topic)
+                            .order_by(SyllabusEntry.id).all())
+                    index = TopicIndex(token, (Topic(*row) for row in rows if row[0] in courses))
+                    _shared.put(tenant, index, token)
+                _indexes[tenant] = index
+
+    if has_request_context():
+        g.topic_index = index
+    return index
+
+
+def search_topics(text, course_id=None, limit=MAX_RESULTS):
+    return topic_index().search(terms(text), course_id, limit)
+
+
+def _where(entry):
+    return ", ".join(part for part in (entry.unit, entry.subject) if part)
+
+
+def _scope(ref, lowered):
+    """
+    (name, course ids, text without it) for the course or department named
+    in `lowered`; a full course name wins over a department ("CSE", "MECH").
+    Course ids are None when neither is named or the department has no course.
+    """
+    course = next((c for c in ref.courses if re.search(rf"\b{re.escape(c.name.lower())}\b", lowered)), None)
+    if course is not None:
+        return course.name, {course.course_id}, re.sub(rf"\b{re.escape(course.name.lower())}\b", " ", lowered)
+    # "does it cover ..." asks about "it", not the IT department
+    department = ref.find_department(_PRONOUN_IT.sub(r"\1", lowered))
+    if department is None:
+        return None, None, lowered
+    # the department is dropped from the topic even when no course matches it
+    lowered = re.sub(rf"\b{re.escape(department.lower())}\b", " ", lowered)
+    return department, (ref.department_courses(department) or None), lowered
+
+
+def _course_lines(ref, matches):
+    by_course = {}
+    for m in matches:
+        if ref.course(m.course_id) is not None:  # deleted since the index was built
+            by_course.setdefault(m.course_id, m)
+    return [f"• *{ref.course(cid).name}*: {m.topic}" + (f" ({_where(m)})" if _where(m) else "")
+            for cid, m in list(by_course.items())[:MAX_RESULTS]]
+
+
+def answer_topic_question(text):
+    """
+    Answers "does <course or department> cover <topic>?"-style questions from
+    the index. It needs a question verb (cover, teach, include, study, learn),
+    so plain "cse syllabus" requests still get the download links. Returns
+    None when `text` is not such a question or no indexed topic matches it,
+    so the normal pipeline answers instead.
+    """
+    if not _QUESTION.search(text or ""):
+        return None
+    ref = reference()
+    name, course_ids, lowered = _scope(ref, text.lower())
+    words = [w for w in _WORDS.findall(lowered) if w not in _STOPWORDS and not w.isdigit()]
+    if not words:
+        return None
+    topic = " ".join(words)
+
+    index = topic_index()
+    if course_ids is not None:
+        if not course_ids & index.courses:
+            return None
+        matches = index.search(terms(topic), limit=50 if len(course_ids) > 1 else MAX_RESULTS,
+                               course_ids=course_ids)
+        if len(course_ids) > 1:
+            lines = _course_lines(ref, matches)
+        else:
+            lines = [f"• {m.topic}" + (f" ({_where(m)})" if _where(m) else "") for m in matches]
+        if not lines:
+            return None
+        return f"✅ Yes, *{name}* covers *{topic}*:\n" + "\n".join(lines)
+
+    lines = _course_lines(ref, index.search(terms(topic), limit=50))
+    if not lines:
+        return None
+    return f"📚 *{topic}* is covered in:\n" + "\n".join(lines)
@@ -0,0 +1,88 @@
+"""
+Tokenizing, bag of words and fuzzy pattern matching for the intent classifier.
+
+Shared by chat.py, train.py and classify_batch.py; it imports neither Flask
+nor the database, so process-pool workers can load it on their own.
+"""
+import numpy as np
+import nltk
+from nltk.stem.porter import PorterStemmer
+from rapidfuzz import process
+
+nltk.download('punkt', quiet=True)
+nltk.download('punkt_tab', quiet=True)
+
+stemmer = PorterStemmer()
+
+FUZZY_CUTOFF = 70
+# model predictions at or below this probability go to fuzzy matching
+CONFIDENCE_THRESHOLD = 0.80
+# tags chat.fetch_data_from_db answers; other tags get an intents.json reply
+DB_TAGS = frozenset({"students", "holidays", "faculty", "courses", "course_syllabus"})
+
+
+def tokenize(sentence):
+    return nltk.word_tokenize(sentence)
+
+
+def stem(word):
+    return stemmer.stem(word.lower())
+
+
+def bag_of_words(tokenized_sentence, words):
+    """
+    return bag of words array:
+    1 for each known word that exists in the sentence, 0 otherwise
+    example:
+    sentence = ["hello", "how", "are", "you"]
+    words = ["hi", "hello", "I", "you", "bye", "thank", "cool"]
+    bag   = [  0 ,    1 ,    0 ,   1 ,    0 ,    0 ,      0]
+    """
+    # stem each word
+    sentence_words = [stem(word) for word in tokenized_sentence]
+    # initialize bag with 0 for each word
+    bag = np.zeros(len(words), dtype=np.float32)
+    # sorted string tables (model_artifact.StringTable) are searched in place
+    if hasattr(words, "find"):
+        for w in sentence_words:
+            idx = words.find(w)
+            if idx >= 0:
+                bag[idx] = 1
+        return bag
+
+    for idx, w in enumerate(words):
+        if w in sentence_words:
+            bag[idx] = 1
+
+    return bag
+
+
+def get_best_match(user_input, intents):
+    """
+    Finds the closest matching intent using exact matching first, then fuzzy matching.
+    Returns the best match if similarity is above 70% for fuzzy match.
+    """
+    # First, check for an exact match in the patterns
+    for intent in intents["intents"]:
+        for pattern in intent["patterns"]:
+            if user_input.lower().strip() == pattern.lower().strip():
+                return intent["tag"]  # Exact match found
+
+    # If no exact match, proceed with fuzzy matching
+    best_match_score = 0
+    best_match_tag = None
+
+    # Iterate through intents for fuzzy matching
+    for intent in intents["intents"]:
+        for pattern in intent["patterns"]:
+            score = process.extractOne(user_input, [pattern], score_cutoff=FUZZY_CUTOFF)  # Fuzzy matching
+
+            if score and score[1] > best_match_score:
+                best_match_score = score[1]
+                best_match_tag = intent["tag"]
+
+    # Return the best match if fuzzy score is above threshold
+    if best_match_score >= FUZZY_CUTOFF:
+        return best_match_tag
+    else:
+        return None  # No suitable match found
@@ -0,0 +1,234 @@
+"""
+Compiles intents.json into a deduplicated intents.compiled.json.
+
+Patterns are normalized (lowercase, no ?!., single spaces), then collapsed
+within each intent when they are exact duplicates, differ only by repeated
+letters or spacing ("hii" / "hiii" / "hi", "dress code" / "dresscode") or are
+near duplicates: the same words except one long word a single edit away
+("holiday details" / "holidays details"). Short words never count as near
+duplicates, so "cse" / "ece" and similar entity variants are kept. A
+pattern that appears under more than one tag is a conflict: it is kept under
+the first tag (the one the exact-match lookup already answers with) and
+reported.
+
+    python intents_compiler.py                      # intents.json -> intents.compiled.json
+    python intents_compiler.py --keep-near          # exact / repeated-letter duplicates only
+    python intents_compiler.py --check              # report only, exit 1 on conflicts
+
+chat.py and train.py read the compiled file through load_intents() as long as
+it was built from the current intents.json.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+from rapidfuzz import fuzz
+from rapidfuzz.distance import Levenshtein
+
+logger = logging.getLogger(__name__)
+
+SOURCE_FILE = "intents.json"
+COMPILED_FILE = "intents.compiled.json"
+NEAR_MIN_WORD_LENGTH = 5
+
+_PUNCT_TABLE = str.maketrans("", "", "?!.,")
+_REPEATS = re.compile(r"(.)\1+")
+
+
+def normalize_message(text):
+    """Lowercases, drops ?!., and collapses whitespace so trivial variants share a key."""
+    return " ".join(text.lower().translate(_PUNCT_TABLE).split())
+
+
+def squeeze(text):
+    """Collapses repeated letters and drops spaces, so "hii", "hiii" and "hi" share a key."""
+    return _REPEATS.sub(r"\1", text.replace(" ", ""))
+
+
+def is_near_duplicate(a, b):
+    """Same words except one word of 5+ letters that is a single edit away."""
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    differing = [(x, y) for x, y in zip(words_a, words_b) if x != y]
+    if len(differing) != 1:
+        return False
+    x, y = differing[0]
+    return min(len(x), len(y)) >= NEAR_MIN_WORD_LENGTH and Levenshtein.distance(x, y) <= 1
+
+
+def _sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# =============================
+# COMPILER
+# =============================
+
+def compile_intents(intents, collapse_near=True):
+    """Returns (compiled intents dict, report dict)."""
+    owner = {}          # squeezed key -> first tag that used it
+    conflicts = []
+    compiled = []
+    per_tag = []
+    totals = {"exact": 0, "near": 0, "conflict": 0}
+
+    for intent in intents["intents"]:
+        tag = intent["tag"]
+        seen = set()
+        kept = []
+        removed = {"exact": 0, "near": 0, "conflict": 0}
+
+        for pattern in intent["patterns"]:
+            normalized = normalize_message(pattern)
+            key = squeeze(normalized)
+            if not normalized or key in seen:
+                removed["exact"] += 1
+                continue
+            first_tag = owner.setdefault(key, tag)
+            if first_tag != tag:
+                conflicts.append({"pattern": pattern, "tag": tag, "kept_under": first_tag})
+                removed["conflict"] += 1
+                continue
+            if collapse_near and any(is_near_duplicate(normalized, other) for other in kept):
+                removed["near"] += 1
+                seen.add(key)
+                continue
+            seen.add(key)
+            kept.append(normalized)
+
+        compiled.append(dict(intent, patterns=kept))
+        per_tag.append({"tag": tag, "before": len(intent["patterns"]), "after": len(kept), **removed})
+        for reason, count in removed.items():
+            totals[reason] += count
+
+    before = sum(t["before"] for t in per_tag)
+    after = sum(t["after"] for t in per_tag)
+    report = {
+        "patterns_before": before,
+        "patterns_after": after,
+        "removed": totals,
+        "collapse_near": collapse_near,
+        "conflicts": conflicts,
+        "tags": per_tag,
+        # get_best_match scores every pattern once, so its cost is linear in the count
+        "projected_fuzzy_speedup": round(before / after, 2) if after else None,
+    }
+    return dict(intents, intents=compiled), report
+
+
+def measure_fuzzy_scan(original, compiled, samples=200, repeat=5, seed=0):
+    """Times a get_best_match-style scan of every pattern for sample messages."""
+    before = [p for intent in original["intents"] for p in intent["patterns"]]
+    after = [p for intent in compiled["intents"] for p in intent["patterns"]]
+    queries = random.Random(seed).sample(before, min(samples, len(before)))
+
+    def scan(patterns):
+        start = time.perf_counter()
+        for query in queries:
+            # one score per pattern, like the loop in get_best_match
+            for pattern in patterns:
+                fuzz.WRatio(query, pattern, score_cutoff=70)
+        return (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+
+    # best of several alternating rounds, so a noisy first run does not decide
+    rounds = [(scan(before), scan(after)) for _ in range(repeat)]
+    before_ms, after_ms = min(r[0] for r in rounds), min(r[1] for r in rounds)
+    return {"before_ms": round(before_ms, 3), "after_ms": round(after_ms, 3),
+            "speedup": round(before_ms / after_ms, 2) if after_ms else None}
+
+
+def build(source=SOURCE_FILE, out=COMPILED_FILE, collapse_near=True, measure=True):
+    """Compiles `source` into `out` and returns the report."""
+    with open(source, "r") as f:
+        original = json.load(f)
+    compiled, report = compile_intents(original, collapse_near)
+    if measure:
+        report["measured_fuzzy_scan"] = measure_fuzzy_scan(original, compiled)
+
+    if out:
+        compiled["compiled_from"] = {"file": os.path.basename(source), "sha256": _sha256(source),
+                                     "collapse_near": collapse_near}
+        tmp_path = out + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(compiled, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, out)
+    return report
+
+
+# =============================
+# LOADING
+# =============================
+
+def load_intents(source=SOURCE_FILE, compiled=COMPILED_FILE, use_env=True):
+    """
+    Returns the compiled intents when `compiled` was built from the current
+    `source`, otherwise `source` itself. CHATBOT_INTENTS_FILE forces a file
+    (unless `use_env` is false, as for other tenants' intents).
+    """
+    forced = os.environ.get("CHATBOT_INTENTS_FILE") if use_env else None
+    if forced:
+        with open(forced, "r") as f:
+            return json.load(f)
+
+    if os.path.exists(compiled):
+        with open(compiled, "r") as f:
+            data = json.load(f)
+        if data.get("compiled_from", {}).get("sha256") == _sha256(source):
+            return data
+        logger.warning("⚠️ %s is out of date, using %s (run `python intents_compiler.py`)", compiled, source)
+
+    with open(source, "r") as f:
+        return json.load(f)
+
+
+def _print_report(report):
+    print(f"📚 {report['patterns_before']} patterns -> {report['patterns_after']} "
+          f"(exact {report['removed']['exact']}, near {report['removed']['near']}, "
+          f"conflicting {report['removed']['conflict']} removed)")
+    print(f"   projected fuzzy-match speedup: {report['projected_fuzzy_speedup']}x")
+    measured = report.get("measured_fuzzy_scan")
+    if measured:
+        print(f"   measured fuzzy scan: {measured['before_ms']:.2f} ms -> {measured['after_ms']:.2f} ms "
+              f"per message ({measured['speedup']}x)")
+
+    print(f"\n{'tag':<24} {'before':>7} {'after':>6} {'exact':>6} {'near':>5} {'conflict':>8}")
+    for t in report["tags"]:
+        print(f"{t['tag']:<24} {t['before']:>7} {t['after']:>6} {t['exact']:>6} {t['near']:>5} {t['conflict']:>8}")
+
+    if report["conflicts"]:
+        print(f"\n⚠️ {len(report['conflicts'])} patterns appear under more than one tag:")
+        for c in report["conflicts"]:
+            print(f"  {c['pattern']!r}: {c['tag']} (kept under {c['kept_under']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalize and deduplicate intents.json")
+    parser.add_argument("--source", default=SOURCE_FILE)
+    parser.add_argument("--out", default=COMPILED_FILE)
+    parser.add_argument("--keep-near", action="store_true", help="only collapse exact and repeated-letter duplicates")
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 if patterns conflict")
+    parser.add_argument("--report", help="also write the full report as JSON")
+    parser.add_argument("--no-measure", action="store_true", help="skip timing the fuzzy scan")
+    args = parser.parse_args(argv)
+
+    report = build(args.source, None if args.check else args.out, not args.keep_near, not args.no_measure)
+    _print_report(report)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if not args.check:
+        print(f"\n✅ Wrote {args.out}")
+    elif report["conflicts"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Admission control for the chatbot endpoints.
+
+Each request first takes a token from its client's bucket (429 when empty),
+then a slot from a concurrency limiter with a bounded wait queue (503 when
+the queue is full or the wait times out). While requests are queued, the
+chatbot degrades in steps so the queue drains faster:
+
+    DEGRADE_NONE            full pipeline
+    DEGRADE_NO_SPELLCHECK   skip TextBlob correction
+    DEGRADE_NO_FUZZY        also skip the rapidfuzz fallback
+    DEGRADE_CACHED_ONLY     answer only from exact patterns / the response cache
+
+Clients are told apart by address, not by the chat_sid cookie: a client that
+drops its cookie would get a fresh bucket with every message. Behind a reverse
+proxy every request arrives from the proxy, so set CHATBOT_PROXY_HOPS (see
+flask_server/__init__.py) to take the address from X-Forwarded-For instead.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from metrics import REGISTRY
+
+DEGRADE_NONE = 0
+DEGRADE_NO_SPELLCHECK = 1
+DEGRADE_NO_FUZZY = 2
+DEGRADE_CACHED_ONLY = 3
+LEVEL_NAMES = ["normal", "no_spellcheck", "no_fuzzy", "cached_only"]
+
+MAX_CONCURRENT = int(os.environ.get("CHATBOT_MAX_CONCURRENT", str(2 * (os.cpu_count() or 2))))
+MAX_QUEUE = int(os.environ.get("CHATBOT_MAX_QUEUE", "32"))
+QUEUE_TIMEOUT = float(os.environ.get("CHATBOT_QUEUE_TIMEOUT", "2.0"))
+RATE_LIMIT = float(os.environ.get("CHATBOT_RATE_LIMIT", "5"))    # requests/sec per client
+RATE_BURST = float(os.environ.get("CHATBOT_RATE_BURST", "10"))
+MAX_TRACKED_CLIENTS = 10000
+
+# Queue depth (as a fraction of MAX_QUEUE) at which each level starts
+DEGRADE_THRESHOLDS = [(0.75, DEGRADE_CACHED_ONLY), (0.5, DEGRADE_NO_FUZZY), (0.25, DEGRADE_NO_SPELLCHECK)]
+
+REGISTRY.describe("chatbot_shed_total", "Chatbot requests rejected by admission control.")
+REGISTRY.describe("chatbot_degradation_transitions_total", "Changes of the chatbot degradation level.")
+REGISTRY.describe("chatbot_degradation_level", "Current chatbot degradation level (0 = normal).")
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def retry_after(self):
+        return max(1, int((1 - self.tokens) / self.rate + 0.999)) if self.rate > 0 else 60
+
+
+class RateLimiter:
+    """Per-client token buckets; the least recently seen clients are forgotten first."""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, client):
+        """Returns (allowed, retry_after_seconds)."""
+        if self.rate <= 0:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            if bucket.take(now):
+                return True, 0
+            return False, bucket.retry_after()
+
+
+class ConcurrencyLimiter:
+    """At most `limit` requests run at once; up to `max_queue` more wait for a slot."""
+
+    def __init__(self, limit=MAX_CONCURRENT, max_queue=MAX_QUEUE, timeout=QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.level = DEGRADE_NONE
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Returns None on success, otherwise the rejection reason."""
+        with self._cond:
+            if self.active < self.limit and self.waiting == 0:
+                self.active += 1
+                return None
+            if self.waiting >= self.max_queue:
+                return "queue_full"
+            self.waiting += 1
+            self._update_level()
+            deadline = time.monotonic() + self.timeout
+            try:
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return "queue_timeout"
+                    self._cond.wait(remaining)
+                self.active += 1
+                return None
+            finally:
+                self.waiting -= 1
+                self._update_level()
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def _update_level(self):
+        depth = self.waiting / self.max_queue if self.max_queue else 0
+        level = next((lvl for threshold, lvl in DEGRADE_THRESHOLDS if depth >= threshold), DEGRADE_NONE)
+        if level != self.level:
+            REGISTRY.inc("chatbot_degradation_transitions_total",
+                         **{"from": LEVEL_NAMES[self.level], "to": LEVEL_NAMES[level]})
+            REGISTRY.set("chatbot_degradation_level", level)
+            self.level = level
+
+
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+def degradation_level():
+    """The level admitted for the current request (DEGRADE_NONE outside shed_load)."""
+    return g.get("degradation_level", DEGRADE_NONE)
+
+
+def shed_load(view):
+    """Applies rate limiting, the concurrency limit and degradation to a chatbot view."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        allowed, retry_after = rate_limiter.allow(request.remote_addr or "")
+        if not allowed:
+            REGISTRY.inc("chatbot_shed_total", reason="rate_limited")
+            response = jsonify({"response": "Too many messages, please slow down.", "tag": "error"})
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+
+        reason = concurrency_limiter.acquire()
+        if reason:
+            REGISTRY.inc("chatbot_shed_total", reason=reason)
+            response = jsonify({"response": "The assistant is busy right now, please try again shortly.",
+                                "tag": "error"})
+            response.headers["Retry-After"] = "1"
+            return response, 503
+
+        try:
+            g.degradation_level = concurrency_limiter.level
+            return view(*args, **kwargs)
+        finally:
+            concurrency_limiter.release()
+
+    return wrapper
@@ -0,0 +1,143 @@
+"""
+Opt-in allocation tracking for long-running workers.
+
+With CHATBOT_TRACEMALLOC=<frames> set, tracemalloc starts as soon as run.py is
+imported (before the model, spaCy and TextBlob load) and /debug/memory
+reports the top allocation sites of the serving worker, optionally as growth
+since a baseline snapshot. Tracing costs memory and some CPU per allocation,
+so leave it off in normal production.
+
+    CHATBOT_TRACEMALLOC          traceback frames kept per allocation (unset/0 = off)
+    CHATBOT_DIAGNOSTICS_TOKEN    token required by /debug/memory (without it the
+                                 endpoint is off: behind a same-host reverse proxy
+                                 every client looks like loopback)
+"""
+import hmac
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TRACEMALLOC_FRAMES = int(os.environ.get("CHATBOT_TRACEMALLOC", "0") or 0)
+DIAGNOSTICS_TOKEN = os.environ.get("CHATBOT_DIAGNOSTICS_TOKEN", "")
+KEY_TYPES = ("lineno", "filename", "traceback")
+
+REGISTRY.describe("process_resident_memory_bytes", "Resident set size of this worker.")
+REGISTRY.describe("chatbot_tracemalloc_traced_bytes", "Memory traced by tracemalloc (CHATBOT_TRACEMALLOC).")
+
+# allocations made by tracemalloc itself and the import machinery are noise
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+_lock = threading.Lock()
+_baseline = None
+_baseline_at = None
+
+
+def rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def enabled():
+    return tracemalloc.is_tracing()
+
+
+def traced_bytes():
+    return tracemalloc.get_traced_memory()[0]
+
+
+def start(frames=None):
+    """Starts tracing (if not already) and takes the first baseline snapshot."""
+    frames = TRACEMALLOC_FRAMES if frames is None else frames
+    if frames <= 0:
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    if not DIAGNOSTICS_TOKEN:
+        logger.warning("⚠️ CHATBOT_TRACEMALLOC is on but CHATBOT_DIAGNOSTICS_TOKEN is unset: /debug/memory stays off")
+    reset_baseline()
+    return True
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def reset_baseline():
+    """Makes the current heap the reference point for growth reports."""
+    global _baseline, _baseline_at
+    snapshot = _snapshot()
+    with _lock:
+        _baseline, _baseline_at = snapshot, time.time()
+
+
+def authorized(token=None):
+    """True for the configured CHATBOT_DIAGNOSTICS_TOKEN; always False without one."""
+    return bool(DIAGNOSTICS_TOKEN) and bool(token) and hmac.compare_digest(token, DIAGNOSTICS_TOKEN)
+
+
+def _site(traceback, key_type):
+    if key_type == "traceback":
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+    frame = traceback[0]
+    return frame.filename if key_type == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+def report(limit=25, key_type="lineno", since_baseline=True):
+    """
+    Top `limit` allocation sites of this process. With `since_baseline` the
+    entries are sorted by growth since the last baseline and carry
+    size_diff / count_diff.
+    """
+    if key_type not in KEY_TYPES:
+        raise ValueError(f"key_type must be one of {', '.join(KEY_TYPES)}")
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = _snapshot()
+    with _lock:
+        baseline, baseline_at = _baseline, _baseline_at
+
+    if since_baseline and baseline is not None:
+        stats = snapshot.compare_to(baseline, key_type)
+        stats.sort(key=lambda s: (s.size_diff, s.size), reverse=True)
+        top = [{"site": _site(s.traceback, key_type), "size": s.size, "count": s.count,
+                "size_diff": s.size_diff, "count_diff": s.count_diff} for s in stats[:limit]]
+    else:
+        stats = snapshot.statistics(key_type)
+        top = [{"site": _site(s.traceback, key_type), "size": s.size, "count": s.count}
+               for s in stats[:limit]]
+
+    return {
+        "pid": os.getpid(),
+        "time": time.time(),
+        "rss_bytes": rss_bytes(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+        "baseline_age_seconds": round(time.time() - baseline_at, 1) if baseline_at else None,
+        "key_type": key_type,
+        "top": top,
+    }
+
+
+start()
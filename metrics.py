@@ -0,0 +1,216 @@
+"""
+In-process latency metrics for the chatbot, exported in Prometheus text format.
+
+Summaries keep a bounded reservoir of recent samples, so p50/p95/p99 reflect
+current traffic rather than the whole life of the worker.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+RESERVOIR_SIZE = 2048
+
+# Fraction of chatbot requests to run under cProfile (0 disables profiling).
+PROFILE_SAMPLE_RATE = float(os.environ.get("CHATBOT_PROFILE_SAMPLE_RATE", "0"))
+
+
+class Summary:
+    """Count, sum and a reservoir of recent observations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = Summary()
+            summary.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def counter_values(self, name):
+        """Returns {labels: value} for one counter, e.g. for ratios in reports."""
+        with self._lock:
+            return {labels: v for (n, labels), v in self._counters.items() if n == name}
+
+    def snapshot(self):
+        """Returns {name: {labels: {"count", "sum", quantile...}}} for reports."""
+        with self._lock:
+            items = [(key, s.count, s.total, s.quantiles()) for key, s in self._summaries.items()]
+        result = {}
+        for (name, labels), count, total, quantiles in items:
+            entry = {"count": count, "sum": total}
+            entry.update({f"p{int(q * 100)}": v for q, v in quantiles.items()})
+            result.setdefault(name, {})[labels] = entry
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._summaries.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def render(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        with self._lock:
+            summaries = [(key, s.count, s.total, s.quantiles()) for key, s in self._summaries.items()]
+            counters = list(self._counters.items())
+            gauges = list(self._gauges.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), count, total, quantiles in sorted(summaries):
+            header(name, "summary")
+            for q, v in quantiles.items():
+                lines.append(f"{name}{_labels(labels + (('quantile', q),))} {v:.6f}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in sorted(counters):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges):
+            header(name, "gauge")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+REGISTRY = Registry()
+REGISTRY.describe("chatbot_stage_seconds", "Time spent in each get_bot_response stage, per answered tag.")
+REGISTRY.describe("chatbot_response_seconds", "End-to-end get_bot_response latency per intent.")
+
+
+class StageTimer:
+    """
+    Times the stages of one chatbot request.
+
+        timer = StageTimer()
+        with timer.stage("inference"):
+            ...
+        timer.finish(tag)
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.details = {}   # free-form facts about the request, e.g. for transcripts
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self, intent):
+        elapsed = time.perf_counter() - self.started
+        for name, seconds in self.stages.items():
+            REGISTRY.observe("chatbot_stage_seconds", seconds, stage=name, tag=intent or "unknown")
+        REGISTRY.observe("chatbot_response_seconds", elapsed, intent=intent or "unknown")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("⏱ %s in %.1f ms: %s", intent, elapsed * 1000,
+                         ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.stages.items()))
+        return elapsed
+
+
+def _log_profile(stats):
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(20)
+    logger.info("🔬 Sampled chatbot profile:\n%s", stream.getvalue())
+
+
+_profile_hook = _log_profile
+# cProfile cannot run two profilers at once (Python 3.12+ raises), so threaded
+# workers profile one sampled request at a time and skip the others
+_profile_lock = threading.Lock()
+
+
+def set_profile_hook(hook):
+    """Replaces the callback that receives pstats.Stats for sampled requests."""
+    global _profile_hook
+    _profile_hook = hook
+
+
+@contextmanager
+def sampled_profile(rate=None):
+    """Runs the block under cProfile for a `rate` fraction of calls, one at a time."""
+    rate = PROFILE_SAMPLE_RATE if rate is None else rate
+    if rate <= 0 or random.random() >= rate or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler (a debugger, coverage) is active
+            logger.warning("⚠️ Skipping sampled profile: another profiler is active")
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _profile_hook(pstats.Stats(profiler))
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,229 @@
+"""
+Compact binary model artifact used by train.py and chat.py.
+
+Layout (all integers little-endian):
+
+    header      fixed struct, see HEADER below
+    vocab       sorted string table: uint32 offsets[count + 1] + utf-8 blob
+    tags        string table with the same layout
+    tensors     directory of (name, shape, offset) entries
+    weights     contiguous float32 arrays, each aligned to 64 bytes
+
+The header carries a CRC32 of everything after it, so a truncated or
+corrupted file is rejected before any weights are handed to torch.
+Nothing is unpickled: the file is memory-mapped and the vocabulary is
+searched in place, so loading only touches the pages that are used.
+"""
+import mmap
+import struct
+import zlib
+from bisect import bisect_left
+
+import numpy as np
+
+MAGIC = b"PECM"
+VERSION = 1
+ALIGNMENT = 64
+
+# magic, version, flags, input_size, hidden_size, output_size, num_layers,
+# vocab_count, tag_count, tensor_count, payload_crc32, payload_length
+HEADER = struct.Struct("<4sHHIIIIIIIIQ")
+
+
+class ArtifactError(Exception):
+    """Raised when a model artifact is missing, truncated or corrupted."""
+
+
+def _pack_strings(strings):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(encoded)
+
+
+def _pad(buffer):
+    buffer.extend(b"\0" * (-len(buffer) % ALIGNMENT))
+
+
+def save_artifact(path, model_state, input_size, hidden_size, output_size, all_words, tags, num_layers=4):
+    """
+    Writes the model to `path` in the artifact format.
+    `model_state` is a state_dict (torch tensors or numpy arrays).
+    """
+    if list(all_words) != sorted(all_words):
+        raise ValueError("all_words must be sorted so the vocabulary can be binary searched")
+    payload = bytearray()
+    payload += _pack_strings(all_words)
+    payload += _pack_strings(tags)
+
+    arrays = [(name, np.ascontiguousarray(np.asarray(t.cpu() if hasattr(t, "cpu") else t), dtype="<f4"))
+              for name, t in model_state.items()]
+
+    # The directory size depends only on names and shapes, so offsets can be
+    # computed before any weight data is appended.
+    directory_size = sum(2 + len(name.encode("utf-8")) + 1 + 4 * a.ndim + 8 for name, a in arrays)
+    data_start = HEADER.size + len(payload) + directory_size
+    data_start += -data_start % ALIGNMENT
+
+    directory = bytearray()
+    data = bytearray()
+    for name, array in arrays:
+        encoded = name.encode("utf-8")
+        offset = data_start + len(data)
+        directory += struct.pack("<H", len(encoded)) + encoded
+        directory += struct.pack(f"<B{array.ndim}I", array.ndim, *array.shape)
+        directory += struct.pack("<Q", offset)
+        data += array.tobytes()
+        _pad(data)
+
+    payload += directory
+    payload += b"\0" * (data_start - HEADER.size - len(payload))
+    payload += data
+
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, input_size, hidden_size, output_size, num_layers,
+        len(all_words), len(tags), len(arrays), zlib.crc32(payload), len(payload)
+    )
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(payload)
+
+
+class StringTable:
+    """Read-only view of a sorted string table inside the mapped file."""
+
+    def __init__(self, buffer, start, count):
+        self._buffer = buffer
+        self._offsets = np.frombuffer(buffer, dtype="<u4", count=count + 1, offset=start)
+        self._blob = start + 4 * (count + 1)
+        self.nbytes = 4 * (count + 1) + int(self._offsets[-1])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        start = self._blob + int(self._offsets[index])
+        end = self._blob + int(self._offsets[index + 1])
+        return bytes(self._buffer[start:end]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __contains__(self, word):
+        return self.find(word) >= 0
+
+    def find(self, word):
+        """Binary search for `word`; returns its index or -1."""
+        i = bisect_left(self, word)
+        if i < len(self) and self[i] == word:
+            return i
+        return -1
+
+    def index(self, word):
+        i = self.find(word)
+        if i < 0:
+            raise ValueError(f"{word!r} is not in the vocabulary")
+        return i
+
+
+class ModelArtifact:
+    """
+    Lazily loaded model artifact.
+    The file stays memory-mapped; tensors are materialized on `state_dict()`.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise ArtifactError(f"Cannot open model artifact {path}: {e}") from e
+
+        if len(self._mmap) < HEADER.size:
+            raise ArtifactError(f"{path} is too small to be a model artifact")
+
+        (magic, version, _flags, self.input_size, self.hidden_size, self.output_size,
+         self.num_layers, vocab_count, tag_count, tensor_count,
+         self._crc, payload_length) = HEADER.unpack_from(self._mmap, 0)
+
+        if magic != MAGIC:
+            raise ArtifactError(f"{path} is not a model artifact (bad magic {magic!r})")
+        if version != VERSION:
+            raise ArtifactError(f"{path} has unsupported artifact version {version}")
+        if HEADER.size + payload_length != len(self._mmap):
+            raise ArtifactError(f"{path} is truncated or has trailing data")
+        if verify:
+            self.verify()
+
+        self.vocab = StringTable(self._mmap, HEADER.size, vocab_count)
+        tags_start = HEADER.size + self.vocab.nbytes
+        tags = StringTable(self._mmap, tags_start, tag_count)
+        self.tags = list(tags)
+        self._directory_start = tags_start + tags.nbytes
+        self._tensor_count = tensor_count
+        self._tensors = None
+
+    def verify(self):
+        """Checks the payload CRC32 recorded in the header."""
+        if zlib.crc32(memoryview(self._mmap)[HEADER.size:]) != self._crc:
+            raise ArtifactError(f"{self.path} failed checksum validation")
+
+    def _read_directory(self):
+        tensors = {}
+        pos = self._directory_start
+        for _ in range(self._tensor_count):
+            (name_length,) = struct.unpack_from("<H", self._mmap, pos)
+            pos += 2
+            name = bytes(self._mmap[pos:pos + name_length]).decode("utf-8")
+            pos += name_length
+            (ndim,) = struct.unpack_from("<B", self._mmap, pos)
+            pos += 1
+            shape = struct.unpack_from(f"<{ndim}I", self._mmap, pos)
+            pos += 4 * ndim
+            (offset,) = struct.unpack_from("<Q", self._mmap, pos)
+            pos += 8
+            count = int(np.prod(shape)) if shape else 1
+            tensors[name] = np.frombuffer(self._mmap, dtype="<f4", count=count, offset=offset).reshape(shape)
+        return tensors
+
+    def arrays(self):
+        """Returns the weights as read-only numpy views into the mapped file."""
+        if self._tensors is None:
+            self._tensors = self._read_directory()
+        return self._tensors
+
+    def state_dict(self):
+        """Returns a torch state_dict built from the mapped weights."""
+        import torch
+        return {name: torch.from_numpy(array.copy()) for name, array in self.arrays().items()}
+
+
+def load_artifact(path, verify=True):
+    return ModelArtifact(path, verify=verify)
+
+
+def convert_checkpoint(src, dst):
+    """Converts a legacy torch.save checkpoint (data.pth) into an artifact."""
+    import torch
+    data = torch.load(src, map_location="cpu")
+    save_artifact(
+        dst, data["model_state"], data["input_size"], data["hidden_size"],
+        data["output_size"], data["all_words"], data["tags"]
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("usage: python model_artifact.py data.pth data.bin")
+        sys.exit(1)
+    convert_checkpoint(sys.argv[1], sys.argv[2])
+    print(f"✅ Converted {sys.argv[1]} -> {sys.argv[2]}")
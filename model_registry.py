@@ -0,0 +1,173 @@
+"""
+Per-tenant intent models, loaded on demand and kept under a memory budget.
+
+chat.py loads the default tenant's model at start-up; it is never evicted.
+Another tenant (see tenants.py) with its own "intents" and "model" files has
+them loaded on its first message: intents, exact patterns, vocabulary, tags,
+the serving model (frozen like the default one) and, with CHATBOT_ENGINE=tfidf,
+the TF-IDF pattern matrix. When the resident
+tenant models exceed CHATBOT_MODEL_MEMORY_MB, the least recently used ones
+are dropped and reloaded on their next message.
+
+    CHATBOT_MODEL_MEMORY_MB   budget for resident tenant models (default 512)
+"""
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import torch
+
+from intents_compiler import normalize_message
+from metrics import REGISTRY
+from model_artifact import load_artifact
+from model_serving import prepare_model
+from neural_net import NeuralNet
+from tfidf_engine import ENGINE, TfidfIndex
+
+logger = logging.getLogger(__name__)
+
+MEMORY_BUDGET = int(float(os.environ.get("CHATBOT_MODEL_MEMORY_MB", "512")) * 1024 * 1024)
+
+REGISTRY.describe("tenant_model_loads_total", "Tenant intent models loaded, by tenant.")
+REGISTRY.describe("tenant_model_evictions_total", "Tenant intent models dropped to stay within the memory budget.")
+REGISTRY.describe("tenant_model_load_seconds", "Time to load one tenant's intents and model.")
+REGISTRY.describe("tenant_models_resident", "Tenant intent models currently loaded (besides the default).")
+REGISTRY.describe("tenant_models_resident_bytes", "Approximate memory held by the loaded tenant models.")
+
+
+class IntentModel:
+    """Intents, vocabulary, tags and serving model of one tenant."""
+
+    def __init__(self, name, intents, model, all_words, tags, input_size, device, version, weight_bytes=0,
+                 engine=ENGINE):
+        self.name = name
+        self.intents = intents
+        self.model = model
+        self.all_words = all_words
+        self.tags = tags
+        self.input_size = input_size
+        self.device = device
+        self.version = version
+        # First intent wins on duplicate patterns, as in get_best_match
+        self.exact_patterns = {}
+        self.intent_responses = {}
+        for intent in intents["intents"]:
+            self.intent_responses[intent["tag"]] = intent["responses"]
+            for pattern in intent["patterns"]:
+                self.exact_patterns.setdefault(normalize_message(pattern), intent["tag"])
+        # the pattern matrix of the retrieval engine, when that one classifies
+        self.tfidf = TfidfIndex(intents) if engine == "tfidf" else None
+        # rough: weights, plus the intents and vocabulary as Python objects
+        self.nbytes = weight_bytes + 4 * len(json.dumps(intents)) + 64 * len(all_words)
+        if self.tfidf is not None:
+            self.nbytes += self.tfidf.nbytes
+
+
+def load_model_file(model_file, device, legacy_file=None):
+    """
+    (model, all_words, tags, input_size, version, weight_bytes) from a data.bin
+    artifact, or from a pickled `legacy_file` when only that exists.
+    """
+    if os.path.exists(model_file) or not legacy_file or not os.path.exists(legacy_file):
+        path = model_file
+        artifact = load_artifact(model_file)
+        input_size, hidden_size, output_size = artifact.input_size, artifact.hidden_size, artifact.output_size
+        num_layers = artifact.num_layers
+        all_words, tags = artifact.vocab, artifact.tags
+        model_state = artifact.state_dict()
+    else:
+        # Older checkpoints were pickled with torch.save; convert them with
+        # `python model_artifact.py data.pth data.bin`.
+        logger.warning("⚠️ %s not found, falling back to %s", model_file, legacy_file)
+        path = legacy_file
+        data = torch.load(legacy_file, map_location=device)
+        input_size, hidden_size, output_size = data['input_size'], data['hidden_size'], data['output_size']
+        num_layers = data.get('num_layers', 4)
+        all_words, tags = data['all_words'], data['tags']
+        model_state = data['model_state']
+
+    with open(path, "rb") as f:
+        version = f"{zlib.crc32(f.read()):08x}"
+
+    model = NeuralNet(input_size, hidden_size, output_size, num_layers)
+    model.load_state_dict(model_state)
+    model.eval()
+    model.to(device)
+    weight_bytes = sum(t.numel() * t.element_size() for t in model_state.values())
+    # ✅ Pinned torch threads and, unless CHATBOT_TORCHSCRIPT=0, the frozen TorchScript graph
+    model = prepare_model(model, input_size, device)
+    return model, all_words, tags, input_size, version, weight_bytes
+
+
+def load_intent_model(name, intents, model_file, device, legacy_file=None, engine=ENGINE):
+    model, all_words, tags, input_size, version, weight_bytes = load_model_file(model_file, device, legacy_file)
+    return IntentModel(name, intents, model, all_words, tags, input_size, device, version, weight_bytes, engine)
+
+
+class ModelRegistry:
+    """
+    The default IntentModel plus an LRU of tenant models loaded by
+    `loader(name)`, which returns an IntentModel or None to share the default.
+    """
+
+    def __init__(self, default, loader, budget=MEMORY_BUDGET):
+        self.default = default
+        self.loader = loader
+        self.budget = budget
+        self._models = OrderedDict()
+        self._shared = set()  # tenants that use the default model
+        self._lock = threading.Lock()
+        self._loading = {}
+
+    def get(self, name):
+        if name == self.default.name or name in self._shared:
+            return self.default
+        with self._lock:
+            bundle = self._models.get(name)
+            if bundle is not None:
+                self._models.move_to_end(name)
+                return bundle
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        # ✅ one load per tenant at a time; other tenants are not blocked meanwhile
+        with load_lock:
+            with self._lock:
+                bundle = self._models.get(name)
+            if bundle is None:
+                bundle = self._load(name)
+        return bundle
+
+    def _load(self, name):
+        start = time.perf_counter()
+        bundle = self.loader(name)
+        if bundle is None:
+            self._shared.add(name)
+            return self.default
+
+        elapsed = time.perf_counter() - start
+        REGISTRY.inc("tenant_model_loads_total", tenant=name)
+        REGISTRY.observe("tenant_model_load_seconds", elapsed)
+        logger.info("✅ Loaded the model of tenant %s in %.0f ms (~%.1f MB)", name, elapsed * 1000, bundle.nbytes / 2**20)
+        with self._lock:
+            self._models[name] = bundle
+            self._evict()
+        return bundle
+
+    def _evict(self):
+        # the newest model stays even if it alone exceeds the budget
+        total = sum(b.nbytes for b in self._models.values())
+        while total > self.budget and len(self._models) > 1:
+            name, bundle = self._models.popitem(last=False)
+            total -= bundle.nbytes
+            REGISTRY.inc("tenant_model_evictions_total", tenant=name)
+            logger.info("♻️ Evicted the model of tenant %s", name)
+        REGISTRY.set("tenant_models_resident", len(self._models))
+        REGISTRY.set("tenant_models_resident_bytes", total)
+
+    def resident(self):
+        with self._lock:
+            return list(self._models)
@@ -0,0 +1,129 @@
+"""
+Serving setup for the intent model: thread pinning, TorchScript freezing,
+warm-up and readiness.
+
+Several workers per box each running torch with its default thread count
+(one per core) oversubscribe the CPU, and a 4-layer MLP on one bag-of-words
+vector gains nothing from intra-op parallelism, so each worker is pinned to
+CHATBOT_TORCH_THREADS threads. The model is traced and frozen into a
+TorchScript graph (weights inlined as constants, eval-only ops folded) and
+checked against the eager model before it is used. The warm-up runs dummy
+inferences and one pass through spell correction and tokenization, so the
+first real request does not pay lazy initialisation; /readyz answers 503
+until it is done.
+
+    CHATBOT_TORCH_THREADS          intra-op threads per worker (default 1, 0 = torch default)
+    CHATBOT_TORCH_INTEROP_THREADS  inter-op threads per worker (default 1, 0 = torch default)
+    CHATBOT_TORCHSCRIPT            1 = serve the frozen TorchScript model (default), 0 = eager
+    CHATBOT_WARMUP                 sync (default): warm up before serving,
+                                   background: serve at once and report ready later, off
+"""
+import logging
+import os
+import threading
+import time
+
+import torch
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TORCH_THREADS = int(os.environ.get("CHATBOT_TORCH_THREADS", "1"))
+TORCH_INTEROP_THREADS = int(os.environ.get("CHATBOT_TORCH_INTEROP_THREADS", "1"))
+USE_TORCHSCRIPT = os.environ.get("CHATBOT_TORCHSCRIPT", "1") != "0"
+WARMUP_MODE = os.environ.get("CHATBOT_WARMUP", "sync").lower()
+WARMUP_INFERENCES = 20
+
+REGISTRY.describe("chatbot_ready", "1 once the chatbot has finished warming up.")
+REGISTRY.describe("chatbot_warmup_seconds", "Time the start-up warm-up took.")
+REGISTRY.set("chatbot_ready", 0)
+
+_ready = threading.Event()
+
+
+def configure_threads(threads=None, interop_threads=None):
+    """Pins torch's thread pools for this process; call before the first inference."""
+    threads = TORCH_THREADS if threads is None else threads
+    interop_threads = TORCH_INTEROP_THREADS if interop_threads is None else interop_threads
+    if threads > 0:
+        torch.set_num_threads(threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # only allowed once, before any inter-op work has started
+            logger.debug("Inter-op threads already fixed at %d", torch.get_num_interop_threads())
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def freeze_model(model, input_size, device):
+    """
+    Traces and freezes `model` (in eval mode) for one-row inputs. Returns the
+    frozen module, or `model` itself when freezing fails or changes the output.
+    """
+    example = torch.rand(1, input_size, device=device)
+    try:
+        with torch.no_grad():
+            # NeuralNet.forward looks its layers up by name, which torch.jit.script
+            # cannot compile; tracing a fixed-shape MLP records the same graph
+            frozen = torch.jit.freeze(torch.jit.trace(model.eval(), example))
+            frozen = torch.jit.optimize_for_inference(frozen)
+            probe = torch.rand(4, input_size, device=device)
+            if not torch.allclose(frozen(probe), model(probe), atol=1e-5):
+                raise RuntimeError("frozen model output differs from the eager model")
+    except Exception as e:
+        logger.warning("⚠️ Serving the eager model, TorchScript freezing failed: %s", e)
+        return model
+    return frozen
+
+
+def prepare_model(model, input_size, device):
+    """Thread pinning plus (with CHATBOT_TORCHSCRIPT) the frozen model to serve."""
+    threads, interop = configure_threads()
+    logger.info("🧵 torch threads: %d intra-op, %d inter-op", threads, interop)
+    model.eval()
+    return freeze_model(model, input_size, device) if USE_TORCHSCRIPT else model
+
+
+def warm_model(model, input_size, device, runs=WARMUP_INFERENCES):
+    """Runs a few dummy inferences so the first request does not build kernels and caches."""
+    with torch.no_grad():
+        for batch in (torch.zeros(1, input_size, device=device), torch.ones(1, input_size, device=device)):
+            for _ in range(runs // 2):
+                model(batch)
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def run_warmup(warm_up, mode=None):
+    """
+    Calls `warm_up()` as CHATBOT_WARMUP says and marks the process ready
+    afterwards (immediately when warm-up is off or fails).
+    """
+    mode = WARMUP_MODE if mode is None else mode
+
+    def run():
+        start = time.perf_counter()
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning("⚠️ Warm-up failed, serving cold: %s", e)
+        elapsed = time.perf_counter() - start
+        REGISTRY.set("chatbot_warmup_seconds", round(elapsed, 4))
+        logger.info("🔥 Chatbot warmed up in %.0f ms", elapsed * 1000)
+        _mark_ready()
+
+    if mode == "off":
+        _mark_ready()
+    elif mode == "background":
+        threading.Thread(target=run, name="chatbot-warmup", daemon=True).start()
+    else:
+        run()
+
+
+def _mark_ready():
+    _ready.set()
+    REGISTRY.set("chatbot_ready", 1)
@@ -1,26 +1,23 @@
 import torch
-import torch.nn as nn 
+import torch.nn as nn
 
 class NeuralNet(nn.Module):
-    def __init__(self, input_size,hidden_size,num_classes):
+    def __init__(self, input_size,hidden_size,num_classes,num_layers=4):
         super(NeuralNet,self).__init__()
-        self.layer1=nn.Linear(input_size,hidden_size)
-        self.layer2=nn.Linear(hidden_size,hidden_size)
-        self.layer3=nn.Linear(hidden_size,hidden_size)
-        self.layer4=nn.Linear(hidden_size,num_classes)
+        if num_layers < 2:
+            raise ValueError("NeuralNet needs at least an input and an output layer")
+        # layer1 .. layerN keep the state_dict keys of the original 4-layer model
+        sizes=[input_size]+[hidden_size]*(num_layers-1)+[num_classes]
+        for i in range(num_layers):
+            setattr(self,f"layer{i+1}",nn.Linear(sizes[i],sizes[i+1]))
+        self.num_layers=num_layers
         self.relu=nn.ReLU()
 
     def forward(self,x):
-        out=self.layer1(x)
-        out=self.relu(out)
-        out=self.layer2(out)
-        out=self.relu(out)
-        out=self.layer3(out)
-        out=self.relu(out)
-        out=self.layer4(out)
+        out=x
+        for i in range(1,self.num_layers):
+            out=getattr(self,f"layer{i}")(out)
+            out=self.relu(out)
+        out=getattr(self,f"layer{self.num_layers}")(out)
 
         return out
-
-
-
-    
\ No newline at end of file
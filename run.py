@@ -1,182 +1,236 @@
-from flask import request, jsonify
-import requests
+import logging
+import os
+from flask import request, jsonify, Response, stream_with_context
+import memory_diagnostics  # noqa: F401  starts tracemalloc before the app and model load
 from flask_server import app, db
 import flask_server.university
-from flask_server.university.models import Holidays, Course, Student, Teacher
-from chat import get_bot_response
+from flask_server.university.models import Holidays, Student, Teacher, create_tenant_schemas, upgrade_schema
+from chat import get_bot_response, fetch_data_from_db, resume_pending, warm_up as warm_up_chatbot
+from model_serving import run_warmup
+from session_store import load_chat_session, save_chat_session
+from chat_channel import channels, join_response, json_chunks, publish_answer, stream
+from load_shedding import shed_load, degradation_level
 from flask_server.university.nlp_utils import course_matcher
+from flask_server.university import rosters
+from flask_server.university.reference_data import reference
+from flask_server.university.results import (MAX_IDS, MAX_UPLOAD_BYTES, parse_student_ids, read_uploaded_ids,
+                                             result_rows, results_table)
+
+logging.basicConfig(
+    level=os.environ.get("CHATBOT_LOG_LEVEL", "WARNING"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 # Ensure database tables exist
 with app.app_context():
     db.create_all()
+    upgrade_schema()
+    create_tenant_schemas()
+
+def warm_up():
+    """Warms the model, spell correction and tokenizers, plus the spaCy course matcher."""
+    warm_up_chatbot()
+    course_matcher("what is the duration of btech")
+
+# ✅ /readyz reports 503 until this is done (CHATBOT_WARMUP=sync finishes it before serving)
+run_warmup(warm_up)
 
 @app.post("/chatbot_api/")
+@shed_load
 def normal_chat():
     msg = request.get_json().get('message', "").strip().lower()
     
     if not msg:
         return jsonify({'response': "Please provide a message.", 'tag': "error"}), 400
 
-    try:
-        response, tag = get_bot_response(msg)
-    except Exception as e:
-        print("❌ Error in chatbot_response:", e)
-        return jsonify({'response': "An error occurred while processing the request.", 'tag': "error"}), 500
+    sid, state = load_chat_session()
+    payload, status = answer_message(msg, state)
+    if isinstance(payload.get("response"), (str, type(None))):
+        response = jsonify(payload)
+    else:
+        # ✅ long lists go out chunk by chunk instead of being built before the first byte
+        response = Response(stream_with_context(json_chunks(payload)), mimetype="application/json")
+    response.status_code = status
+    return save_chat_session(response, sid, state)
+
+
+def answer_message(msg, state):
+    """
+    Runs one chat turn for a lowercased message and the session `state`.
+    Returns (payload, status); payload["response"] may be an iterable of chunks
+    for answers that are built incrementally.
+    """
+    # ✅ "more" / "show next 50" continues the last student, faculty or holiday list
+    if state.get("more") and rosters.wants_more(msg):
+        response, tag = rosters.next_page(state)
+        return {'response': response, 'tag': tag}, 200
+
+    tag = None
+    pending = state.pop("pending", None)
+    if pending:
+        tag, msg = resume_pending(pending, msg)
+        logger.debug("🔁 Pending %s resolved to %s", pending, tag)
+
+    if tag == 'result':
+        response, url, table = lookup_result(msg)
+        if url:
+            state["pending"] = pending
+        return {'response': response, 'tag': tag, 'url': url, 'table': table}, 200
+
+    if tag:
+        response = None
+    else:
+        try:
+            response, tag = get_bot_response(msg, state, degradation_level())
+        except Exception as e:
+            logger.exception("❌ Error in chatbot_response: %s", e)
+            return {'response': "An error occurred while processing the request.", 'tag': "error"}, 500
 
     if tag == 'result':
-        return jsonify({'response': response, 'tag': tag, 'url': 'result/'})
+        state["pending"] = {"intent": "result", "slot": "student_id"}
+        return {'response': response, 'tag': tag, 'url': 'result/'}, 200
 
     elif tag == 'courses':
         try:
             course = course_matcher(msg)
-            print(f"🔍 Debug: Extracted Course Name -> {course}")
+            logger.debug("🔍 Extracted Course Name -> %s", course)
             if course:
-                course_details = Course.query.filter_by(name=course).first()
+                course_details = reference().course_named(course)
                 if course_details:
                     response = f"{course_details.name} takes {course_details.duration}"
-                    link = f"http://127.0.0.1:5000/courses/syllabus/{course_details.id}/"
-                    return jsonify({
+                    link = f"/download/syllabus/{course_details.course_id}"
+                    return {
                         'response': response, 'tag': tag,
                         "data": {
                             "filename": f"{course_details.name} syllabus",
                             "link": link
                         }
-                    })
+                    }, 200
                 else:
                     response = "Sorry, I couldn't find that course."
             else:
-                courses = Course.query.all()
-                response = "Available courses:\n" + "\n".join([course.name for course in courses])
+                response = "Available courses:\n" + "\n".join(reference().course_names)
         except Exception as e:
-            print("❌ Error fetching course details:", e)
+            logger.error("❌ Error fetching course details: %s", e)
             response = "An error occurred while retrieving course details."
 
     elif tag == "holidays":
         try:
             holiday = Holidays.query.order_by(Holidays.year.desc()).first()
+            # the download button replaces the holiday list, so "more" must not continue it
+            state.pop("more", None)
             if holiday:
                 response = f"Holidays for the year {holiday.year} are available below."
-                download_button = f'<button onclick="window.location.href=\'http://127.0.0.1:5000/holidays/download/{holiday.id}/\'" style="padding:8px 15px; background:#007BFF; color:white; border:none; border-radius:5px; cursor:pointer;">📥 Download</button>'
+                download_button = f'<button onclick="window.location.href=\'/holidays/download/{holiday.id}/?variant=web\'" style="padding:8px 15px; background:#007BFF; color:white; border:none; border-radius:5px; cursor:pointer;">📥 Download</button>'
                 
-                return jsonify({'response': response + "<br>" + download_button, 'tag': tag})
+                return {'response': response + "<br>" + download_button, 'tag': tag}, 200
 
             else:
                 response = "No holiday details found."
         except Exception as e:
-            print("❌ Error fetching holiday details:", e)
+            logger.error("❌ Error fetching holiday details: %s", e)
             response = "An error occurred while retrieving holiday details."
-            return jsonify({'response': response, 'tag': tag}), 500
-
-    elif tag == 'faculty':
-        department = None
-        departments = ["csbs", "cse", "ece", "mech", "aids", "eee", "it", "aiml"]
-
-        for dept in departments:
-            if dept in msg:
-                department = dept.upper()
-                break
-
-        if department:
-            try:
-                url = f'http://127.0.0.1:5000/teachers/api/{department.lower()}/'
-                print(f"🔍 Debug: Fetching faculty data from {url}")
+            return {'response': response, 'tag': tag}, 500
 
-                data = requests.get(url=url)
-
-                if data.status_code == 200:
-                    teachers = data.json()
-
-                    if isinstance(teachers, list) and teachers:
-                        faculty_names = [f"{t['first_name']} {t['last_name']}".strip() for t in teachers]
-                        response = f"👨‍🏫 Faculty in {department} Department:\n" + "\n".join(faculty_names)
-                    else:
-                        response = f"❌ No faculty found in {department}."
-                else:
-                    response = f"⚠ Unable to fetch faculty details for {department} (HTTP {data.status_code})."
-
-            except requests.RequestException as e:
-                print(f"❌ Error fetching faculty data: {e}")
-                response = f"An error occurred while fetching faculty details for {department}. Please try again later."
-        else:
-            response = (
-                "❓ Please specify a valid department:\n"
-                "📚 Available: CSBS, CSE, ECE, MECH, AI&DS, AI&ML, EEE, IT...\n\n"
-                "💡 Example: *csbs faculty*"
-            )
-
-    elif tag == 'students':
+    elif tag in ('faculty', 'students') and response is None:
+        # ✅ a resolved follow-up skipped get_bot_response; chat.fetch_data_from_db builds the list
+        # (and its "more" continuation) in both cases, so it is queried once per turn
         try:
-            if "student details of" in msg:
-                user_course_name = msg.replace("student details of", "").strip().lower()
-
-                # Fetch all courses and normalize names
-                courses = {c.name.lower().strip(): c for c in Course.query.all()} 
-
-                # 🔍 Debugging
-                print(f"🔍 Debug: Available Courses -> {[c.name for c in courses.values()]}")
-                print(f"🔍 Debug: User Entered Course -> '{user_course_name}'")
-
-                # ✅ Try exact or partial match
-                course = courses.get(user_course_name) or next((courses[c] for c in courses if user_course_name in c), None)
-
-                if course:
-                    url = f'http://127.0.0.1:5000/students/api/{course.name.lower()}/'
-                    data = requests.get(url=url)
-
-                    if data.status_code == 200:
-                        students = data.json()
-
-                        if isinstance(students, list) and students:
-                            response = "<div style='background: #dff0d8; padding: 10px; border-radius: 5px;'>"
-                            response += f"<b>🎓 Students in {course.name}:</b><br><br>"
-
-                            for i, s in enumerate(students, start=1):
-                                response += f"{i}. <b>{s['name']}</b> (CGPA: {s['cgpa'] if s['cgpa'] else 'N/A'})<br>"
-
-                            response += "</div>"
-                        else:
-                            response = f"❌ No students found for <b>{course.name}</b>."
-                    else:
-                        response = f"⚠ Unable to fetch student details for {course.name}."
+            response, tag = fetch_data_from_db(tag, msg, state)
+        except Exception as e:
+            logger.error("❌ Error fetching %s data: %s", tag, e)
+            response = f"An error occurred while fetching {tag} details. Please try again later."
+
+    return {'response': response, 'tag': tag}, 200
+
+def lookup_result(msg):
+    """
+    Looks up one or many student IDs (comma, space or newline separated).
+    Returns (response, url, table); url is "result/" while a student ID is still
+    expected, table is set when several IDs were looked up at once.
+    """
+    table = None
+    try:
+        ids, invalid = parse_student_ids(msg)
+        if not ids:
+            return "Please use the correct format: \n434121010021", "result/", None
+        if len(ids) > MAX_IDS:
+            return f"Please send at most {MAX_IDS} student IDs at a time.", "result/", None
+
+        if len(ids) == 1 and not invalid:
+            student = Student.query.get(ids[0])
+            response = f"Result of {ids[0]} is {student.cgpa}" if student else "Student not found"
+        else:
+            # ✅ One IN query per chunk instead of a chat turn per student
+            rows = result_rows(ids)
+            response = f"Results for {sum(r['found'] for r in rows)} of {len(rows)} students"
+            if invalid:
+                response += f" (skipped invalid IDs: {', '.join(invalid[:10])}{' …' if len(invalid) > 10 else ''})"
+            table = results_table(rows)
+        url = ""
 
-                else:
-                    available_courses = ", ".join(c.name for c in courses.values())
-                    response = (
-                        f"⚠ *Course '{user_course_name}' not found.*<br><br>"
-                        f"📚 Available courses:<br>{available_courses}<br><br>"
-                        f"➡ Type: <b>Student details of [course name]</b>"
-                    )
+    except Exception as e:
+        logger.error("❌ Error fetching student result: %s", e)
+        response = "An error occurred while retrieving the result."
+        url = ""
 
-        except Exception as e:
-            print(f"❌ Error fetching student data: {e}")
-            response = "An error occurred while fetching student details. Please try again later."
+    return response, url, table
 
-        return jsonify({'response': response, 'tag': tag})
 
 @app.post("/chatbot_api/result/")
+@shed_load
 def fetch_result():
-    msg = request.get_json().get('message', "").strip()
+    # a pasted message, or an uploaded .txt/.csv list of IDs
+    upload = request.files.get('file')
+    if upload:
+        msg = read_uploaded_ids(upload)
+        if msg is None:
+            return jsonify({'response': f"Please upload at most {MAX_UPLOAD_BYTES // 1024} KB of student IDs.",
+                            'url': "result/"}), 413
+        msg = msg.strip()
+    else:
+        msg = (request.get_json(silent=True) or {}).get('message', "").strip()
 
     if not msg:
         return jsonify({'response': "Please provide a student ID.", 'url': ""}), 400
 
-    try:
-        studentID = msg.replace(' ', '')
-        if not studentID.isdigit():
-            return jsonify({'response': "Please use the correct format: \n434121010021", 'url': "result/"})
-
-        student = Student.query.get(studentID)
-
-        if student:
-            response = f"Result of {studentID} is {student.cgpa}"
-            url = ""
-        else:
-            response = "Student not found"
-            url = ""
-
-    except Exception as e:
-        print("❌ Error fetching student result:", e)
-        response = "An error occurred while retrieving the result."
-        url = ""
+    response, url, table = lookup_result(msg)
+    return jsonify({'response': response, 'url': url, 'table': table})
+
+
+# =============================
+# STREAMING CHAT (SSE + POST)
+# =============================
+@app.get("/chatbot_api/stream/")
+def chat_stream():
+    """One long-lived event stream per browser tab; answers to /stream/send arrive here."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('last_event_id', 0, type=int)
+    channel, last_event_id = channels.resume(request.args.get('channel'), last_event_id)
+    response = Response(stream(channel, last_event_id), mimetype="text/event-stream")
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx must not buffer the stream
+    return response
+
+
+@app.post("/chatbot_api/stream/send")
+@shed_load
+def chat_stream_send():
+    # sent as text/plain so cross-origin widgets need no CORS preflight
+    body = request.get_json(force=True, silent=True) or {}
+    msg = str(body.get('message', "")).strip().lower()
+    if not msg:
+        return jsonify({'response': "Please provide a message.", 'tag': "error"}), 400
 
-    return jsonify({'response': response, 'url': url})
+    sid, state = load_chat_session()
+    payload, status = answer_message(msg, state)
+
+    channel = channels.listening(body.get('channel'))
+    if channel is not None and status == 200:
+        response = jsonify({'id': publish_answer(channel, payload), 'streamed': True})
+        response.status_code = 202
+    else:
+        # no open stream in this worker: answer inline like /chatbot_api/
+        response = jsonify(join_response(payload))
+        response.status_code = status
+    return save_chat_session(response, sid, state)
@@ -0,0 +1,155 @@
+"""
+Server-side conversation state for multi-turn chatbot flows.
+
+A turn that asks the user for something ("Which department?") stores a
+pending intent/slot here; the next turn from the same browser answers it
+without going through spell correction and classification again.
+
+Sessions are keyed by the `chat_sid` cookie and expire after SESSION_TTL
+seconds of inactivity. The default backend is an in-process dict; set
+CHATBOT_SESSION_BACKEND=sqlite to share sessions between the worker
+processes of one host.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+SESSION_COOKIE = "chat_sid"
+SESSION_TTL = int(os.environ.get("CHATBOT_SESSION_TTL", "900"))
+PURGE_INTERVAL = 60
+
+
+class MemoryBackend:
+    """Sessions in a dict guarded by a lock; lost when the worker exits."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, sid, now):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            expires, state = item
+            if expires <= now:
+                del self._data[sid]
+                return None
+            return state
+
+    def set(self, sid, state, expires):
+        with self._lock:
+            self._data[sid] = (expires, state)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def purge(self, now):
+        with self._lock:
+            expired = [sid for sid, (expires, _) in self._data.items() if expires <= now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+class SQLiteBackend:
+    """Sessions in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_session ("
+                "sid TEXT PRIMARY KEY, expires REAL NOT NULL, state TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid, now):
+        row = self._connect().execute(
+            "SELECT state FROM chat_session WHERE sid = ? AND expires > ?", (sid, now)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid, state, expires):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO chat_session (sid, expires, state) VALUES (?, ?, ?)",
+            (sid, expires, json.dumps(state)),
+        )
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM chat_session WHERE sid = ?", (sid,))
+
+    def purge(self, now):
+        return self._connect().execute("DELETE FROM chat_session WHERE expires <= ?", (now,)).rowcount
+
+
+class SessionStore:
+    def __init__(self, backend=None, ttl=SESSION_TTL):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self._next_purge = 0.0
+
+    def _maybe_purge(self, now):
+        if now >= self._next_purge:
+            self._next_purge = now + PURGE_INTERVAL
+            self.backend.purge(now)
+
+    def get(self, sid):
+        """Returns the stored state dict for `sid`, or None if unknown/expired."""
+        now = time.time()
+        self._maybe_purge(now)
+        return self.backend.get(sid, now)
+
+    def set(self, sid, state):
+        """Stores `state` and pushes the expiry TTL seconds into the future."""
+        self.backend.set(sid, state, time.time() + self.ttl)
+
+    def clear(self, sid):
+        self.backend.delete(sid)
+
+    @staticmethod
+    def new_session_id():
+        return secrets.token_urlsafe(24)
+
+
+def _default_store():
+    if os.environ.get("CHATBOT_SESSION_BACKEND", "memory") == "sqlite":
+        return SessionStore(SQLiteBackend(os.environ.get("CHATBOT_SESSION_DB", "chat_sessions.db")))
+    return SessionStore()
+
+
+store = _default_store()
+
+
+# =============================
+# FLASK HELPERS
+# =============================
+
+def load_chat_session():
+    """Returns (sid, state) for the current request, starting a new session if needed."""
+    from flask import request
+
+    sid = request.cookies.get(SESSION_COOKIE)
+    state = store.get(sid) if sid else None
+    if state is None:
+        sid, state = store.new_session_id(), {}
+    return sid, state
+
+
+def save_chat_session(response, sid, state):
+    """Persists `state` and (re)sets the session cookie on `response`."""
+    store.set(sid, state)
+    response.set_cookie(SESSION_COOKIE, sid, max_age=store.ttl, httponly=True, samesite="Lax")
+    return response
@@ -0,0 +1,214 @@
+"""
+Cache backend shared by the chatbot and the university app.
+
+Each cache is a named namespace (`Cache("fragments", maxsize)`) on the one
+backend of the process, chosen by CHATBOT_CACHE_BACKEND:
+
+    memory   bounded LRU per worker (default)
+    sqlite   one SQLite file (CHATBOT_CACHE_DB) shared by every worker on the host,
+             so a value computed by one worker is a hit in all the others
+
+Entries can carry a token, usually an http_cache version token. A lookup
+with a different token is a miss ("stale"). Writes bump those tokens in the
+shared database in their own transaction, so they invalidate entries on
+every worker and every node without any message being sent. `invalidate()`
+drops a whole namespace for everyone sharing the backend.
+
+The sqlite backend pickles values, so the file must only be writable by the
+application.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.environ.get("CHATBOT_CACHE_BACKEND", "memory").lower()
+CACHE_DB = os.environ.get("CHATBOT_CACHE_DB", "chat_cache.db")
+# last-use times are only rewritten this often, so hits stay read-only
+TOUCH_INTERVAL = 30
+
+REGISTRY.describe("cache_requests_total", "Cache lookups by cache and result (hit, miss, stale).")
+REGISTRY.describe("cache_evictions_total", "Entries dropped to keep a cache within its size.")
+REGISTRY.describe("cache_invalidations_total", "Times a whole cache was invalidated.")
+REGISTRY.describe("cache_entries", "Entries currently held by each cache.")
+
+HIT, MISS, STALE = "hit", "miss", "stale"
+
+
+class MemoryBackend:
+    """One LRU OrderedDict per namespace, local to the worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def get(self, namespace, key, token):
+        with self._lock:
+            entries = self._data.get(namespace)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                return MISS, None
+            if entry[0] != token:
+                return STALE, None
+            entries.move_to_end(key)
+            return HIT, entry[1]
+
+    def put(self, namespace, key, value, token, maxsize):
+        with self._lock:
+            entries = self._data.setdefault(namespace, OrderedDict())
+            entries[key] = (token, value)
+            entries.move_to_end(key)
+            evicted = 0
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def invalidate(self, namespace):
+        with self._lock:
+            self._data.pop(namespace, None)
+
+    def size(self, namespace):
+        with self._lock:
+            return len(self._data.get(namespace, ()))
+
+
+class SQLiteBackend:
+    """Entries in a local SQLite file, shared by every worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entry ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, token TEXT, value BLOB NOT NULL, "
+            "used REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_entry_used ON cache_entry (namespace, used)")
+
+    def _connect(self):
+        # ✅ one connection per thread and per process, so forked workers never share one
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, namespace, key, token):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT token, value, used FROM cache_entry WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return MISS, None
+        if row[0] != token:
+            return STALE, None
+        try:
+            value = pickle.loads(row[1])
+        except Exception as e:
+            logger.warning("⚠️ Dropping unreadable %s cache entry: %s", namespace, e)
+            conn.execute("DELETE FROM cache_entry WHERE namespace = ? AND key = ?", (namespace, key))
+            return MISS, None
+        now = time.time()
+        if now - row[2] > TOUCH_INTERVAL:
+            conn.execute("UPDATE cache_entry SET used = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+        return HIT, value
+
+    def put(self, namespace, key, value, token, maxsize):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entry (namespace, key, token, value, used) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, token, data, time.time()),
+        )
+        excess = self.size(namespace) - maxsize
+        if excess <= 0:
+            return 0
+        return conn.execute(
+            "DELETE FROM cache_entry WHERE rowid IN ("
+            "SELECT rowid FROM cache_entry WHERE namespace = ? ORDER BY used LIMIT ?)",
+            (namespace, excess),
+        ).rowcount
+
+    def invalidate(self, namespace):
+        self._connect().execute("DELETE FROM cache_entry WHERE namespace = ?", (namespace,))
+
+    def size(self, namespace):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entry WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+
+
+def _default_backend():
+    if CACHE_BACKEND == "sqlite":
+        try:
+            return SQLiteBackend(CACHE_DB)
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Shared cache %s unavailable, caching per worker: %s", CACHE_DB, e)
+    elif CACHE_BACKEND != "memory":
+        logger.warning("⚠️ Unknown CHATBOT_CACHE_BACKEND %r, caching per worker", CACHE_BACKEND)
+    return MemoryBackend()
+
+
+shared_backend = _default_backend()
+CACHES = {}
+
+
+class Cache:
+    """One namespace of the process-wide backend, bounded to `maxsize` entries."""
+
+    def __init__(self, name, maxsize, backend=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.backend = backend or shared_backend
+        CACHES[name] = self
+
+    def get(self, key, token=None):
+        """The cached value, or None when it is missing or was stored under another token."""
+        if self.maxsize <= 0:
+            return None
+        try:
+            result, value = self.backend.get(self.name, repr(key), token)
+        except sqlite3.Error as e:
+            logger.warning("⚠️ %s cache lookup failed: %s", self.name, e)
+            result, value = MISS, None
+        REGISTRY.inc("cache_requests_total", cache=self.name, result=result)
+        return value
+
+    def put(self, key, value, token=None):
+        if self.maxsize <= 0 or value is None:
+            return
+        try:
+            evicted = self.backend.put(self.name, repr(key), value, token, self.maxsize)
+        except sqlite3.Error as e:
+            logger.warning("⚠️ %s cache write failed: %s", self.name, e)
+            return
+        if evicted:
+            REGISTRY.inc("cache_evictions_total", evicted, cache=self.name)
+
+    def invalidate(self):
+        """Drops every entry, in every worker sharing the backend."""
+        self.backend.invalidate(self.name)
+        REGISTRY.inc("cache_invalidations_total", cache=self.name)
+
+    def size(self):
+        return self.backend.size(self.name)
+
+
+def invalidate(*names):
+    """Invalidates the named caches (all registered caches when none are named)."""
+    for name in names or list(CACHES):
+        if name in CACHES:
+            CACHES[name].invalidate()
+        else:
+            shared_backend.invalidate(name)
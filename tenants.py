@@ -0,0 +1,178 @@
+"""
+Several institutions served by one deployment.
+
+CHATBOT_TENANTS names a JSON file of tenants besides the built-in "default"
+one (UNIVERSITY_DB_URI, intents.json, data.bin):
+
+    {
+      "northfield": {
+        "hosts": ["chat.northfield.edu"],
+        "db_uri": "sqlite:///northfield.db",
+        "intents": "tenants/northfield/intents.json",
+        "model": "tenants/northfield/data.bin"
+      }
+    }
+
+Each request is resolved to a tenant from its Host header; anything else
+is "default". Behind a proxy that sets it, CHATBOT_TRUST_TENANT_HEADER=1
+lets an X-Tenant header name the tenant instead (an unknown name is a 404). The shared db.session binds every query to the current tenant's
+engine, so models and views need no changes. Engines, one connection pool
+each, are created on first use. A tenant without "intents" and "model"
+shares the default chatbot model; otherwise model_registry loads its own.
+
+Background work runs outside a request: wrap it in `tenant_scope(name)`
+inside an app context to use that tenant's database.
+
+    UNIVERSITY_TENANT_POOL_SIZE   connections kept per tenant database (default 5)
+"""
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+from flask import g, has_app_context, jsonify, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+TENANT_HEADER = "X-Tenant"
+TENANTS_FILE = os.environ.get("CHATBOT_TENANTS")
+TRUST_TENANT_HEADER = os.environ.get("CHATBOT_TRUST_TENANT_HEADER", "0") == "1"
+POOL_SIZE = int(os.environ.get("UNIVERSITY_TENANT_POOL_SIZE", "5"))
+
+REGISTRY.describe("tenant_requests_total", "Requests served per tenant.")
+
+Tenant = namedtuple("Tenant", "name hosts db_uri intents model")
+
+
+def load_tenants(path=TENANTS_FILE):
+    """{name: Tenant} from the CHATBOT_TENANTS file (empty without one)."""
+    if not path:
+        return {}
+    with open(path, "r") as f:
+        config = json.load(f)
+    tenants = {}
+    for name, entry in config.items():
+        if name == DEFAULT_TENANT:
+            raise ValueError(f"{path}: '{DEFAULT_TENANT}' is the built-in tenant and cannot be redefined")
+        if not entry.get("db_uri"):
+            raise ValueError(f"{path}: tenant '{name}' has no db_uri")
+        tenants[name] = Tenant(name, tuple(h.lower() for h in entry.get("hosts", ())), entry["db_uri"],
+                               entry.get("intents"), entry.get("model"))
+    logger.info("🏫 %d tenant(s) configured: %s", len(tenants), ", ".join(tenants))
+    return tenants
+
+
+TENANTS = load_tenants()
+HOSTS = {host: tenant.name for tenant in TENANTS.values() for host in tenant.hosts}
+
+
+def resolve_tenant(host, header=None):
+    """The tenant for a request's Host and X-Tenant headers; None for an unknown X-Tenant."""
+    if header:
+        return header if header in TENANTS or header == DEFAULT_TENANT else None
+    return HOSTS.get((host or "").split(":")[0].lower(), DEFAULT_TENANT)
+
+
+def current_tenant():
+    """The tenant of the current request or tenant_scope, else "default"."""
+    return g.get("tenant", DEFAULT_TENANT) if has_app_context() else DEFAULT_TENANT
+
+
+@contextmanager
+def tenant_scope(name):
+    """Uses `name`'s database within the current app context."""
+    previous = g.get("tenant")
+    g.tenant = name
+    try:
+        yield
+    finally:
+        if previous is None:
+            g.pop("tenant", None)
+        else:
+            g.tenant = previous
+
+
+# =============================
+# DATABASE ENGINES
+# =============================
+
+_engines = {}
+_engines_lock = threading.Lock()
+_instance_path = None
+
+
+def _engine_url(uri):
+    url = make_url(uri)
+    # like Flask-SQLAlchemy, relative SQLite paths live in the instance folder
+    if url.drivername.startswith("sqlite") and url.database and url.database != ":memory:" \
+            and not os.path.isabs(url.database) and _instance_path:
+        os.makedirs(_instance_path, exist_ok=True)
+        url = url.set(database=os.path.join(_instance_path, url.database))
+    return url
+
+
+def engine_for(name):
+    """The engine (and connection pool) of a configured tenant, created on first use."""
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                url = _engine_url(TENANTS[name].db_uri)
+                options = {"pool_pre_ping": True}
+                if not url.drivername.startswith("sqlite"):
+                    options.update(pool_size=POOL_SIZE, max_overflow=POOL_SIZE, pool_recycle=3600)
+                engine = _engines[name] = create_engine(url, **options)
+                logger.info("✅ Database engine for tenant %s: %s", name, url.render_as_string(hide_password=True))
+    return engine
+
+
+class TenantSession(Session):
+    """Flask-SQLAlchemy session that sends every statement to the current tenant's database."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            name = current_tenant()
+            if name != DEFAULT_TENANT:
+                return engine_for(name)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# =============================
+# FLASK
+# =============================
+
+def init_app(app):
+    """Resolves the tenant of every request."""
+    global _instance_path
+    _instance_path = app.instance_path
+
+    @app.before_request
+    def _select_tenant():
+        name = resolve_tenant(request.host, request.headers.get(TENANT_HEADER) if TRUST_TENANT_HEADER else None)
+        if name is None:
+            return jsonify({"error": "Unknown tenant"}), 404
+        g.tenant = name
+        REGISTRY.inc("tenant_requests_total", tenant=name)
+
+
+def tenant_option(command):
+    """Adds --tenant to a Flask CLI command, which then runs against that tenant's database."""
+    @click.option("--tenant", default=DEFAULT_TENANT, show_default=True, help="tenant whose database to use")
+    @wraps(command)
+    def wrapper(*args, tenant, **kwargs):
+        if tenant != DEFAULT_TENANT and tenant not in TENANTS:
+            raise click.BadParameter(f"unknown tenant {tenant!r}", param_hint="--tenant")
+        with tenant_scope(tenant):
+            return command(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,52 @@
+"""
+Puts the repository root on sys.path and points the app at a throwaway
+SQLite database before anything imports it.
+
+Modules under flask_server.university can only be imported with the whole
+app (its routes load chat.py, which needs torch, spaCy and a trained
+data.bin); their tests call require_app() and are skipped without it.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # intents.json and data.bin are read from the working directory
+
+_tmp = tempfile.mkdtemp(prefix="chatbot-tests-")
+os.environ.setdefault("UNIVERSITY_DB_URI", "sqlite:///" + os.path.join(_tmp, "university.db"))
+os.environ.setdefault("CHATBOT_TRANSCRIPTS", "off")
+os.environ.setdefault("CHATBOT_WARMUP", "off")
+
+
+def require_app():
+    """Skips the calling test module when the app cannot be imported here."""
+    try:
+        import flask_server.university  # noqa: F401
+    except Exception as e:  # ImportError, or no data.bin
+        pytest.skip(f"the app cannot be loaded here: {e!r}", allow_module_level=True)
+
+
+@pytest.fixture
+def app_db():
+    """
+    An app context on empty tables, dropped again afterwards. resource_version
+    is kept and every version bumped instead, so reference data, topic indexes
+    and other caches built during one test are stale in the next.
+    """
+    from flask_server import app, db
+    from flask_server.university.models import ResourceVersion
+
+    with app.app_context():
+        db.create_all()
+        try:
+            yield db
+        finally:
+            db.session.remove()
+            table = ResourceVersion.__table__
+            db.metadata.drop_all(db.engine, tables=[t for t in db.metadata.sorted_tables if t is not table])
+            with db.engine.begin() as conn:
+                conn.execute(table.update().values(version=table.c.version + 1))
@@ -0,0 +1,82 @@
+from datetime import date, datetime, timedelta
+
+from conftest import require_app
+
+require_app()
+
+from flask_server.university import analytics  # noqa: E402
+from flask_server.university.models import AdmissionForm, AdmissionStat, Course, increment_row  # noqa: E402
+
+
+def _admission(n, course_id, **fields):
+    values = dict(full_name=f"Applicant {n}", dob=date(2005, 1, 1), gender="F", email=f"a{n}@example.com",
+                  phone="9000000000", permanent_address="1 Main St", city="Chennai", state="Tamil Nadu",
+                  pincode="600001", qualification="12th", cgpa=8.5, school_college="School",
+                  board_university="Board", course_id=course_id, mode="Regular", father_name="Father")
+    values.update(fields)
+    return AdmissionForm(**values)
+
+
+def _stats(db):
+    return {(s.dimension, s.value): (s.count, round(s.cgpa_sum, 6))
+            for s in db.session.query(AdmissionStat).filter(AdmissionStat.count != 0)}
+
+
+def test_deltas_match_a_rebuild(app_db):
+    db = app_db
+    db.session.add_all([Course(course_id=1, name="CSE", duration="4 years"),
+                        Course(course_id=2, name="ECE", duration="4 years")])
+    db.session.commit()
+    admissions = [_admission(0, 1), _admission(1, 1, city="chennai ", cgpa=9.1),
+                  _admission(2, 2, mode="Distance", cgpa=7.25)]
+    db.session.add_all(admissions)
+    db.session.commit()
+    admissions[0].course_id, admissions[0].cgpa = 2, 6.0
+    db.session.delete(admissions[1])
+    db.session.commit()
+
+    incremental = _stats(db)
+    assert incremental[("total", "")] == (2, 13.25)
+    assert incremental[("city", "Chennai")] == (2, 13.25)
+    assert ("course", "1") not in incremental
+
+    assert analytics.rebuild() == 2
+    assert _stats(db) == incremental
+
+
+def test_rolled_back_submission_leaves_the_counts(app_db):
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.add(_admission(0, 1))
+    db.session.commit()
+    before = _stats(db)
+
+    db.session.add(_admission(1, 1))
+    db.session.flush()
+    db.session.rollback()
+    assert _stats(db) == before
+
+
+def test_increment_row_adds_to_a_row_inserted_by_another_writer(app_db):
+    db = app_db
+    table = AdmissionStat.__table__
+    conn = db.session.connection()
+    key = {"dimension": "total", "value": ""}
+    increment_row(conn, table, key, {"count": 1, "cgpa_sum": 8.0})
+    increment_row(conn, table, key, {"count": 2, "cgpa_sum": 1.5})
+    db.session.commit()
+    assert _stats(db) == {("total", ""): (3, 9.5)}
+
+
+def test_summary_keeps_the_last_calendar_days(app_db):
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    today = datetime.utcnow()
+    # sparse days: the last 30 calendar days, not the last 30 rows
+    for n, age in enumerate([0, 3, 29, 30, 200]):
+        db.session.add(_admission(n, 1, submission_date=today - timedelta(days=age)))
+    db.session.commit()
+
+    days = [e["value"] for e in analytics.summary(days=30)["day"]]
+    assert days == sorted((today - timedelta(days=age)).date().isoformat() for age in [0, 3, 29])
+    assert analytics.summary(days=30)["total"] == 5
@@ -0,0 +1,44 @@
+from conftest import require_app
+
+require_app()
+
+import chat  # noqa: E402
+
+MESSAGE = "zq hullo thar my good frend"  # not an intents.json pattern
+
+
+def test_cached_repeat_returns_the_first_reply(monkeypatch, app_db):
+    replies = iter(["first reply", "second reply"])
+
+    def classify(sentence, timer, state, degradation, bot):
+        reply = next(replies)
+        return reply, "greeting", "fuzzy", reply
+
+    monkeypatch.setattr(chat, "_classify", classify)
+    # a re-answer through intents.json would pick the next reply
+    monkeypatch.setattr(chat, "static_response", lambda tag: next(replies))
+    chat.response_cache.invalidate()
+
+    first = chat.get_bot_response(MESSAGE)
+    second = chat.get_bot_response(MESSAGE)
+    assert first == ("first reply", "greeting")
+    assert second == first
+
+
+def test_cached_database_tag_is_looked_up_again(monkeypatch, app_db):
+    lookups = []
+
+    def classify(sentence, timer, state, degradation, bot):
+        return "3 courses", "courses", "model", None
+
+    def fetch(tag, sentence, state=None):
+        lookups.append(tag)
+        return f"{len(lookups)} courses", tag
+
+    monkeypatch.setattr(chat, "_classify", classify)
+    monkeypatch.setattr(chat, "fetch_data_from_db", fetch)
+    chat.response_cache.invalidate()
+
+    chat.get_bot_response(MESSAGE)
+    assert chat.get_bot_response(MESSAGE) == ("1 courses", "courses")
+    assert lookups == ["courses"]
@@ -0,0 +1,41 @@
+import chat_channel
+from chat_channel import ChannelRegistry, publish_answer, stream
+
+
+def test_reconnect_to_unknown_channel_replays_from_start(monkeypatch):
+    monkeypatch.setattr(chat_channel, "channels", ChannelRegistry())
+    channel, last_event_id = chat_channel.channels.resume("expired", 5)
+    assert channel.id != "expired"
+    assert last_event_id == 0
+
+    publish_answer(channel, {"response": "hello", "tag": "greeting"})
+    body = stream(channel, last_event_id)
+    events = [next(body) for _ in range(5)]  # retry, hello, start, part, end
+    body.close()
+    assert [e.split("\n")[1] for e in events[2:]] == ["event: start", "event: part", "event: end"]
+
+
+def test_reconnect_to_known_channel_keeps_last_event_id(monkeypatch):
+    monkeypatch.setattr(chat_channel, "channels", ChannelRegistry())
+    channel = chat_channel.channels.open()
+    resumed, last_event_id = chat_channel.channels.resume(channel.id, 3)
+    assert resumed is channel
+    assert last_event_id == 3
+
+
+def test_streams_past_the_cap_are_turned_away(monkeypatch):
+    monkeypatch.setattr(chat_channel, "channels", ChannelRegistry())
+    monkeypatch.setattr(chat_channel, "MAX_STREAMS", 1)
+    first, second = chat_channel.channels.open(), chat_channel.channels.open()
+
+    open_body = stream(first)
+    assert next(open_body).startswith("retry:")
+    busy = list(stream(second))
+    assert len(busy) == 1 and busy[0].startswith("event: busy")
+    assert chat_channel.channels.listening(second.id) is None
+
+    open_body.close()  # frees the slot
+    body = stream(second)
+    assert next(body).startswith("retry:")
+    assert chat_channel.channels.listening(second.id) is second
+    body.close()
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from conftest import require_app
+
+require_app()
+
+from flask import jsonify  # noqa: E402
+from werkzeug.http import http_date  # noqa: E402
+
+from flask_server import app  # noqa: E402
+from flask_server.university import http_cache  # noqa: E402
+from flask_server.university.models import Course, ResourceVersion  # noqa: E402
+
+
+def _get(path="/api/courses", headers=None):
+    view = http_cache.conditional("courses")(lambda: jsonify(courses=[]))
+    with app.test_request_context(path, headers=headers or {}):
+        return view()
+
+
+def _set_updated_at(db, updated_at):
+    db.session.get(ResourceVersion, "courses").updated_at = updated_at.replace(tzinfo=None)
+    db.session.commit()
+
+
+def test_every_write_bumps_the_version(app_db):
+    db = app_db
+    before = http_cache.resource_versions("courses")["courses"][0]
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.commit()
+    db.session.add(Course(course_id=2, name="ECE", duration="4 years"))
+    db.session.commit()
+    assert http_cache.resource_versions("courses")["courses"][0] == before + 2
+
+
+def test_etag_covers_the_query_string(app_db):
+    first, second = _get("/api/courses?page=1"), _get("/api/courses?page=2")
+    assert first.get_etag()[0] != second.get_etag()[0]
+    etag = first.get_etag()[0]
+    assert _get("/api/courses?page=1", {"If-None-Match": f'W/"{etag}"'}).status_code == 304
+    assert _get("/api/courses?page=2", {"If-None-Match": f'W/"{etag}"'}).status_code == 200
+
+
+def test_last_modified_is_withheld_during_its_own_second(app_db):
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.commit()
+
+    _set_updated_at(db, datetime.now(timezone.utc) + timedelta(seconds=1))
+    assert _get().last_modified is None
+
+    an_hour_ago = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+    _set_updated_at(db, an_hour_ago)
+    response = _get()
+    assert response.last_modified == an_hour_ago
+    assert _get(headers={"If-Modified-Since": http_date(an_hour_ago)}).status_code == 304
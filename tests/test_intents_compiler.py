@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import intents_compiler
+from intents_compiler import build, compile_intents, is_near_duplicate, load_intents, normalize_message
+
+INTENTS = {"intents": [
+    {"tag": "greeting", "patterns": ["Hi", "hii!", "Hiii", "Hello there", "  hello   THERE? "], "responses": ["Hello!"]},
+    {"tag": "holidays", "patterns": ["holiday details", "holidays details", "dress code", "dresscode"],
+     "responses": ["..."]},
+    {"tag": "faculty", "patterns": ["cse faculty", "ece faculty", "hello there"], "responses": ["..."]},
+]}
+
+
+def _patterns(compiled, tag):
+    return next(i["patterns"] for i in compiled["intents"] if i["tag"] == tag)
+
+
+def test_normalize_message():
+    assert normalize_message("  What ARE the  timings?! ") == "what are the timings"
+
+
+@pytest.mark.parametrize("a, b, near", [
+    ("holiday details", "holidays details", True),
+    ("cse faculty", "ece faculty", False),        # short words are entity variants
+    ("college timing", "college timings", True),
+    ("holiday details", "holiday detail list", False),
+    ("holiday list", "vacation list", False),
+])
+def test_is_near_duplicate(a, b, near):
+    assert is_near_duplicate(a, b) is near
+
+
+def test_duplicates_collapse_within_a_tag():
+    compiled, report = compile_intents(INTENTS)
+    assert _patterns(compiled, "greeting") == ["hi", "hello there"]
+    assert _patterns(compiled, "holidays") == ["holiday details", "dress code"]
+    assert _patterns(compiled, "faculty") == ["cse faculty", "ece faculty"]
+    assert report["removed"] == {"exact": 4, "near": 1, "conflict": 1}
+    assert report["patterns_before"] == 12 and report["patterns_after"] == 6
+
+
+def test_conflicts_stay_with_the_first_tag():
+    _, report = compile_intents(INTENTS)
+    assert report["conflicts"] == [{"pattern": "hello there", "tag": "faculty", "kept_under": "greeting"}]
+
+
+def test_keep_near():
+    compiled, report = compile_intents(INTENTS, collapse_near=False)
+    assert _patterns(compiled, "holidays") == ["holiday details", "holidays details", "dress code"]
+    assert report["removed"]["near"] == 0
+
+
+def test_compiled_file_is_used_only_while_it_matches_the_source(tmp_path, monkeypatch):
+    monkeypatch.delenv("CHATBOT_INTENTS_FILE", raising=False)
+    source, out = tmp_path / "intents.json", tmp_path / "intents.compiled.json"
+    source.write_text(json.dumps(INTENTS))
+    build(str(source), str(out), measure=False)
+    assert _patterns(load_intents(str(source), str(out)), "greeting") == ["hi", "hello there"]
+
+    source.write_text(json.dumps(dict(INTENTS, version=2)))  # edited after compiling
+    assert load_intents(str(source), str(out)) == dict(INTENTS, version=2)
+
+
+def test_main_check_fails_on_conflicts(tmp_path):
+    source = tmp_path / "intents.json"
+    source.write_text(json.dumps(INTENTS))
+    with pytest.raises(SystemExit) as exc:
+        intents_compiler.main(["--source", str(source), "--check", "--no-measure"])
+    assert exc.value.code == 1
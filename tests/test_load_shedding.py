@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+import load_shedding
+from load_shedding import DEGRADE_NONE, ConcurrencyLimiter, RateLimiter, TokenBucket
+from metrics import REGISTRY
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.retry_after() == 1
+    assert bucket.take(now + 0.5)          # one token back after 1/rate seconds
+    assert not bucket.take(now + 0.5)
+    assert [bucket.take(now + 60) for _ in range(4)] == [True, True, True, False]  # capped at burst
+
+
+def test_rate_limiter_keeps_a_bucket_per_client():
+    limiter = RateLimiter(rate=0.001, burst=1, max_clients=2)
+    assert limiter.allow("a") == (True, 0)
+    allowed, retry_after = limiter.allow("a")
+    assert not allowed and retry_after > 0
+    assert limiter.allow("b")[0]
+
+    assert limiter.allow("c")[0]           # forgets "a", the least recently seen
+    assert limiter.allow("a")[0]
+    assert RateLimiter(rate=0).allow("a") == (True, 0)
+
+
+def test_a_full_queue_is_rejected_at_once():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, timeout=5)
+    assert limiter.acquire() is None
+    assert limiter.acquire() == "queue_full"
+    limiter.release()
+    assert limiter.acquire() is None
+
+
+def test_a_queued_request_times_out_or_gets_the_released_slot():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=4, timeout=0.05)
+    assert limiter.acquire() is None
+    assert limiter.acquire() == "queue_timeout"
+    assert limiter.waiting == 0 and limiter.level == DEGRADE_NONE
+
+    limiter.timeout = 5
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(limiter.acquire()))
+    waiter.start()
+    while limiter.waiting == 0:
+        time.sleep(0.001)
+    assert limiter.level > DEGRADE_NONE    # one of four queue places taken
+    limiter.release()
+    waiter.join(5)
+    assert result == [None] and limiter.active == 1 and limiter.level == DEGRADE_NONE
+
+
+@pytest.fixture
+def proxied_app(monkeypatch):
+    monkeypatch.setattr(load_shedding, "rate_limiter", RateLimiter(rate=0.001, burst=1))
+    monkeypatch.setattr(load_shedding, "concurrency_limiter", ConcurrencyLimiter(limit=4, max_queue=4))
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=0, x_host=0, x_port=0, x_prefix=0)
+    app.add_url_rule("/chat", view_func=load_shedding.shed_load(lambda: jsonify(ok=True)))
+    return app.test_client()
+
+
+def test_clients_behind_a_proxy_get_their_own_buckets(proxied_app):
+    REGISTRY.reset()
+
+    def send(client):
+        return proxied_app.get("/chat", headers={"X-Forwarded-For": client},
+                               environ_base={"REMOTE_ADDR": "10.0.0.1"})
+
+    assert send("203.0.113.1").status_code == 200
+    assert send("203.0.113.2").status_code == 200
+    response = send("203.0.113.1")
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) > 0
+    assert REGISTRY.counter_values("chatbot_shed_total") == {(("reason", "rate_limited"),): 1}
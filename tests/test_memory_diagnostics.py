@@ -0,0 +1,55 @@
+import tracemalloc
+
+import pytest
+
+import memory_diagnostics
+
+
+@pytest.fixture
+def tracing():
+    started = not tracemalloc.is_tracing()
+    assert memory_diagnostics.start(frames=5)
+    yield
+    if started:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("configured, sent, allowed", [
+    ("secret", "secret", True),
+    ("secret", "wrong", False),
+    ("secret", None, False),
+    ("", "", False),     # no token configured: always off, even for loopback
+    ("", None, False),
+])
+def test_authorized_needs_the_configured_token(monkeypatch, configured, sent, allowed):
+    monkeypatch.setattr(memory_diagnostics, "DIAGNOSTICS_TOKEN", configured)
+    assert memory_diagnostics.authorized(sent) is allowed
+
+
+def test_report_shows_growth_since_the_baseline(tracing):
+    memory_diagnostics.reset_baseline()
+    grown = [bytearray(1024) for _ in range(200)]  # noqa: F841  kept alive for the snapshot
+    result = memory_diagnostics.report(limit=5)
+    assert result["traced_bytes"] > 0
+    top = result["top"][0]
+    assert top["size_diff"] >= 200 * 1024 and __file__ in top["site"]
+
+
+def test_report_rejects_unknown_grouping(tracing):
+    with pytest.raises(ValueError):
+        memory_diagnostics.report(key_type="module")
+
+
+def test_endpoint_is_hidden_from_loopback_without_a_token(tracing, monkeypatch):
+    from conftest import require_app
+    require_app()
+    from flask_server import app
+
+    client = app.test_client()
+    monkeypatch.setattr(memory_diagnostics, "DIAGNOSTICS_TOKEN", "")
+    assert client.get("/debug/memory", environ_base={"REMOTE_ADDR": "127.0.0.1"}).status_code == 404
+
+    monkeypatch.setattr(memory_diagnostics, "DIAGNOSTICS_TOKEN", "secret")
+    assert client.get("/debug/memory").status_code == 404
+    response = client.get("/debug/memory?limit=3", headers={"X-Diagnostics-Token": "secret"})
+    assert response.status_code == 200 and len(response.get_json()["top"]) <= 3
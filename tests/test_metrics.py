@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+import metrics
+from metrics import REGISTRY, StageTimer, sampled_profile
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    seen = []
+    monkeypatch.setattr(metrics, "_profile_hook", seen.append)
+    return seen
+
+
+def test_stage_seconds_are_labelled_with_the_tag():
+    REGISTRY.reset()
+    timer = StageTimer()
+    with timer.stage("inference"):
+        pass
+    timer.finish("holidays")
+    StageTimer().finish(None)
+
+    stages = REGISTRY.snapshot()["chatbot_stage_seconds"]
+    assert list(stages) == [(("stage", "inference"), ("tag", "holidays"))]
+    assert 'chatbot_stage_seconds_count{stage="inference",tag="holidays"} 1' in REGISTRY.render()
+
+
+def test_sampled_profile_reports_to_the_hook(profiles):
+    with sampled_profile(rate=1):
+        sum(range(100))
+    with sampled_profile(rate=0):
+        pass
+    assert len(profiles) == 1
+
+
+def test_concurrent_requests_are_not_profiled_twice(profiles):
+    inside, release, errors = threading.Event(), threading.Event(), []
+
+    def first():
+        try:
+            with sampled_profile(rate=1):
+                inside.set()
+                release.wait(5)
+        except Exception as exc:  # noqa: BLE001  surfaced below
+            errors.append(exc)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert inside.wait(5)
+    with sampled_profile(rate=1):   # skipped while the first one runs
+        pass
+    release.set()
+    thread.join(5)
+    assert errors == [] and len(profiles) == 1
+
+    with sampled_profile(rate=1):   # and the lock is free again
+        pass
+    assert len(profiles) == 2
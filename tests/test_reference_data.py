@@ -0,0 +1,54 @@
+import pickle
+
+import pytest
+
+from conftest import require_app
+
+require_app()
+
+from flask_server.university.reference_data import CourseInfo, ReferenceData  # noqa: E402
+
+REF = ReferenceData("t", [CourseInfo(1, "Computer Science and Engineering", "4 years", True),
+                          CourseInfo(2, "B.E. ECE", "4 years", False),
+                          CourseInfo(3, "Mechanical Engineering", "4 years", False)],
+                    ["CSE", "Physics", "physics"])
+
+
+@pytest.mark.parametrize("text, department", [
+    ("cse faculty", "CSE"),
+    ("cse faculty list with names", "CSE"),      # "with" is not IT
+    ("digital electronics faculty", None),       # nor is "digital"
+    ("institute faculty", None),
+    ("it faculty", "IT"),
+    ("faculty of ece and cse", "ECE"),           # the first one mentioned
+    ("physics faculty", "Physics"),               # stored under a teacher's spelling
+    ("", None),
+])
+def test_find_department(text, department):
+    assert REF.find_department(text) == department
+
+
+def test_departments_include_teacher_departments_once():
+    assert REF.departments[-1] == "Physics"
+    assert REF.departments.count("Physics") == 1
+
+
+def test_find_course():
+    assert REF.find_course("computer science and engineering").course_id == 1
+    assert REF.find_course("mechanical").course_id == 3
+    assert REF.find_course("e") is None          # too short for a partial match
+    assert REF.find_course("") is None
+
+
+def test_department_courses():
+    assert REF.department_courses("CSE") == {1}   # abbreviation
+    assert REF.department_courses("ECE") == {2}   # in the name
+    assert REF.department_courses("MECH") == {3}  # word prefix
+    assert REF.department_courses("IT") == frozenset()
+
+
+def test_snapshots_survive_pickling():
+    # the shared cache pickles snapshots
+    copy = pickle.loads(pickle.dumps(REF))
+    assert copy.find_department("cse faculty list with names") == "CSE"
+    assert copy.by_id[2].name == "B.E. ECE"
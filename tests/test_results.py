@@ -0,0 +1,43 @@
+from io import BytesIO
+
+import pytest
+
+from conftest import require_app
+
+require_app()
+
+from flask_server.university import results  # noqa: E402
+from flask_server.university.models import Course, Student  # noqa: E402
+
+
+@pytest.mark.parametrize("text, ids, invalid", [
+    ("434121010021", ["434121010021"], []),
+    ("434 121 010 021", ["434121010021"], []),
+    ("434121010021 434121010022", ["434121010021", "434121010022"], []),
+    ("1, 2;3\n4\r\n2", ["1", "2", "3", "4"], []),
+    ("434 121 010 021, 434 121 010 022", ["434121010021", "434121010022"], []),
+    ("student_id\n12\nabc", ["12"], ["student_id", "abc"]),
+    ("", [], []),
+])
+def test_parse_student_ids(text, ids, invalid):
+    assert results.parse_student_ids(text) == (ids, invalid)
+
+
+def test_uploads_over_the_limit_are_refused(monkeypatch):
+    monkeypatch.setattr(results, "MAX_UPLOAD_BYTES", 10)
+    assert results.read_uploaded_ids(BytesIO(b"\xef\xbb\xbf1,2,3")) == "1,2,3"
+    assert results.read_uploaded_ids(BytesIO(b"1,2,3,4,5,6")) is None
+
+
+def test_result_rows_keep_request_order_across_chunks(app_db, monkeypatch):
+    monkeypatch.setattr(results, "CHUNK_SIZE", 2)
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.add_all(Student(id=str(n), name=f"Student {n}", cgpa=8.0, course_id=1) for n in range(5))
+    db.session.commit()
+
+    rows = results.result_rows(["4", "9", "0", "2", "3"])
+    assert [r["id"] for r in rows] == ["4", "9", "0", "2", "3"]
+    assert [r["found"] for r in rows] == [True, False, True, True, True]
+    assert rows[0]["course"] == "CSE"
+    assert results.results_table(rows)["rows"][1] == ["9", "Not found", "-", "-"]
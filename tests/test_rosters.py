@@ -0,0 +1,68 @@
+import pytest
+
+from conftest import require_app
+
+require_app()
+
+from flask_server.university import rosters  # noqa: E402
+from flask_server.university.models import Course, Student, Teacher  # noqa: E402
+
+
+@pytest.fixture
+def roster(app_db, monkeypatch):
+    monkeypatch.setattr(rosters, "PAGE_SIZE", 2)
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.add_all(Student(id=f"S{n}", name=f"Student {n}", cgpa=8.0, course_id=1) for n in range(5))
+    db.session.add_all(Teacher(id=n, first_name="Teacher", last_name=str(n), department="CSE")
+                       for n in range(1, 3))
+    db.session.commit()
+    return db
+
+
+def test_pages_continue_after_the_last_id(roster):
+    state = {}
+    first = "".join(rosters.page(state, "students", 1))
+    assert "Student 0" in first and "Student 1" in first and "Student 2" not in first
+    assert state["more"]["after"] == "S1" and state["more"]["shown"] == 2
+
+    second, tag = rosters.next_page(state)
+    second = "".join(second)
+    assert tag == "students"
+    assert "3. *Student 2*" in second and "Student 1" not in second
+
+    last = "".join(rosters.next_page(state)[0])
+    assert "5. *Student 4*" in last and "Type *more*" not in last
+    assert "more" not in state
+    assert rosters.next_page(state) is None
+
+
+def test_a_list_that_fits_leaves_no_continuation(roster):
+    state = {"more": {"name": "students"}}
+    text = "".join(rosters.page(state, "faculty", "CSE"))
+    assert "Teacher 2" in text and "more" not in state
+
+
+def test_without_a_session_the_list_stops_at_one_page(roster):
+    text = "".join(rosters.page(None, "students"))
+    assert "Showing 1–2." in text and "Type *more*" not in text
+
+
+@pytest.mark.parametrize("text, more", [
+    ("more", True), ("next", True), ("show next 50", True), ("more students please", True),
+    ("more about cse", False), ("next semester holidays", False), ("", False),
+])
+def test_wants_more(text, more):
+    assert rosters.wants_more(text) is more
+
+
+def test_links_carry_no_host(roster):
+    assert "🔗 Download: /download/holiday/7/?variant=web" in rosters._line("holidays", None, (7, 2025, "h.pdf"), 1,
+                                                                          html=False)
+
+    from flask_server import app
+    db = roster
+    db.session.get(Course, 1).syllabus = b"%PDF"
+    db.session.commit()
+    response = app.test_client().get("/courses/syllabus/list", headers={"Host": "uni.example"})
+    assert response.get_json()["courses"][0]["syllabus_link"] == "/download/syllabus/1"
@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import require_app
+
+require_app()
+
+import run  # noqa: E402
+from flask_server.university import rosters  # noqa: E402
+from flask_server.university.models import Course, Student  # noqa: E402
+
+
+@pytest.fixture
+def pages(app_db, monkeypatch):
+    """The (name, key) of every roster page read."""
+    monkeypatch.setattr(rosters, "PAGE_SIZE", 2)
+    db = app_db
+    db.session.add(Course(course_id=1, name="CSE", duration="4 years"))
+    db.session.add_all(Student(id=f"S{n}", name=f"Student {n}", cgpa=8.0, course_id=1) for n in range(3))
+    db.session.commit()
+
+    calls = []
+    page = rosters.page
+
+    def counting_page(state, name, key=None, **kwargs):
+        calls.append((name, key))
+        return page(state, name, key, **kwargs)
+
+    monkeypatch.setattr(rosters, "page", counting_page)
+    return calls
+
+
+def test_a_classified_roster_is_read_once(pages, monkeypatch):
+    monkeypatch.setattr(run, "get_bot_response", lambda msg, state, degradation: run.fetch_data_from_db(
+        "students", msg, state))
+    state = {}
+    payload, status = run.answer_message("student details of cse", state)
+    text = "".join(payload["response"])
+    assert status == 200 and pages == [("students", 1)]
+    assert "*Student 0*" in text
+    assert state["more"]["after"] == "S1" and not state["more"]["html"]
+
+
+def test_a_resolved_follow_up_is_read_once(pages, monkeypatch):
+    def not_called(*args):
+        raise AssertionError("a resolved follow-up skips classification")
+
+    monkeypatch.setattr(run, "get_bot_response", not_called)
+    state = {"pending": {"intent": "students", "slot": "course"}}
+    payload, status = run.answer_message("cse", state)
+    assert status == 200 and payload["tag"] == "students"
+    assert "*Student 1*" in "".join(payload["response"])
+    assert pages == [("students", 1)]
+
+    payload, _ = run.answer_message("more", state)
+    assert "*Student 2*" in "".join(payload["response"])
+    assert "more" not in state
+
+
+def test_a_reply_that_fills_no_slot_is_classified(pages, monkeypatch):
+    classified = []
+
+    def get_bot_response(msg, state, degradation):
+        classified.append(msg)
+        return "Hello!", "greeting"
+
+    monkeypatch.setattr(run, "get_bot_response", get_bot_response)
+    # one letter is too short to pick a course by a partial name
+    state = {"pending": {"intent": "students", "slot": "course"}}
+    payload, _ = run.answer_message("e", state)
+    assert classified == ["e"] and payload == {"response": "Hello!", "tag": "greeting"}
+    assert "pending" not in state and pages == []
+
+
+def test_a_department_reply_lists_its_faculty(pages, monkeypatch):
+    monkeypatch.setattr(run, "get_bot_response", lambda *args: pytest.fail("not classified"))
+    state = {"pending": {"intent": "faculty", "slot": "department"}}
+    payload, _ = run.answer_message("cse please", state)
+    assert payload["tag"] == "faculty" and pages == [("faculty", "CSE")]
@@ -0,0 +1,59 @@
+import pytest
+
+import session_store
+from session_store import MemoryBackend, SQLiteBackend, SessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "time", clock)
+    backend = MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "sessions.db"))
+    store = SessionStore(backend, ttl=60)
+    store.clock = clock
+    return store
+
+
+def test_state_round_trips(store):
+    store.set("sid", {"pending": {"intent": "faculty", "slot": "department"}})
+    assert store.get("sid") == {"pending": {"intent": "faculty", "slot": "department"}}
+    assert store.get("other") is None
+
+
+def test_sessions_expire_after_the_ttl(store):
+    store.set("sid", {"n": 1})
+    store.clock.now += 59
+    assert store.get("sid") == {"n": 1}
+    store.clock.now += 1
+    assert store.get("sid") is None
+
+
+def test_saving_extends_the_expiry(store):
+    store.set("sid", {"n": 1})
+    store.clock.now += 50
+    store.set("sid", {"n": 2})
+    store.clock.now += 50
+    assert store.get("sid") == {"n": 2}
+
+
+def test_expired_sessions_are_purged(store):
+    store.set("old", {})
+    store.clock.now += 30
+    store.set("new", {})
+    store.clock.now += 31
+    assert store.backend.purge(store.clock.now) == 1
+    assert store.get("new") == {}
+
+
+def test_clear(store):
+    store.set("sid", {"n": 1})
+    store.clear("sid")
+    assert store.get("sid") is None
@@ -0,0 +1,81 @@
+import pytest
+
+from conftest import require_app
+
+require_app()
+
+from flask_server import app  # noqa: E402
+from flask_server.university import syllabus  # noqa: E402
+from flask_server.university.models import Course, SyllabusEntry  # noqa: E402
+from flask_server.university.reference_data import reference  # noqa: E402
+
+PAGES = ["""CS3501 COMPILER DESIGN L T P C 3 0 2 4
+COURSE OBJECTIVES:
+To learn the phases of a compiler
+UNIT I INTRODUCTION TO COMPILERS 9
+Structure of a compiler – Lexical Analysis, Role of Lexical Analyzer; Input Buffering.
+UNIT II SYNTAX ANALYSIS 9
+Role of Parser – Grammars – Top Down Parsing
+TEXT BOOKS:
+1. Aho, Compilers
+"""]
+
+
+@pytest.fixture
+def courses(app_db):
+    db = app_db
+    db.session.add_all([Course(course_id=1, name="Computer Science and Engineering", duration="4 years"),
+                        Course(course_id=2, name="Mechanical Engineering", duration="4 years")])
+    for course_id, entry in [(1, e) for e in syllabus.parse_syllabus(PAGES)] + [
+            (2, {"subject": "ME3491 Theory Of Machines", "unit": "Unit I", "topic": "Lexical gear trains"})]:
+        db.session.add(SyllabusEntry(course_id=course_id, **entry))
+    db.session.commit()
+    with app.test_request_context():
+        yield db
+
+
+def test_parse_syllabus_splits_subjects_units_and_topics():
+    entries = syllabus.parse_syllabus(PAGES)
+    topics = [e["topic"] for e in entries]
+    assert topics[0] == "Compiler Design"
+    assert "Lexical Analysis" in topics and "Top Down Parsing" in topics
+    assert "To learn the phases of a compiler" not in topics  # objectives are not topics
+    assert not any("Aho" in t for t in topics)  # nor are the books
+    assert entries[-1]["unit"] == "Unit II: Syntax Analysis"
+
+
+def test_department_stands_for_its_courses(courses):
+    ref = reference()
+    assert ref.department_courses("CSE") == {1}
+    assert ref.department_courses("MECH") == {2}
+    assert ref.department_courses("IT") == frozenset()
+
+
+def test_topic_question_scoped_by_department(courses):
+    answer = syllabus.answer_topic_question("does cse cover compiler design?")
+    assert answer.startswith("✅ Yes, *CSE* covers *compiler design*")
+
+    # "lexical" is in both courses; the department keeps the answer to CSE
+    answer = syllabus.answer_topic_question("does mech cover lexical")
+    assert "*MECH*" in answer and "gear trains" in answer and "Analysis" not in answer
+
+
+def test_topic_question_it_is_a_pronoun(courses):
+    answer = syllabus.answer_topic_question("does it cover lexical analysis")
+    assert answer.startswith("📚 *lexical analysis* is covered in")
+    assert "Computer Science and Engineering" in answer
+
+
+def test_syllabus_download_requests_are_not_topic_questions(courses):
+    assert syllabus.answer_topic_question("give me cse syllabus") is None
+    assert syllabus.answer_topic_question("cse syllabus") is None
+
+
+def test_search_route_skips_deleted_courses(courses, monkeypatch):
+    monkeypatch.setattr(syllabus, "search_topics", lambda *args, **kwargs: [
+        syllabus.Topic(1, "CS3501 Compiler Design", "Unit I", "Lexical Analysis"),
+        syllabus.Topic(99, None, None, "Lexical Analysis"),
+    ])
+    response = app.test_client().get("/courses/syllabus/topics/api/?q=lexical")
+    assert response.status_code == 200
+    assert [m["course"] for m in response.get_json()["matches"]] == ["Computer Science and Engineering"]
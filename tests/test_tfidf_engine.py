@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from tfidf_engine import TfidfIndex, char_ngrams
+
+INTENTS = {"intents": [
+    {"tag": "timings", "patterns": ["What are the college timings?", "college hours"], "responses": ["9 to 4"]},
+    {"tag": "holidays", "patterns": ["holiday list", "holidays"], "responses": []},
+    {"tag": "fees", "patterns": ["what is the fee structure", "college fees"], "responses": ["See the office"]},
+    {"tag": "duplicate", "patterns": ["holiday list"], "responses": ["never used"]},
+]}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TfidfIndex(INTENTS)
+
+
+def test_char_ngrams_pad_words():
+    grams = char_ngrams("Hi!")
+    assert grams == {" h": 1, "hi": 1, "i ": 1, " hi": 1, "hi ": 1, " hi ": 1}
+
+
+def test_first_intent_keeps_a_duplicate_pattern(index):
+    assert len(index) == 6
+    assert index.tags[index.patterns.index("holiday list")] == "holidays"
+
+
+def test_scores_match_a_dense_cosine(index):
+    text = "colege timngs"
+    cols, weights = index._weights(char_ngrams(text))
+    dense = np.zeros((len(index), len(index.vocab)), dtype=np.float32)
+    for col in range(len(index.vocab)):
+        for k in range(index.indptr[col], index.indptr[col + 1]):
+            dense[index.rows[k], col] = index.data[k]
+    query = np.zeros(len(index.vocab), dtype=np.float32)
+    query[cols] = weights
+    assert np.allclose(index.scores(text), dense @ query, atol=1e-6)
+
+
+def test_nearest_ranks_typos_best_first(index):
+    ranked = index.nearest("wat r the colege timngs", k=3)
+    assert ranked[0][:2] == ("timings", "what are the college timings")
+    assert [score for *_, score in ranked] == sorted((score for *_, score in ranked), reverse=True)
+    assert index.classify("holidy lst")[0] == "holidays"
+
+
+def test_nothing_in_common_is_no_match(index):
+    assert index.classify("zzz") == (None, 0.0)
+    assert index.classify("") == (None, 0.0)
+
+
+# =============================
+# TF-IDF VS THE MLP (classify_batch runs both without the app)
+# =============================
+
+class ConstantModel:
+    """Stands in for the NeuralNet: always predicts `tag` with probability `p`."""
+
+    def __init__(self, torch, tags, tag, p):
+        logits = np.full(len(tags), -50.0, dtype=np.float32)
+        logits[tags.index(tag)] = 0.0
+        if p < 1:
+            logits[(tags.index(tag) + 1) % len(tags)] = float(np.log((1 - p) / p))
+        self.logits = torch.from_numpy(logits)
+
+    def __call__(self, X):
+        return self.logits.repeat(X.shape[0], 1)
+
+
+def _bot(index, model_tag="fees", p=0.99):
+    torch = pytest.importorskip("torch")
+    tags = ["timings", "holidays", "fees"]
+    return SimpleNamespace(
+        exact_patterns={"holidays": "holidays"}, tfidf=index, intents=INTENTS, tags=tags,
+        intent_responses={i["tag"]: i["responses"] for i in INTENTS["intents"]},
+        all_words=["colleg", "time", "holiday", "fee"], device=torch.device("cpu"),
+        model=ConstantModel(torch, tags, model_tag, p),
+    )
+
+
+def test_tfidf_answers_typos_the_mlp_sends_to_fuzzy_matching(index):
+    classify = pytest.importorskip("classify_batch").classify
+    bot = _bot(index, model_tag="fees", p=0.99)
+    messages = ["holidays", "wat r the colege timngs", "zzz"]
+
+    tfidf = classify(messages, bot, spellcheck=False)
+    assert [(r["tier"], r["tag"]) for r in tfidf] == [("exact", "holidays"), ("tfidf", "timings"),
+                                                     ("unknown", "unknown")]
+
+    bot.tfidf = None
+    mlp = classify(messages, bot, spellcheck=False)
+    # a confident prediction of a tag without a database answer goes to fuzzy matching
+    assert mlp[0]["tier"] == "exact"
+    assert mlp[1]["model_tag"] == "fees" and mlp[1]["tier"] in ("fuzzy", "unknown")
+
+
+def test_both_engines_answer_database_tags_without_responses(index):
+    classify = pytest.importorskip("classify_batch").classify
+    bot = _bot(index, model_tag="holidays", p=0.99)
+    result = classify(["holiday lst"], bot, spellcheck=False)[0]
+    assert (result["tier"], result["tag"]) == ("tfidf", "holidays")
+
+    bot.tfidf = None
+    result = classify(["holiday lst"], bot, spellcheck=False)[0]
+    assert (result["tier"], result["tag"]) == ("model", "holidays")
+
+    # at or below CONFIDENCE_THRESHOLD the MLP's prediction is not used
+    bot.model = ConstantModel(pytest.importorskip("torch"), bot.tags, "holidays", 0.6)
+    assert classify(["holiday lst"], bot, spellcheck=False)[0]["tier"] != "model"
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("torch")
+
+import train  # noqa: E402
+
+
+@pytest.mark.parametrize("folds", ["0", "1", "-3"])
+def test_fewer_than_two_folds_are_rejected(folds, capsys):
+    with pytest.raises(SystemExit) as exc:
+        train.main(["--search", "grid", "--folds", folds])
+    assert exc.value.code == 2
+    assert "--folds must be at least 2" in capsys.readouterr().err
+
+
+def test_stratified_folds_spread_every_tag():
+    labels = train.np.array([0] * 6 + [1] * 3 + [2])
+    folds = train.stratified_folds(labels, 3, seed=0)
+    assert sorted(train.np.concatenate(folds).tolist()) == list(range(10))
+    assert all(sum(labels[fold] == 0) == 2 and sum(labels[fold] == 1) == 1 for fold in folds)
@@ -0,0 +1,59 @@
+import os
+import threading
+
+import pytest
+
+import transcript_log
+from metrics import StageTimer
+from transcript_log import JSONLSink, SQLiteSink, TranscriptLogger
+
+
+def _record(logger, message):
+    timer = StageTimer()
+    timer.details.update(tier="exact", probability=None, corrected=message)
+    logger.record(message, "greeting", timer, 1.0)
+
+
+def test_entries_are_batched_into_the_sink(tmp_path):
+    logger = TranscriptLogger(SQLiteSink(str(tmp_path / "t.db")), flush_interval=60)
+    for message in ("hi", "hello"):
+        _record(logger, message)
+    logger.flush()
+    assert [e["message"] for e in logger.sink.read()] == ["hi", "hello"]
+
+
+def test_a_full_buffer_drops_the_oldest(tmp_path):
+    logger = TranscriptLogger(JSONLSink(str(tmp_path)), capacity=2, flush_interval=60)
+    for message in ("a", "b", "c"):
+        _record(logger, message)
+    assert logger.dropped == 1
+    logger.flush()
+    assert [e["message"] for e in logger.sink.read()] == ["b", "c"] and logger.dropped == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_a_forked_child_writes_only_its_own_entries(tmp_path, monkeypatch):
+    logger = TranscriptLogger(JSONLSink(str(tmp_path)), flush_interval=60)
+    monkeypatch.setattr(transcript_log, "transcripts", logger)
+    _record(logger, "parent")
+    logger._lock.acquire()   # as if the parent's writer were mid-flush at the fork
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            writers = [t for t in threading.enumerate() if t.name == "transcript-writer"]
+            if not logger._buffer and logger._pid == os.getpid() and writers:
+                _record(logger, "child")
+                logger.flush()   # would deadlock on the inherited lock
+                code = 0
+        finally:
+            os._exit(code)
+
+    logger._lock.release()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    logger.flush()
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2 and any(f"-{pid}.jsonl" in name for name in files)
+    assert sorted(e["message"] for e in logger.sink.read()) == ["child", "parent"]
@@ -0,0 +1,140 @@
+"""
+Retrieval intent engine: the nearest intents.json pattern by character
+n-gram TF-IDF.
+
+Every pattern is turned into the 2- to 4-letter n-grams of its words
+(padded with spaces, so word starts and ends count), weighted by sublinear
+term frequency times smoothed inverse document frequency and L2-normalised.
+The pattern matrix is built once per intents file and kept column-wise
+(for each n-gram, the patterns that contain it), so a message is scored
+against all patterns with one sparse matrix-vector product over just its
+own n-grams; argpartition then picks the top k. N-grams overlap across
+typos, so this engine needs no spell correction.
+
+    CHATBOT_ENGINE           mlp (default): NeuralNet + fuzzy matching; tfidf: this engine
+    CHATBOT_TFIDF_MIN_SCORE  cosine similarity needed to answer (default 0.5)
+
+    python tfidf_engine.py "wat r the colege timings"     # top matches for a message
+"""
+import logging
+import math
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+from intents_compiler import normalize_message
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("mlp", "tfidf")
+ENGINE = os.environ.get("CHATBOT_ENGINE", "mlp").lower()
+if ENGINE not in ENGINES:
+    logger.warning("⚠️ Unknown CHATBOT_ENGINE %r, using mlp", ENGINE)
+    ENGINE = "mlp"
+MIN_SCORE = float(os.environ.get("CHATBOT_TFIDF_MIN_SCORE", "0.5"))
+NGRAM_RANGE = (2, 4)
+TOP_K = 5
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    """Counter of the n-grams of each space-padded word of the normalized text."""
+    low, high = ngram_range
+    grams = Counter()
+    for word in normalize_message(text).split():
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class TfidfIndex:
+    """Sparse TF-IDF matrix of the patterns of one intents dict."""
+
+    def __init__(self, intents, ngram_range=NGRAM_RANGE):
+        self.ngram_range = ngram_range
+        self.patterns, self.tags = [], []
+        seen = set()
+        for intent in intents["intents"]:
+            for pattern in intent["patterns"]:
+                key = normalize_message(pattern)
+                # first intent wins on duplicate patterns, as in the exact-match lookup
+                if key and key not in seen:
+                    seen.add(key)
+                    self.patterns.append(key)
+                    self.tags.append(intent["tag"])
+
+        counts = [char_ngrams(p, ngram_range) for p in self.patterns]
+        df = Counter(gram for c in counts for gram in c)
+        self.vocab = {gram: col for col, gram in enumerate(sorted(df))}
+        n = len(self.patterns)
+        self.idf = np.array([math.log((1 + n) / (1 + df[gram])) + 1 for gram in sorted(df)], dtype=np.float32)
+
+        # column-major (CSC) arrays: patterns holding n-gram `col` are
+        # rows[indptr[col]:indptr[col + 1]] with weights data[...]
+        columns = [[] for _ in self.vocab]
+        for row, c in enumerate(counts):
+            cols, weights = self._weights(c)
+            for col, weight in zip(cols.tolist(), weights.tolist()):
+                columns[col].append((row, weight))
+        self.indptr = np.zeros(len(columns) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(entries) for entries in columns])
+        self.rows = np.array([row for entries in columns for row, _ in entries], dtype=np.int32)
+        self.data = np.array([weight for entries in columns for _, weight in entries], dtype=np.float32)
+
+    def __len__(self):
+        return len(self.patterns)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.rows.nbytes + self.data.nbytes + self.idf.nbytes
+
+    def _weights(self, counts):
+        """(columns, L2-normalised tf-idf weights) of the known n-grams in `counts`."""
+        known = [(self.vocab[gram], count) for gram, count in counts.items() if gram in self.vocab]
+        if not known:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        cols = np.array([col for col, _ in known], dtype=np.int64)
+        tf = 1 + np.log(np.array([count for _, count in known], dtype=np.float32))
+        weights = tf * self.idf[cols]
+        return cols, weights / np.linalg.norm(weights)
+
+    def scores(self, text):
+        """Cosine similarity of `text` to every pattern."""
+        cols, weights = self._weights(char_ngrams(text, self.ngram_range))
+        if not len(cols):
+            return np.zeros(len(self), dtype=np.float32)
+        starts, ends = self.indptr[cols], self.indptr[cols + 1]
+        lengths = ends - starts
+        # positions of every stored entry in the message's columns, without a Python loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.rows[offsets], weights=self.data[offsets] * np.repeat(weights, lengths),
+                           minlength=len(self)).astype(np.float32)
+
+    def nearest(self, text, k=TOP_K):
+        """[(tag, pattern, score)] of the k most similar patterns, best first."""
+        scores = self.scores(text)
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.tags[i], self.patterns[i], float(scores[i])) for i in top]
+
+    def classify(self, text):
+        """(tag, score) of the nearest pattern; (None, 0.0) when nothing overlaps."""
+        best = self.nearest(text, 1)
+        if not best or best[0][2] <= 0:
+            return None, 0.0
+        return best[0][0], best[0][2]
+
+
+if __name__ == "__main__":
+    from intents_compiler import load_intents
+
+    index = TfidfIndex(load_intents())
+    print(f"📚 {len(index)} patterns, {len(index.vocab)} n-grams, {len(index.data)} weights")
+    for tag, pattern, score in index.nearest(" ".join(sys.argv[1:]) or "hello"):
+        print(f"{score:.3f}  {tag:20s}  {pattern}")
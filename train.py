@@ -1,110 +1,305 @@
+"""
+Trains the intent classifier and writes the serving artifact (data.bin).
+
+    python train.py                                   # the default config below
+    python train.py --search grid                     # every combination in SEARCH_SPACE
+    python train.py --search random --trials 40 --folds 5 --workers 8
+
+A search runs its trials (one hyperparameter/architecture config each) across
+a process pool. Every trial is scored with stratified k-fold cross-validation
+over the intents.json patterns, recording accuracy, training time and
+inference latency. The best config is retrained on all patterns and saved as
+data.bin, and every trial goes into training_report.json.
+"""
+import argparse
+import itertools
 import json
-from flask_server.university.nlp_utils import tokenize, stem, bag_of_words
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
 import numpy as np
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
 from neural_net import NeuralNet
+from model_artifact import save_artifact
+from intents_compiler import load_intents
 
-
-with open('intents.json', 'r') as json_data:
-    intents = json.load(json_data)
-
-
-all_words = []
-tags = [intent['tag'] for intent in intents['intents']]
-xy = []
+FILE = 'data.bin'
+REPORT_FILE = 'training_report.json'
 puncts = ['?', '!', '.', ',']
 
+DEFAULT_CONFIG = {"hidden_size": 8, "num_layers": 4, "lr": 0.001, "epochs": 1000, "batch_size": 8}
 
-for intent in intents['intents']:
-    for pattern in intent['patterns']:
-        w = tokenize(pattern)
-        all_words.extend(w)
-        xy.append((w, intent['tag']))
-
-all_words = [stem(w) for w in all_words if w not in puncts]
-
-all_words = sorted(set(all_words))
-tags = sorted(set(tags))
-
-
-X_train = []
-Y_train = []
-
-
-for (pattern_sentence, tag) in xy:
-    bag = bag_of_words(pattern_sentence, all_words)
-    X_train.append(bag)
-    label = tags.index(tag)
-    Y_train.append(label)
-
-
-X_train = np.array(X_train)
-Y_train = np.array(Y_train)
-
-
-class ChatDataSet(Dataset):
-
-    def __init__(self, *args, **kwargs):
-        self.n_samples = len(X_train)
-        self.x_data = X_train
-        self.y_data = Y_train
-
-    def __getitem__(self, index):
-        return self.x_data[index], self.y_data[index]
-
-    def __len__(self):
-        return self.n_samples
-
-
-dataset = ChatDataSet()
-train_loader = DataLoader(dataset=dataset, batch_size=8,
-                          shuffle=True, num_workers=0)
-
-
-input_size = len(X_train[0])
-hidden_size = 8
-output_size = len(tags)
-
-
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-model = NeuralNet(input_size, hidden_size, output_size)
-model.to(device)
-
-
-criterion = nn.CrossEntropyLoss()
-optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
-
-
-for epoch in range(1000):
-    for (words, labels) in train_loader:
-        words = words.to(device)
-        labels = labels.to(device)
-        labels = labels.to(torch.long)
-        outputs = model(words)
-        loss = criterion(outputs, labels)
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
-
-    if (epoch+1) % 100 == 0:
-        print(f'epoch {epoch+1}/{8}, loss={loss.item():.4f}')
-
-
-print(f'final loss,loss={loss.item():.4f}')
-
-
-data = {
-    "model_state": model.state_dict(),
-    "input_size": input_size,
-    "output_size": output_size,
-    "hidden_size": hidden_size,
-    "all_words": all_words,
-    "tags": tags
+# grid mode tries every combination; random mode samples from the same choices
+# (and a log-uniform learning rate between the smallest and largest listed)
+SEARCH_SPACE = {
+    "hidden_size": [8, 16, 32, 64],
+    "num_layers": [2, 3, 4],
+    "lr": [0.001, 0.005],
+    "epochs": [300, 1000],
+    "batch_size": [8, 32],
 }
 
 
-FILE = 'data.pth'
-torch.save(data, FILE)
-print(f'training complete. File saved to {FILE}')
+# =============================
+# DATA
+# =============================
+
+def load_training_data(path=None):
+    """
+    Returns (X, Y, all_words, tags) for every pattern in `path`, by default
+    intents.compiled.json when it is up to date, else intents.json.
+    """
+    # imported here so search workers, which only get the arrays, skip the app import
+    from intent_matching import tokenize, stem, bag_of_words
+
+    if path is None:
+        intents = load_intents()
+    else:
+        with open(path, 'r') as json_data:
+            intents = json.load(json_data)
+
+    all_words = []
+    tags = [intent['tag'] for intent in intents['intents']]
+    xy = []
+
+    for intent in intents['intents']:
+        for pattern in intent['patterns']:
+            w = tokenize(pattern)
+            all_words.extend(w)
+            xy.append((w, intent['tag']))
+
+    all_words = [stem(w) for w in all_words if w not in puncts]
+
+    all_words = sorted(set(all_words))
+    tags = sorted(set(tags))
+
+    X = np.array([bag_of_words(pattern_sentence, all_words) for (pattern_sentence, _) in xy], dtype=np.float32)
+    Y = np.array([tags.index(tag) for (_, tag) in xy], dtype=np.int64)
+    return X, Y, all_words, tags
+
+
+def stratified_folds(labels, k, seed=0):
+    """
+    Splits sample indices into k folds with each tag spread evenly across them.
+    Tags with fewer than k patterns appear in only some validation folds.
+    """
+    rng = random.Random(seed)
+    folds = [[] for _ in range(k)]
+    by_label = {}
+    for i, y in enumerate(labels.tolist()):
+        by_label.setdefault(y, []).append(i)
+    offset = 0
+    for label in sorted(by_label):
+        indices = by_label[label]
+        rng.shuffle(indices)
+        for j, index in enumerate(indices):
+            folds[(offset + j) % k].append(index)
+        offset += len(indices)  # ✅ keeps small tags from always landing in fold 0
+    return [np.array(sorted(fold), dtype=np.int64) for fold in folds]
+
+
+# =============================
+# TRAINING
+# =============================
+
+def train_model(X, Y, num_classes, config, device=torch.device('cpu'), seed=0, log_every=0):
+    """Trains a NeuralNet with `config` and returns (model, final loss)."""
+    torch.manual_seed(seed)
+    model = NeuralNet(X.shape[1], config["hidden_size"], num_classes, config["num_layers"])
+    model.to(device)
+
+    criterion = nn.CrossEntropyLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=config["lr"])
+
+    words_all = torch.from_numpy(X).to(device)
+    labels_all = torch.from_numpy(Y).to(device)
+    batch_size = config["batch_size"]
+    loss = torch.tensor(0.0)
+
+    for epoch in range(config["epochs"]):
+        order = torch.randperm(len(words_all), device=device)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            outputs = model(words_all[batch])
+            loss = criterion(outputs, labels_all[batch])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+
+        if log_every and (epoch+1) % log_every == 0:
+            print(f'epoch {epoch+1}/{config["epochs"]}, loss={loss.item():.4f}')
+
+    return model, loss.item()
+
+
+def evaluate(model, X, Y, latency_samples=200):
+    """Returns (accuracy, median single-message inference latency in microseconds)."""
+    model.eval()
+    with torch.no_grad():
+        words = torch.from_numpy(X)
+        predicted = model(words).argmax(dim=1).numpy()
+        accuracy = float((predicted == Y).mean()) if len(Y) else 0.0
+
+        # the chatbot classifies one message at a time
+        latencies = []
+        for row in words[:latency_samples]:
+            start = time.perf_counter()
+            model(row.unsqueeze(0))
+            latencies.append((time.perf_counter() - start) * 1e6)
+    return accuracy, statistics.median(latencies) if latencies else 0.0
+
+
+# =============================
+# SEARCH
+# =============================
+
+_worker_data = {}
+
+
+def _init_worker(X, Y, num_classes, folds, seed):
+    # one trial per core: intra-op threads would only oversubscribe the CPU
+    torch.set_num_threads(1)
+    _worker_data.update(X=X, Y=Y, num_classes=num_classes, folds=folds, seed=seed)
+
+
+def run_trial(config):
+    """Cross-validates one config. Runs in a search worker."""
+    X, Y, num_classes, folds, seed = (_worker_data[k] for k in ("X", "Y", "num_classes", "folds", "seed"))
+    accuracies, train_seconds, latencies = [], [], []
+
+    for i, valid in enumerate(folds):
+        if not len(valid):
+            continue
+        train = np.concatenate([fold for j, fold in enumerate(folds) if j != i])
+
+        start = time.perf_counter()
+        model, _ = train_model(X[train], Y[train], num_classes, config, seed=seed + i)
+        train_seconds.append(time.perf_counter() - start)
+
+        accuracy, latency = evaluate(model, X[valid], Y[valid])
+        accuracies.append(accuracy)
+        latencies.append(latency)
+
+    return {
+        "config": config,
+        "accuracy": statistics.mean(accuracies),
+        "accuracy_std": statistics.pstdev(accuracies),
+        "fold_accuracies": accuracies,
+        "train_seconds": statistics.mean(train_seconds),
+        "latency_us": statistics.median(latencies),
+    }
+
+
+def search_configs(mode, trials, seed=0):
+    """The configs to try: the full grid, or `trials` random draws."""
+    names = list(SEARCH_SPACE)
+    if mode == "grid":
+        configs = [dict(zip(names, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+        return configs[:trials] if trials else configs
+
+    rng = random.Random(seed)
+    low, high = math.log10(min(SEARCH_SPACE["lr"])), math.log10(max(SEARCH_SPACE["lr"]))
+    configs = []
+    for _ in range(trials or 20):
+        config = {name: rng.choice(SEARCH_SPACE[name]) for name in names}
+        config["lr"] = round(10 ** rng.uniform(low, high), 5)
+        configs.append(config)
+    return configs
+
+
+def rank(results):
+    """Best first: highest accuracy, then fastest inference, then fastest training."""
+    return sorted(results, key=lambda r: (-round(r["accuracy"], 4), r["latency_us"], r["train_seconds"]))
+
+
+def search(args):
+    X, Y, all_words, tags = load_training_data(args.intents)
+    folds = stratified_folds(Y, args.folds, args.seed)
+    configs = search_configs(args.search, args.trials, args.seed)
+    workers = args.workers or os.cpu_count() or 1
+
+    print(f'🔎 {len(configs)} trials, {args.folds}-fold CV over {len(Y)} patterns / {len(tags)} tags, {workers} workers')
+    started = time.perf_counter()
+    results = []
+    # spawn: safe with CUDA in the parent and the same on every platform
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(X, Y, len(tags), folds, args.seed)) as pool:
+        futures = [pool.submit(run_trial, config) for config in configs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            print(f'[{done}/{len(configs)}] acc={result["accuracy"]:.3f} '
+                  f'train={result["train_seconds"]:.1f}s latency={result["latency_us"]:.0f}us {result["config"]}')
+    search_seconds = time.perf_counter() - started
+
+    results = rank(results)
+    best = results[0]
+    print(f'\n🏆 Best: {best["config"]} acc={best["accuracy"]:.3f}±{best["accuracy_std"]:.3f}')
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model, loss = train_model(X, Y, len(tags), best["config"], device=device, seed=args.seed)
+    model.to('cpu')
+    save_artifact(args.out, model.state_dict(), X.shape[1], best["config"]["hidden_size"], len(tags),
+                  all_words, tags, num_layers=best["config"]["num_layers"])
+    print(f'training complete. Best config saved to {args.out} (final loss {loss:.4f})')
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "mode": args.search,
+        "folds": args.folds,
+        "seed": args.seed,
+        "patterns": int(len(Y)),
+        "tags": len(tags),
+        "workers": workers,
+        "search_seconds": round(search_seconds, 2),
+        "artifact": args.out,
+        "best": best,
+        "trials": results,
+    }
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f'\n{"accuracy":>9} {"±":>6} {"train s":>8} {"latency us":>11}  config')
+    for r in results[:10]:
+        print(f'{r["accuracy"]:9.3f} {r["accuracy_std"]:6.3f} {r["train_seconds"]:8.2f} {r["latency_us"]:11.0f}  {r["config"]}')
+    print(f'Report written to {args.report}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the intent classifier")
+    parser.add_argument("--search", choices=["grid", "random"], help="run a cross-validated hyperparameter search")
+    parser.add_argument("--trials", type=int, default=0, help="random: number of draws (default 20); grid: cap")
+    parser.add_argument("--folds", type=int, default=5, help="cross-validation folds, at least 2")
+    parser.add_argument("--workers", type=int, default=0, help="default: all cores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--intents", help="default: intents.compiled.json if up to date, else intents.json")
+    parser.add_argument("--out", default=FILE)
+    parser.add_argument("--report", default=REPORT_FILE)
+    args = parser.parse_args(argv)
+    if args.folds < 2:
+        parser.error("--folds must be at least 2: every trial is validated on held-out folds")
+
+    if args.search:
+        search(args)
+        return
+
+    X, Y, all_words, tags = load_training_data(args.intents)
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model, loss = train_model(X, Y, len(tags), DEFAULT_CONFIG, device=device, seed=args.seed, log_every=100)
+    print(f'final loss,loss={loss:.4f}')
+
+    model.to('cpu')
+    save_artifact(args.out, model.state_dict(), X.shape[1], DEFAULT_CONFIG["hidden_size"], len(tags),
+                  all_words, tags, num_layers=DEFAULT_CONFIG["num_layers"])
+    print(f'training complete. File saved to {args.out}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Chat transcript log for tuning intents.json.
+
+get_bot_response() hands every answered message to `transcripts.record()`,
+which only appends to a bounded in-memory ring buffer. A background thread
+drains the buffer in batches into an append-only SQLite table (default) or
+size-rotated JSONL files, so the request path never waits on disk. When the
+buffer is full the oldest unwritten entries are dropped and counted. A
+process forked from one that already logged (a pre-fork server's workers)
+starts with an empty buffer, its own sink handle and its own writer thread.
+
+    CHATBOT_TRANSCRIPTS=sqlite|jsonl|off   (default sqlite)
+    CHATBOT_TRANSCRIPT_PATH                transcripts.db, or a directory for jsonl
+
+Offline analysis:
+
+    python transcript_log.py stats
+    python transcript_log.py query --tag faculty --max-prob 0.8 --limit 50
+    python transcript_log.py export --format csv --out transcripts.csv
+"""
+import argparse
+import atexit
+import csv
+import glob
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ["ts", "message", "corrected", "tag", "probability", "tier", "response_ms", "stages"]
+BUFFER_SIZE = int(os.environ.get("CHATBOT_TRANSCRIPT_BUFFER", "10000"))
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 2.0
+JSONL_MAX_BYTES = 50 * 1024 * 1024
+
+
+# =============================
+# SINKS
+# =============================
+
+class SQLiteSink:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            # only the writer thread uses this connection
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcript ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, message TEXT NOT NULL, "
+                "corrected TEXT, tag TEXT, probability REAL, tier TEXT, response_ms REAL, stages TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_transcript_ts ON transcript (ts)")
+        return self._conn
+
+    def reset(self):
+        # after fork: the parent's connection must not be used, or closed, by the child
+        self._conn = None
+
+    def write(self, batch):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO transcript (ts, message, corrected, tag, probability, tier, response_ms, stages) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e["ts"], e["message"], e["corrected"], e["tag"], e["probability"], e["tier"],
+                  e["response_ms"], json.dumps(e["stages"])) for e in batch],
+            )
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        for row in conn.execute(f"SELECT {', '.join(FIELDS)} FROM transcript ORDER BY id"):
+            entry = dict(row)
+            entry["stages"] = json.loads(entry["stages"] or "{}")
+            yield entry
+        conn.close()
+
+
+class JSONLSink:
+    """Appends to transcripts-<timestamp>.jsonl, starting a new file past `max_bytes`."""
+
+    def __init__(self, directory, max_bytes=JSONL_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._path = None
+
+    def reset(self):
+        # after fork: start a file named after the child's pid
+        self._path = None
+
+    def write(self, batch):
+        os.makedirs(self.directory, exist_ok=True)
+        if self._path is None or os.path.getsize(self._path) >= self.max_bytes:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            self._path = os.path.join(self.directory, f"transcripts-{stamp}-{os.getpid()}.jsonl")
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch))
+
+    def read(self):
+        for path in sorted(glob.glob(os.path.join(self.directory, "transcripts-*.jsonl"))):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def make_sink(kind=None, path=None):
+    kind = kind or os.environ.get("CHATBOT_TRANSCRIPTS", "sqlite")
+    if kind == "off":
+        return None
+    if kind == "jsonl":
+        return JSONLSink(path or os.environ.get("CHATBOT_TRANSCRIPT_PATH", "transcripts"))
+    return SQLiteSink(path or os.environ.get("CHATBOT_TRANSCRIPT_PATH", "transcripts.db"))
+
+
+# =============================
+# BACKGROUND WRITER
+# =============================
+
+class TranscriptLogger:
+    def __init__(self, sink, capacity=BUFFER_SIZE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._buffer = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._flush_at_exit = False
+
+    def record(self, message, tag, timer, response_ms):
+        """Queues one answered message. Never blocks on I/O."""
+        if self.sink is None:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        details = timer.details
+        self._buffer.append({
+            "ts": time.time(),
+            "message": message,
+            "corrected": details.get("corrected"),
+            "tag": tag,
+            "probability": details.get("probability"),
+            "tier": details.get("tier"),
+            "response_ms": round(response_ms, 3),
+            "stages": {k: round(v * 1000, 3) for k, v in timer.stages.items()},
+        })
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self):
+        # (Re)start the writer in every process, e.g. after a pre-fork server forks workers
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="transcript-writer", daemon=True).start()
+            if not self._flush_at_exit:   # a forked child inherits the handler
+                atexit.register(self.flush)
+                self._flush_at_exit = True
+
+    def _after_fork(self):
+        """
+        Runs in a forked child. The parent still writes the entries it buffered,
+        and its lock may have been held by its writer thread at the moment of
+        the fork, so the child starts over with fresh ones.
+        """
+        self._buffer = deque(maxlen=self._buffer.maxlen)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.dropped = 0
+        if self.sink is not None:
+            self.sink.reset()
+        if self._pid is not None:
+            self._pid = None
+            self._start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes everything buffered so far."""
+        with self._lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    self.sink.write(batch)
+                except Exception as e:
+                    logger.error("❌ Could not write %d transcript entries: %s", len(batch), e)
+                    return
+            if self.dropped:
+                logger.warning("⚠️ Transcript buffer overflowed, %d entries dropped", self.dropped)
+                self.dropped = 0
+
+
+transcripts = TranscriptLogger(make_sink())
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: transcripts._after_fork())
+
+
+# =============================
+# OFFLINE ANALYSIS CLI
+# =============================
+
+def _filtered(entries, args):
+    since = time.mktime(time.strptime(args.since, "%Y-%m-%d")) if args.since else None
+    for e in entries:
+        if since and e["ts"] < since:
+            continue
+        if args.tag and e["tag"] != args.tag:
+            continue
+        if args.max_prob is not None and (e["probability"] is None or e["probability"] > args.max_prob):
+            continue
+        yield e
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query and export chat transcripts")
+    parser.add_argument("command", choices=["stats", "query", "export"])
+    parser.add_argument("--backend", choices=["sqlite", "jsonl"], default=None)
+    parser.add_argument("--path", help="transcripts.db or the jsonl directory")
+    parser.add_argument("--since", help="YYYY-MM-DD")
+    parser.add_argument("--tag")
+    parser.add_argument("--max-prob", type=float, help="only entries at or below this model confidence")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--out", help="output file (default stdout)")
+    args = parser.parse_args(argv)
+
+    sink = make_sink(args.backend, args.path)
+    entries = _filtered(sink.read(), args)
+
+    if args.command == "stats":
+        tags, tiers, count, total_ms = Counter(), Counter(), 0, 0.0
+        for e in entries:
+            count += 1
+            tags[e["tag"]] += 1
+            tiers[e["tier"]] += 1
+            total_ms += e["response_ms"] or 0
+        print(f"📊 {count} messages, mean response {total_ms / (count or 1):.1f} ms")
+        print("\nBy tier:")
+        for tier, n in tiers.most_common():
+            print(f"  {tier or '-':<10} {n:>7}  {n / count:6.1%}")
+        print("\nBy tag:")
+        for tag, n in tags.most_common():
+            print(f"  {tag or '-':<24} {n:>7}")
+        return
+
+    out = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    try:
+        if args.command == "query":
+            for i, e in enumerate(entries):
+                if i >= args.limit:
+                    break
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(e["ts"]))
+                prob = "-" if e["probability"] is None else f"{e['probability']:.2f}"
+                out.write(f"{when}  {e['tag'] or '-':<20} p={prob:<5} {e['message']!r} -> {e['corrected']!r}\n")
+        elif args.format == "csv":
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            for e in entries:
+                writer.writerow(dict(e, stages=json.dumps(e["stages"])))
+        else:
+            for e in entries:
+                out.write(json.dumps(e, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()